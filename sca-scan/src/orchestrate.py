@@ -0,0 +1,199 @@
+#! /usr/bin/env python3
+"""
+Scans a list of GitHub repositories in parallel: each repo is cloned, scanned by
+syft (CycloneDX SBOM), grype (vulnerabilities in that SBOM) and/or semgrep
+(SARIF), and its SBOM uploaded to Dependency Track, like scan.sh and semgrep_scan.sh do one repo at a time. The stages overlap
+across repos, each with its own number of workers, so clones and uploads run while
+other repos are being scanned. A repo that fails or runs past --timeout is
+reported and skipped without affecting the others.
+
+Checkouts are kept in --cache-dir between runs and updated with a shallow fetch
+of the new HEAD. A scanner is skipped for a repo whose HEAD and scanner version
+are the same as when it last scanned it (see scan-state.json in the cache), and
+a repo with nothing left to scan isn't fetched at all. --force rescans
+everything; --no-cache clones afresh and deletes checkouts, like scan.sh.
+Semgrep only scans the files changed since the commit it last scanned, and
+merges their findings into the repo's stored results, unless its last full scan
+is more than --full-rescan-days old.
+
+Semgrep rule packs and grype's vulnerability database are fetched once at the
+start of a run into --tools-cache-dir, and every scan uses them from there with
+the scanners' own network access (rule downloads, database and version checks)
+turned off. With --offline nothing is fetched and the cache must already hold
+them, e.g. a versioned directory mounted into the container. The rules' digest
+and the database's build date are part of the recorded scanner versions, so
+repos are rescanned when either changes.
+
+Every run's SBOM components and findings are added to a SQLite index
+(--index), which results.py queries.
+
+Reports go to --output-dir, with each command's output under logs/, and a summary
+of stage timings to scan-summary.json. Needs GITHUB_TOKEN, and DEPTRACK_API_KEY
+unless --no-upload is given.
+
+    python3 orchestrate.py short_list
+    python3 orchestrate.py https://github.com/org/repo.git --tools semgrep --no-upload
+    python3 orchestrate.py short_list --workers clone=8 --workers semgrep=1 --timeout 1800
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from scanner import (
+    SCANNERS, STAGES, CommandError, ResultsIndex, ScanPipeline, ScanState, Settings, Stage, ToolchainError, format_summary,
+    load_repos, prepare_toolchain, summarize
+)
+
+logger = logging.getLogger('orchestrate')
+
+def default_workers() -> dict:
+    # Scanners are CPU-bound, clones and uploads mostly wait on the network
+    cpus = os.cpu_count() or 2
+    scanners = max(cpus // 2, 1)
+    return {'clone': 4, 'syft': scanners, 'grype': scanners, 'semgrep': scanners, 'upload': 4}
+
+def parse_workers(values, stages) -> dict:
+    workers = default_workers()
+    for value in values or []:
+        name, _, count = value.partition('=')
+        if name not in stages or not count.isdigit() or int(count) < 1:
+            raise SystemExit(f"Invalid --workers {value!r}, expected one of {', '.join(stages)} "
+                             "followed by =N with N at least 1")
+        workers[name] = int(count)
+    return workers
+
+def build_stages(options) -> list:
+    names = ['clone'] + [tool for tool in SCANNERS if tool in options.tools]
+    if 'syft' in options.tools and not options.no_upload:
+        names.append('upload')
+    if not options.no_index:
+        names.append('index')
+    workers = parse_workers(options.workers, [name for name in STAGES if name != 'index'])
+    # There is one connection to the index, so it takes one repo at a time
+    workers['index'] = 1
+    return [Stage(name, STAGES[name], workers[name]) for name in names]
+
+async def run(options, settings, stages, repos) -> dict:
+    toolchain = await prepare_toolchain(
+        options.tools, options.tools_cache_dir, os.path.join(settings.output_dir, 'logs', 'toolchain.log'),
+        semgrep_packs=options.semgrep_rules, offline=options.offline
+    )
+    settings.tool_versions = toolchain.versions
+    settings.tool_env = toolchain.env
+    settings.semgrep_rules = toolchain.semgrep_rules
+    logger.info("Scanner versions: %s",
+                ', '.join(f'{tool} {version}' for tool, version in settings.tool_versions.items()))
+    pipeline = ScanPipeline(stages, settings, repo_timeout=options.timeout, max_in_flight=options.max_in_flight)
+    started = time.monotonic()
+    results = await pipeline.run(repos)
+    return summarize(results, stages, time.monotonic() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', help='a file with one GitHub repo URL per line, or a single repo URL')
+    parser.add_argument('--tools', default='syft,semgrep', help=f"comma separated scanners to run ({', '.join(SCANNERS)})")
+    parser.add_argument('--no-upload', action='store_true', help="don't upload SBOMs to Dependency Track")
+    parser.add_argument('--workers', action='append', metavar='STAGE=N',
+                        help=f'workers for a stage; repeatable (defaults: {default_workers()})')
+    parser.add_argument('--timeout', type=float, default=float(os.getenv('SCAN_REPO_TIMEOUT', '3600')),
+                        help='seconds the stages of one repo may run for in total')
+    parser.add_argument('--max-in-flight', type=int, help='repos being worked on at once (default: total workers)')
+    parser.add_argument('--output-dir', default='/output/reports', help='where reports and logs are written')
+    parser.add_argument('--work-dir', default=os.getenv('SCAN_WORK_DIR', '/tmp/sca-scan'),
+                        help='where repos are checked out')
+    parser.add_argument('--cache-dir', default=os.getenv('SCAN_CACHE_DIR', '/scan/cache'),
+                        help='where checkouts and the scan state are kept between runs')
+    parser.add_argument('--no-cache', action='store_true', help='clone afresh and delete checkouts afterwards')
+    parser.add_argument('--force', action='store_true', help='rescan repos even if their results are current')
+    parser.add_argument('--full-rescan-days', type=float, default=float(os.getenv('SEMGREP_FULL_RESCAN_DAYS', '7')),
+                        help='days before semgrep scans whole repos again instead of changed files; 0 always does')
+    parser.add_argument('--tools-cache-dir', default=os.getenv('SCAN_TOOLS_CACHE'),
+                        help='where semgrep rules and the grype database are kept (default: tools/ in the cache dir)')
+    parser.add_argument('--semgrep-rules', default=os.getenv('SEMGREP_RULE_PACKS', 'p/default'),
+                        help='comma separated semgrep registry rule packs')
+    parser.add_argument('--offline', action='store_true', help='use only rules and databases already in the cache')
+    parser.add_argument('--index', default=os.getenv('SCAN_INDEX'),
+                        help='SQLite results index (default: results.db in the cache dir)')
+    parser.add_argument('--no-index', action='store_true', help="don't add results to the index")
+    parser.add_argument('--copy-to', default='/scan/reports',
+                        help="copy the reports here when done, like scan.sh; '' to skip")
+    parser.add_argument('--project-version', default=datetime.date.today().strftime('%Y.%m.%d'),
+                        help='Dependency Track project version for uploaded SBOMs')
+    parser.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'))
+    options = parser.parse_args()
+    options.tools = [tool.strip() for tool in options.tools.split(',') if tool.strip()]
+    options.semgrep_rules = [pack.strip() for pack in options.semgrep_rules.split(',') if pack.strip()]
+
+    logging.basicConfig(level=options.log_level.upper(), format='%(asctime)s %(levelname)s %(message)s')
+
+    unknown = set(options.tools) - set(SCANNERS)
+    if unknown or not options.tools:
+        parser.error(f"--tools must list one or more of {', '.join(SCANNERS)}")
+    if 'grype' in options.tools and 'syft' not in options.tools:
+        parser.error('grype scans the SBOM from syft, so --tools must include syft too')
+    # A GITHUB_TOKEN must exist to clone private repos and download security advisories from GitHub
+    if not os.getenv('GITHUB_TOKEN'):
+        parser.error('Please set the GITHUB_TOKEN environment variable')
+    stages = build_stages(options)
+    if any(stage.name == 'upload' for stage in stages) and not os.getenv('DEPTRACK_API_KEY'):
+        parser.error('Please set the DEPTRACK_API_KEY environment variable, or pass --no-upload')
+
+    repos, invalid = load_repos(options.target)
+    for line in invalid:
+        logger.warning("Invalid GitHub repo: %s", line)
+    if not repos:
+        parser.error('No valid GitHub repo URLs to scan')
+
+    semgrep_workers = next((stage.workers for stage in stages if stage.name == 'semgrep'), 1)
+    settings = Settings(
+        github_token=os.environ['GITHUB_TOKEN'],
+        output_dir=options.output_dir,
+        work_dir=options.work_dir,
+        deptrack_url=os.getenv('DEPTRACK_URL', 'http://dependency-track-dtrack-apiserver-1:8080'),
+        deptrack_api_key=os.getenv('DEPTRACK_API_KEY', ''),
+        project_version=options.project_version,
+        # Split the CPUs between the semgrep processes running at once
+        semgrep_jobs=max((os.cpu_count() or 1) // semgrep_workers, 1),
+        cache_dir=None if options.no_cache else options.cache_dir,
+        force=options.force,
+        full_rescan_days=options.full_rescan_days,
+    )
+    if settings.cache_dir:
+        settings.state = ScanState(os.path.join(settings.cache_dir, 'scan-state.json'))
+    if not options.no_index:
+        settings.index = ResultsIndex(
+            options.index or os.path.join(settings.cache_dir or settings.output_dir, 'results.db')
+        )
+        settings.run_id = settings.index.start_run()
+    options.tools_cache_dir = options.tools_cache_dir or os.path.join(settings.cache_dir or settings.work_dir, 'tools')
+    os.makedirs(settings.output_dir, exist_ok=True)
+    os.makedirs(settings.work_dir, exist_ok=True)
+
+    logger.info("Scanning %d repos with %s", len(repos),
+                ', '.join(f'{stage.name}={stage.workers}' for stage in stages))
+    try:
+        summary = asyncio.run(run(options, settings, stages, repos))
+    except (CommandError, ToolchainError) as e:
+        parser.exit(2, f'Could not prepare the scanners: {e}\n')
+    finally:
+        if settings.index is not None:
+            settings.index.close()
+    summary['run_id'] = settings.run_id
+    summary['invalid'] = invalid
+    with open(os.path.join(settings.output_dir, 'scan-summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(format_summary(summary))
+
+    if options.copy_to:
+        shutil.copytree(settings.output_dir, options.copy_to, dirs_exist_ok=True)
+
+    done = summary['statuses'].get('ok', 0) + summary['statuses'].get('unchanged', 0)
+    sys.exit(0 if done == len(repos) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+"""
+Queries the results index that orchestrate.py fills: which repos ship a package,
+what each run found, and which findings are new or resolved between two runs.
+Reports from the scripts or older runs can be added with ingest.
+
+    python3 results.py runs
+    python3 results.py package log4j-core --version '2.14*'
+    python3 results.py package org.apache.logging.log4j/log4j-core
+    python3 results.py package pkg:npm/lodash --run 12
+    python3 results.py diff                 # the latest two runs
+    python3 results.py diff 11 12
+    python3 results.py ingest /scan/reports  # every *-cdx.xml, *.sarif and *-grype.json, named <repo>-...
+"""
+import argparse
+import os
+import sys
+from scanner import ResultsIndex, report_tool
+
+def runs(index, options):
+    print(f"{'run':>5}  {'started':<25} {'repos':>6} {'components':>11} {'findings':>9}")
+    for run in index.runs(options.limit):
+        print(f"{run['id']:5d}  {run['started_at']:<25} {run['repos']:6d} {run['components']:11d} {run['findings']:9d}")
+
+def package(index, options):
+    rows = index.find_package(options.name, options.version, options.run)
+    if not rows:
+        print(f"No repo ships {options.name}" + (f" {options.version}" if options.version else ''))
+        return 1
+    for row in rows:
+        name = f"{row['grp']}/{row['name']}" if row['grp'] else row['name']
+        print(f"{row['repo']:<40} {name} {row['version'] or '?'}  {row['purl'] or ''}  "
+              f"(run {row['run_id']}, {(row['sha'] or '')[:10]})")
+
+def diff(index, options):
+    if options.old is None or options.new is None:
+        latest = index.latest_runs(2)
+        if len(latest) < 2:
+            print("Need at least two runs to compare")
+            return 1
+        options.new, options.old = latest
+    changes = index.diff(options.old, options.new)
+    new = sum(len(change['new']) for change in changes.values())
+    resolved = sum(len(change['resolved']) for change in changes.values())
+    print(f"Run {options.old} -> {options.new}: {new} new, {resolved} resolved findings")
+    for (repo, tool), change in changes.items():
+        print(f"\n{repo} ({tool})")
+        for kind, sign in (('new', '+'), ('resolved', '-')):
+            for finding in change[kind]:
+                location = f"{finding['path']}:{finding['line']}" if finding['line'] else finding['path']
+                print(f"  {sign} [{finding['severity'] or '-'}] {finding['rule_id']} {location}")
+    return 1 if new and options.fail_on_new else 0
+
+def ingest(index, options):
+    paths = []
+    for target in options.paths:
+        if os.path.isdir(target):
+            paths.extend(os.path.join(target, name) for name in sorted(os.listdir(target)))
+        else:
+            paths.append(target)
+
+    run_id = index.start_run()
+    for path in paths:
+        report = report_tool(path)
+        if report is None:
+            continue
+        name, tool = report
+        repo = f'{options.owner}/{name}' if options.owner else name
+        try:
+            count = index.ingest(run_id, repo, tool, None, path)
+        except Exception as e:
+            print(f"Skipped {path}: {e}", file=sys.stderr)
+            continue
+        print(f"{repo} ({tool}): {count} rows from {path}")
+    print(f"Ingested as run {run_id}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--index', default=os.getenv('SCAN_INDEX') or os.path.join(
+        os.getenv('SCAN_CACHE_DIR', '/scan/cache'), 'results.db'), help='the SQLite results index')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('runs', help='list the latest runs')
+    command.add_argument('--limit', type=int, default=20)
+    command.set_defaults(handler=runs)
+
+    command = commands.add_parser('package', help='find the repos that ship a package')
+    command.add_argument('name', help='package name, group/name, or a purl without version')
+    command.add_argument('--version', help="exact version, or a pattern with * wildcards such as '2.14*'")
+    command.add_argument('--run', type=int, help="look in this run (default: each repo's latest SBOM)")
+    command.set_defaults(handler=package)
+
+    command = commands.add_parser('diff', help='list findings that are new or resolved between two runs')
+    command.add_argument('old', type=int, nargs='?')
+    command.add_argument('new', type=int, nargs='?')
+    command.add_argument('--fail-on-new', action='store_true', help='exit with status 1 if there are new findings')
+    command.set_defaults(handler=diff)
+
+    command = commands.add_parser('ingest', help='add report files to the index as a new run')
+    command.add_argument('paths', nargs='+', help='report files or directories of them')
+    command.add_argument('--owner', help='GitHub owner to prefix repo names with, e.g. BambooHR')
+    command.set_defaults(handler=ingest)
+
+    options = parser.parse_args()
+    if options.command != 'ingest' and not os.path.exists(options.index):
+        parser.error(f'No results index at {options.index}; run orchestrate.py first or pass --index')
+    index = ResultsIndex(options.index)
+    try:
+        sys.exit(options.handler(index, options) or 0)
+    finally:
+        index.close()
+
+if __name__ == '__main__':
+    main()
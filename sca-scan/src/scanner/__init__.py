@@ -0,0 +1,32 @@
+from .index import ResultsIndex, iter_cyclonedx_components, iter_sarif_findings, report_tool
+from .pipeline import RepoResult, ScanPipeline, Stage, format_summary, summarize
+from .process import CommandError, run_command
+from .repos import Repo, load_repos, parse_repo
+from .stages import SCANNERS, STAGES, ScanContext, Settings
+from .state import ScanState
+from .toolchain import Toolchain, ToolchainError, prepare_toolchain
+
+__all__ = [
+    'CommandError',
+    'Repo',
+    'RepoResult',
+    'ResultsIndex',
+    'SCANNERS',
+    'STAGES',
+    'ScanContext',
+    'ScanPipeline',
+    'ScanState',
+    'Settings',
+    'Stage',
+    'Toolchain',
+    'ToolchainError',
+    'format_summary',
+    'iter_cyclonedx_components',
+    'iter_sarif_findings',
+    'load_repos',
+    'parse_repo',
+    'prepare_toolchain',
+    'report_tool',
+    'run_command',
+    'summarize',
+]
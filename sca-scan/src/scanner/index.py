@@ -0,0 +1,349 @@
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+from .sarif import result_uri
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    repo TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    sha TEXT,
+    report TEXT,
+    UNIQUE (run_id, repo, tool)
+);
+CREATE TABLE IF NOT EXISTS components (
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    name TEXT NOT NULL,
+    grp TEXT,
+    version TEXT,
+    purl TEXT,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS components_name ON components (name, version);
+CREATE INDEX IF NOT EXISTS components_purl ON components (purl);
+CREATE INDEX IF NOT EXISTS components_scan ON components (scan_id);
+CREATE TABLE IF NOT EXISTS findings (
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    fingerprint TEXT NOT NULL,
+    rule_id TEXT NOT NULL,
+    severity TEXT,
+    path TEXT,
+    line INTEGER,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS findings_scan ON findings (scan_id, fingerprint);
+CREATE INDEX IF NOT EXISTS findings_rule ON findings (rule_id);
+"""
+
+# Rows inserted per executemany call while streaming a report
+BATCH_SIZE = 1000
+
+def _local(tag: str) -> str:
+    """An XML tag without its namespace, e.g. 'component'."""
+    return tag.rsplit('}', 1)[-1]
+
+def iter_cyclonedx_components(path: str) -> Iterator[dict]:
+    """
+    Stream the components of a CycloneDX XML SBOM, including nested ones.
+
+    The document is read incrementally and each component is discarded once
+    yielded, so memory stays flat however large the SBOM. The component the
+    SBOM describes (under metadata) is not included.
+    """
+    depth = 0
+    in_metadata = 0
+    parents = []
+    ns = None
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if ns is None:
+            # CycloneDX versions differ only in their namespace, which the root element has
+            ns = elem.tag[:elem.tag.index('}') + 1] if elem.tag.startswith('{') else ''
+            component, metadata, components = f'{ns}component', f'{ns}metadata', f'{ns}components'
+        if event == 'start':
+            depth += 1
+            if depth == 2:
+                parents.append(elem)
+            in_metadata += elem.tag == metadata
+            continue
+
+        depth -= 1
+        in_metadata -= elem.tag == metadata
+        if elem.tag == component and not in_metadata:
+            fields = {child.tag[len(ns):]: child.text for child in elem if child.tag != components}
+            yield {
+                'name': (fields.get('name') or '').strip(),
+                'group': (fields.get('group') or '').strip() or None,
+                'version': (fields.get('version') or '').strip() or None,
+                'purl': (fields.get('purl') or '').strip() or None,
+                'type': elem.get('type'),
+            }
+        if depth == 2:
+            # Entries of the top-level sections (components, dependencies, ...) are dropped once
+            # read, together with anything nested in them
+            parents[-1].clear()
+        elif depth == 1:
+            parents.pop()
+
+def _fingerprint(*parts: str) -> str:
+    return hashlib.sha1('\0'.join(part or '' for part in parts).encode()).hexdigest()
+
+def iter_sarif_findings(path: str) -> Iterator[dict]:
+    """
+    Read the findings of a SARIF file.
+
+    A finding's fingerprint identifies it across runs: the scanner's own when it
+    provides a real one, otherwise rule, file and message. Line numbers are left
+    out, so findings don't look new when code above them moves.
+    """
+    with open(path) as f:
+        sarif = json.load(f)
+    for run in sarif.get('runs', []):
+        for result in run.get('results', []):
+            rule_id = result.get('ruleId', '')
+            uri = result_uri(result)
+            message = (result.get('message') or {}).get('text', '')
+            fingerprints = {**(result.get('partialFingerprints') or {}), **(result.get('fingerprints') or {})}
+            # Semgrep without a login reports placeholder fingerprints
+            own = next((value for value in fingerprints.values() if value and value != 'requires login'), None)
+            region = ((result.get('locations') or [{}])[0].get('physicalLocation') or {}).get('region') or {}
+            yield {
+                'fingerprint': own or _fingerprint(rule_id, uri, message),
+                'rule_id': rule_id,
+                'severity': result.get('level'),
+                'path': uri,
+                'line': region.get('startLine'),
+                'message': message,
+            }
+
+def iter_grype_findings(path: str) -> Iterator[dict]:
+    """Read the vulnerability matches of a grype JSON report."""
+    with open(path) as f:
+        report = json.load(f)
+    for match in report.get('matches', []):
+        vulnerability = match.get('vulnerability', {})
+        artifact = match.get('artifact', {})
+        package = f"{artifact.get('name')}@{artifact.get('version')}"
+        fixed = ', '.join(vulnerability.get('fix', {}).get('versions') or [])
+        yield {
+            'fingerprint': _fingerprint(vulnerability.get('id'), artifact.get('purl') or package),
+            'rule_id': vulnerability.get('id', ''),
+            'severity': vulnerability.get('severity'),
+            'path': artifact.get('purl') or package,
+            'line': None,
+            'message': f"{package}" + (f" (fixed in {fixed})" if fixed else ''),
+        }
+
+def _unique(findings: Iterator[dict]) -> Iterator[dict]:
+    # The same fingerprint can occur more than once in a report; number the repeats so each is tracked
+    seen = {}
+    for finding in findings:
+        count = seen.get(finding['fingerprint'], 0)
+        seen[finding['fingerprint']] = count + 1
+        if count:
+            finding['fingerprint'] = f"{finding['fingerprint']}#{count}"
+        yield finding
+
+def _batches(rows, size: int = BATCH_SIZE):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+class ResultsIndex:
+    """
+    A SQLite index of scan results: components from SBOMs and findings from
+    semgrep and grype, per repo, per scanner, per run.
+
+    Every orchestrator run is a row in runs. Each repo a scanner covered in a run
+    has a row in scans, and its components or findings point at that. When a
+    scanner had nothing new to scan in a repo, its previous results are carried
+    into the run, so every run is a complete picture to query or compare.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Stages ingest from worker threads, one at a time
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def start_run(self) -> int:
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        with self.db:
+            return self.db.execute('INSERT INTO runs (started_at) VALUES (?)', (now,)).lastrowid
+
+    def _new_scan(self, run_id: int, repo: str, tool: str, sha: str, report: str) -> int:
+        old = self.db.execute('SELECT id FROM scans WHERE run_id = ? AND repo = ? AND tool = ?',
+                              (run_id, repo, tool)).fetchone()
+        if old is not None:
+            self.db.execute('DELETE FROM components WHERE scan_id = ?', (old['id'],))
+            self.db.execute('DELETE FROM findings WHERE scan_id = ?', (old['id'],))
+            self.db.execute('DELETE FROM scans WHERE id = ?', (old['id'],))
+        return self.db.execute('INSERT INTO scans (run_id, repo, tool, sha, report) VALUES (?, ?, ?, ?, ?)',
+                               (run_id, repo, tool, sha, report)).lastrowid
+
+    def ingest(self, run_id: int, repo: str, tool: str, sha: str, report: str) -> int:
+        """
+        Add a scanner's report for a repo to a run, replacing any already there.
+
+        Args:
+            run_id: The run, from start_run
+            repo: The repo, owner/name
+            tool: syft (CycloneDX XML), semgrep (SARIF) or grype (JSON)
+            sha: The commit that was scanned
+            report: Path of the report
+
+        Returns:
+            The number of components or findings added
+        """
+        count = 0
+        with self.db:
+            scan_id = self._new_scan(run_id, repo, tool, sha, report)
+            if tool == 'syft':
+                rows = ((scan_id, c['name'], c['group'], c['version'], c['purl'], c['type'])
+                        for c in iter_cyclonedx_components(report))
+                sql = 'INSERT INTO components (scan_id, name, grp, version, purl, type) VALUES (?, ?, ?, ?, ?, ?)'
+            else:
+                findings = iter_grype_findings(report) if tool == 'grype' else iter_sarif_findings(report)
+                rows = ((scan_id, f['fingerprint'], f['rule_id'], f['severity'], f['path'], f['line'], f['message'])
+                        for f in _unique(findings))
+                sql = ('INSERT INTO findings (scan_id, fingerprint, rule_id, severity, path, line, message) '
+                       'VALUES (?, ?, ?, ?, ?, ?, ?)')
+            for batch in _batches(rows):
+                self.db.executemany(sql, batch)
+                count += len(batch)
+        return count
+
+    def carry_forward(self, run_id: int, repo: str, tool: str) -> bool:
+        """
+        Copy a scanner's latest earlier results for a repo into a run.
+
+        Returns:
+            False if the scanner has no earlier results for the repo
+        """
+        with self.db:
+            previous = self.db.execute('SELECT * FROM scans WHERE repo = ? AND tool = ? AND run_id < ? '
+                                       'ORDER BY run_id DESC LIMIT 1', (repo, tool, run_id)).fetchone()
+            if previous is None:
+                return False
+            scan_id = self._new_scan(run_id, repo, tool, previous['sha'], previous['report'])
+            self.db.execute('INSERT INTO components (scan_id, name, grp, version, purl, type) '
+                            'SELECT ?, name, grp, version, purl, type FROM components WHERE scan_id = ?',
+                            (scan_id, previous['id']))
+            self.db.execute('INSERT INTO findings (scan_id, fingerprint, rule_id, severity, path, line, message) '
+                            'SELECT ?, fingerprint, rule_id, severity, path, line, message FROM findings '
+                            'WHERE scan_id = ?', (scan_id, previous['id']))
+        return True
+
+    def runs(self, limit: int = 20) -> List[sqlite3.Row]:
+        """The latest runs, newest first, with the number of repos, components and findings in each."""
+        return self.db.execute("""
+            SELECT r.id, r.started_at,
+                   COUNT(DISTINCT s.repo) AS repos,
+                   (SELECT COUNT(*) FROM components c JOIN scans cs ON cs.id = c.scan_id WHERE cs.run_id = r.id)
+                       AS components,
+                   (SELECT COUNT(*) FROM findings f JOIN scans fs ON fs.id = f.scan_id WHERE fs.run_id = r.id)
+                       AS findings
+            FROM runs r LEFT JOIN scans s ON s.run_id = r.id
+            GROUP BY r.id ORDER BY r.id DESC LIMIT ?
+        """, (limit,)).fetchall()
+
+    def latest_runs(self, count: int = 2) -> List[int]:
+        """The IDs of the latest runs with any results, newest first."""
+        rows = self.db.execute('SELECT DISTINCT run_id FROM scans ORDER BY run_id DESC LIMIT ?', (count,))
+        return [row['run_id'] for row in rows]
+
+    def find_package(self, name: str, version: str = None, run_id: int = None) -> List[sqlite3.Row]:
+        """
+        Find the repos that ship a package.
+
+        Args:
+            name: Package name, group/name, or a purl prefix such as pkg:maven/org.apache.logging.log4j/log4j-core
+            version: Exact version, or a pattern with * wildcards, e.g. 2.14*
+            run_id: Look in this run; defaults to each repo's latest SBOM
+
+        Returns:
+            Rows of repo, sha, run_id, name, grp, version, purl and type
+        """
+        if run_id is None:
+            scans = 'SELECT MAX(id) FROM scans WHERE tool = \'syft\' GROUP BY repo'
+            params = []
+        else:
+            scans = 'SELECT id FROM scans WHERE tool = \'syft\' AND run_id = ?'
+            params = [run_id]
+
+        group, _, short_name = name.rpartition('/')
+        if name.startswith('pkg:'):
+            # A prefix compare, since LIKE would treat _ and % in the name as wildcards and ignore case
+            match, match_params = "substr(c.purl, 1, length(?) + 1) = ? || '@'", [name, name]
+        elif group:
+            match, match_params = 'c.grp = ? AND c.name = ?', [group, short_name]
+        else:
+            match, match_params = 'c.name = ?', [name]
+        sql = f"""
+            SELECT s.repo, s.sha, s.run_id, c.name, c.grp, c.version, c.purl, c.type
+            FROM components c JOIN scans s ON s.id = c.scan_id
+            WHERE c.scan_id IN ({scans}) AND {match}
+        """
+        params += match_params
+        if version:
+            sql += ' AND c.version GLOB ?' if '*' in version else ' AND c.version = ?'
+            params.append(version)
+        return self.db.execute(sql + ' ORDER BY s.repo, c.version', params).fetchall()
+
+    def diff(self, old_run: int, new_run: int) -> Dict[Tuple[str, str], Dict[str, List[sqlite3.Row]]]:
+        """
+        Compare the findings of two runs.
+
+        Only repos and scanners covered by both runs are compared, so a repo that
+        failed in one of them doesn't show all its findings as new or resolved.
+
+        Returns:
+            {(repo, tool): {'new': [...], 'resolved': [...]}} for each repo and scanner with changes
+        """
+        changes = {}
+        pairs = self.db.execute("""
+            SELECT o.id AS old_id, n.id AS new_id, n.repo, n.tool
+            FROM scans o JOIN scans n ON n.repo = o.repo AND n.tool = o.tool
+            WHERE o.run_id = ? AND n.run_id = ? AND n.tool != 'syft'
+            ORDER BY n.repo, n.tool
+        """, (old_run, new_run)).fetchall()
+        query = """
+            SELECT * FROM findings a WHERE a.scan_id = ?
+            AND NOT EXISTS (SELECT 1 FROM findings b WHERE b.scan_id = ? AND b.fingerprint = a.fingerprint)
+            ORDER BY a.path, a.line
+        """
+        for pair in pairs:
+            new = self.db.execute(query, (pair['new_id'], pair['old_id'])).fetchall()
+            resolved = self.db.execute(query, (pair['old_id'], pair['new_id'])).fetchall()
+            if new or resolved:
+                changes[(pair['repo'], pair['tool'])] = {'new': new, 'resolved': resolved}
+        return changes
+
+def report_tool(path: str) -> Optional[Tuple[str, str]]:
+    """
+    Tell a report's repo and scanner from the file names the orchestrator and scripts use.
+
+    Returns:
+        (repo name, scanner), or None if the file isn't a report
+    """
+    name = os.path.basename(path)
+    for suffix, tool in (('-cdx.xml', 'syft'), ('-sca.sarif', 'semgrep'), ('.sarif', 'semgrep'),
+                         ('-grype.json', 'grype')):
+        if name.endswith(suffix):
+            return name[:-len(suffix)], tool
+    return None
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+from .repos import Repo
+from .stages import ScanContext, Settings, cleanup
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Stage:
+    """A pipeline step, run for at most `workers` repositories at once."""
+    name: str
+    run: Callable[[ScanContext], Awaitable[None]]
+    workers: int = 1
+
+@dataclass
+class RepoResult:
+    """How one repository's scan went."""
+    repo: str
+    # pending, ok, unchanged (nothing needed scanning), failed or timeout
+    status: str = 'pending'
+    sha: Optional[str] = None
+    skipped: List[str] = field(default_factory=list)
+    failed_stage: Optional[str] = None
+    error: Optional[str] = None
+    # Seconds each stage ran for, and waited for a free worker beforehand
+    timings: Dict[str, float] = field(default_factory=dict)
+    waits: Dict[str, float] = field(default_factory=dict)
+    reports: Dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+class ScanPipeline:
+    """
+    Moves repositories through the stages concurrently.
+
+    Every repository goes through the stages in order, but each stage has its own
+    pool of workers, so while one repository is being scanned the next ones are
+    already cloning and earlier ones uploading. A failure or timeout only ends the
+    repository it happened to; its checkout is always removed unless cached.
+    Stages a repository has nothing to do for (see ScanContext.skip) are passed
+    over without taking a worker, and the scanners that ran successfully are
+    recorded in the settings' scan state.
+    """
+
+    def __init__(self, stages: List[Stage], settings: Settings, repo_timeout: float = 3600,
+                 max_in_flight: int = None):
+        """
+        Args:
+            stages: The stages in the order each repository goes through them
+            settings: Shared run settings
+            repo_timeout: Seconds a repository's stages may run in total; time spent
+                waiting for a free worker doesn't count
+            max_in_flight: Repositories started but not finished at any time, which bounds
+                the checkouts on disk. Defaults to the total number of workers.
+        """
+        self.stages = stages
+        self.settings = settings
+        self.repo_timeout = repo_timeout
+        self.max_in_flight = max_in_flight or sum(stage.workers for stage in stages)
+        self._workers = {stage.name: asyncio.Semaphore(stage.workers) for stage in stages}
+
+    async def run(self, repos: List[Repo]) -> List[RepoResult]:
+        """Scan the repositories; returns their results in the same order."""
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        async def admit(repo):
+            async with in_flight:
+                return await self.scan(repo)
+
+        return list(await asyncio.gather(*(admit(repo) for repo in repos)))
+
+    async def scan(self, repo: Repo) -> RepoResult:
+        result = RepoResult(repo=repo.slug)
+        ctx = ScanContext(repo=repo, settings=self.settings)
+        started = time.monotonic()
+        logger.info("Starting %s", repo.slug)
+        try:
+            for stage in self.stages:
+                if stage.name in ctx.skip:
+                    result.skipped.append(stage.name)
+                    continue
+                await self._run_stage(stage, ctx, result)
+            scanned = {tool: version for tool, version in self.settings.tool_versions.items() if tool not in ctx.skip}
+            result.status = 'ok' if scanned else 'unchanged'
+            if scanned and self.settings.state is not None:
+                self.settings.state.record(repo.slug, ctx.sha, scanned, ctx.reports, ctx.details)
+        except asyncio.TimeoutError:
+            result.status = 'timeout'
+            result.error = f'Exceeded {self.repo_timeout:.0f}s'
+        except Exception as e:
+            result.status = 'failed'
+            result.error = str(e)
+        finally:
+            await cleanup(ctx)
+            result.seconds = time.monotonic() - started
+            result.reports = dict(ctx.reports)
+            result.sha = ctx.sha
+
+        if result.status == 'unchanged':
+            logger.info("Skipped %s, already scanned at %s", repo.slug, ctx.sha)
+        elif result.status == 'ok':
+            logger.info("Finished %s in %.1fs", repo.slug, result.seconds)
+        else:
+            logger.error("%s %s in %s: %s", repo.slug, result.status, result.failed_stage, result.error)
+        return result
+
+    async def _run_stage(self, stage: Stage, ctx: ScanContext, result: RepoResult) -> None:
+        queued = time.monotonic()
+        async with self._workers[stage.name]:
+            started = time.monotonic()
+            result.waits[stage.name] = started - queued
+            result.failed_stage = stage.name
+            remaining = self.repo_timeout - sum(result.timings.values())
+            try:
+                await asyncio.wait_for(stage.run(ctx), timeout=max(remaining, 0))
+            finally:
+                result.timings[stage.name] = time.monotonic() - started
+            result.failed_stage = None
+
+def summarize(results: List[RepoResult], stages: List[Stage], wall_seconds: float) -> dict:
+    """Build the JSON summary of a run: totals per status, timings per stage and every repository's result."""
+    statuses = {}
+    for result in results:
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+
+    stage_stats = {}
+    for stage in stages:
+        timings = [r.timings[stage.name] for r in results if stage.name in r.timings]
+        waits = [r.waits[stage.name] for r in results if stage.name in r.waits]
+        stage_stats[stage.name] = {
+            'workers': stage.workers,
+            'runs': len(timings),
+            'failures': sum(1 for r in results if r.failed_stage == stage.name),
+            'total_seconds': round(sum(timings), 3),
+            'mean_seconds': round(sum(timings) / len(timings), 3) if timings else 0.0,
+            'max_seconds': round(max(timings), 3) if timings else 0.0,
+            'wait_seconds': round(sum(waits), 3),
+        }
+
+    return {
+        'wall_seconds': round(wall_seconds, 3),
+        'repos': len(results),
+        'statuses': statuses,
+        'stages': stage_stats,
+        'results': [
+            {
+                'repo': r.repo,
+                'status': r.status,
+                'sha': r.sha,
+                'skipped': r.skipped,
+                'failed_stage': r.failed_stage,
+                'error': r.error,
+                'seconds': round(r.seconds, 3),
+                'timings': {name: round(value, 3) for name, value in r.timings.items()},
+                'waits': {name: round(value, 3) for name, value in r.waits.items()},
+                'reports': r.reports,
+            }
+            for r in results
+        ],
+    }
+
+def format_summary(summary: dict) -> str:
+    """A plain text table of a run summary, for the console."""
+    statuses = ', '.join(f'{count} {status}' for status, count in sorted(summary['statuses'].items()))
+    lines = [
+        f"Scanned {summary['repos']} repos in {summary['wall_seconds']:.1f}s ({statuses or 'nothing to do'})",
+        f"  {'stage':<10} {'workers':>7} {'runs':>5} {'failed':>6} {'total s':>9} {'mean s':>8} {'max s':>8} {'waited s':>9}",
+    ]
+    for name, stats in summary['stages'].items():
+        lines.append(f"  {name:<10} {stats['workers']:7d} {stats['runs']:5d} {stats['failures']:6d} "
+                     f"{stats['total_seconds']:9.1f} {stats['mean_seconds']:8.1f} {stats['max_seconds']:8.1f} "
+                     f"{stats['wait_seconds']:9.1f}")
+    for result in summary['results']:
+        if result['status'] not in ('ok', 'unchanged'):
+            lines.append(f"  {result['repo']}: {result['status']} in {result['failed_stage']}: {result['error']}")
+    return '\n'.join(lines)
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import signal
+from typing import Iterable, List, Optional
+
+class CommandError(Exception):
+    """Raised when a scanner command exits with a non-zero status."""
+
+    def __init__(self, message: str, returncode: int = None):
+        super().__init__(message)
+        self.returncode = returncode
+
+def redact(text: str, secrets: Iterable[str]) -> str:
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, '***')
+    return text
+
+def _tail(path: str, lines: int = 5) -> str:
+    try:
+        with open(path, errors='replace') as f:
+            return ' | '.join(line.strip() for line in f.readlines()[-lines:] if line.strip())
+    except OSError:
+        return ''
+
+async def run_command(args: List[str], log_path: str, cwd: str = None, env: dict = None,
+                      secrets: Iterable[str] = (), capture: bool = False) -> Optional[str]:
+    """
+    Run a command, appending its output to a log file.
+
+    The command runs in its own process group, so cancelling the awaiting task
+    (e.g. when a repo times out) kills it together with any children it spawned,
+    such as git's remote helpers.
+
+    Args:
+        args: The command and its arguments
+        log_path: File the command line, stderr and (unless captured) stdout are appended to
+        cwd: Working directory for the command
+        env: Variables added to the orchestrator's environment
+        secrets: Strings masked wherever the command line or output is logged or raised
+        capture: Return stdout instead of logging it
+
+    Returns:
+        The command's stdout if capture is set, else None
+
+    Raises:
+        CommandError: If the command fails; the message ends with the last lines of its log
+    """
+    secrets = list(secrets)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'a') as log:
+        log.write(f"$ {redact(' '.join(args), secrets)}\n")
+        log.flush()
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            env={**os.environ, **env} if env else None,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE if capture else log,
+            stderr=log,
+            start_new_session=True
+        )
+        try:
+            stdout, _ = await process.communicate()
+        except asyncio.CancelledError:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            raise
+
+    if process.returncode != 0:
+        tail = redact(_tail(log_path), secrets)
+        raise CommandError(f"{args[0]} exited with status {process.returncode}: {tail}", process.returncode)
+    return stdout.decode(errors='replace') if capture else None
@@ -0,0 +1,60 @@
+import json
+import os
+from typing import Iterable, Optional
+
+def load_sarif(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def write_sarif(sarif: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(sarif, f)
+    os.replace(tmp, path)
+
+def result_uri(result: dict) -> Optional[str]:
+    """The path of the file a SARIF result was found in, relative to the scanned directory."""
+    for location in result.get('locations') or []:
+        uri = location.get('physicalLocation', {}).get('artifactLocation', {}).get('uri')
+        if uri:
+            return uri[2:] if uri.startswith('./') else uri
+    return None
+
+def merge_sarif(baseline: dict, delta: Optional[dict], replaced: Iterable[str]) -> dict:
+    """
+    Update a full scan's SARIF with a scan of some of its files.
+
+    Results in the replaced files are dropped from the baseline and the delta's
+    results added in their place, so a file's findings always come from its
+    latest scan. Rules the delta reports are added to the baseline's.
+
+    Args:
+        baseline: SARIF of an earlier scan, with one run
+        delta: SARIF of a scan of the changed files, or None if none were scanned
+        replaced: Paths, relative to the scanned directory, whose old results are dropped;
+            the changed and deleted files
+
+    Returns:
+        The merged SARIF; the baseline is modified in place
+    """
+    replaced = set(replaced)
+    run = baseline['runs'][0]
+    results = [result for result in run.get('results', []) if result_uri(result) not in replaced]
+
+    if delta is not None and delta.get('runs'):
+        delta_run = delta['runs'][0]
+        for result in delta_run.get('results', []):
+            # Rule indexes point into the delta's rules; the rule ID is enough
+            result.pop('ruleIndex', None)
+            results.append(result)
+        driver = run.setdefault('tool', {}).setdefault('driver', {})
+        rules = driver.setdefault('rules', [])
+        known = {rule.get('id') for rule in rules}
+        for rule in delta_run.get('tool', {}).get('driver', {}).get('rules', []):
+            if rule.get('id') not in known:
+                known.add(rule.get('id'))
+                rules.append(rule)
+
+    run['results'] = results
+    return baseline
@@ -0,0 +1,287 @@
+import asyncio
+import datetime
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+from .index import ResultsIndex
+from .process import CommandError, run_command
+from .repos import Repo
+from .sarif import load_sarif, merge_sarif, write_sarif
+from .state import ScanState
+
+# Above this many changed files an incremental semgrep scan gains little, so the whole checkout is scanned
+MAX_INCREMENTAL_FILES = 1000
+
+@dataclass
+class Settings:
+    """What every stage needs to know about the run."""
+    github_token: str
+    output_dir: str = '/output/reports'
+    work_dir: str = '/tmp/sca-scan'
+    deptrack_url: str = 'http://dependency-track-dtrack-apiserver-1:8080'
+    deptrack_api_key: str = ''
+    project_version: str = ''
+    # Parallel jobs each semgrep process may use
+    semgrep_jobs: int = 1
+    # Keeps checkouts between runs when set; None clones afresh and deletes them afterwards
+    cache_dir: Optional[str] = None
+    # Version of each scanner in this run, and what earlier runs scanned
+    tool_versions: Dict[str, str] = field(default_factory=dict)
+    # Environment for scanner commands and the semgrep rule files, see Toolchain
+    tool_env: Dict[str, str] = field(default_factory=dict)
+    semgrep_rules: List[str] = field(default_factory=list)
+    state: Optional[ScanState] = None
+    # Scan every repo even if its results are current
+    force: bool = False
+    # Where results are indexed, and this run's ID there
+    index: Optional[ResultsIndex] = None
+    run_id: Optional[int] = None
+    # Days after which semgrep scans a whole checkout again rather than just the changed files; 0 always does
+    full_rescan_days: float = 7
+
+    @property
+    def secrets(self) -> List[str]:
+        return [self.github_token, self.deptrack_api_key]
+
+@dataclass
+class ScanContext:
+    """One repository's trip through the pipeline."""
+    repo: Repo
+    settings: Settings
+    # Report files written so far, by the scanner that wrote them
+    reports: Dict[str, str] = field(default_factory=dict)
+    # The commit being scanned
+    sha: Optional[str] = None
+    # Stages with nothing to do for this repo
+    skip: Set[str] = field(default_factory=set)
+    # The last commit semgrep scanned, when only the files changed since then need scanning
+    diff_base: Optional[str] = None
+    # Extra details recorded in the scan state, by scanner
+    details: Dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def checkout(self) -> str:
+        if self.settings.cache_dir:
+            return os.path.join(self.settings.cache_dir, 'checkouts', self.repo.slug)
+        return os.path.join(self.settings.work_dir, self.repo.name)
+
+    def baseline_path(self, tool: str, extension: str = 'sarif') -> str:
+        """Where a scanner's latest full results for the repo are kept between runs."""
+        return os.path.join(self.settings.cache_dir, 'baselines', self.repo.slug, f'{tool}.{extension}')
+
+    async def keep_baseline(self, tool: str, path: str, extension: str = 'sarif') -> None:
+        """Copy a report to the cache, if there is one, as the scanner's latest results for the repo."""
+        if self.settings.cache_dir:
+            baseline = self.baseline_path(tool, extension)
+            os.makedirs(os.path.dirname(baseline), exist_ok=True)
+            await asyncio.to_thread(shutil.copyfile, path, baseline)
+
+    def report_path(self, suffix: str) -> str:
+        return os.path.join(self.settings.output_dir, f'{self.repo.name}-{suffix}')
+
+    def log_path(self, stage: str) -> str:
+        return os.path.join(self.settings.output_dir, 'logs', f'{self.repo.name}-{stage}.log')
+
+    async def run(self, stage: str, args: List[str], **kwargs):
+        """Run a command for a stage, logging to that stage's log file for this repo."""
+        kwargs.setdefault('env', self.settings.tool_env)
+        return await run_command(args, self.log_path(stage), secrets=self.settings.secrets, **kwargs)
+
+async def git(ctx: ScanContext, *args: str, capture: bool = False) -> Optional[str]:
+    return await ctx.run('clone', ['git', '-C', ctx.checkout, *args], capture=capture)
+
+def incremental_base(ctx: ScanContext) -> Optional[str]:
+    """
+    The commit semgrep last scanned, if only the files changed since then need scanning now.
+
+    That needs the cache, a stored baseline from the same semgrep version, and a
+    full scan within the last `full_rescan_days`.
+    """
+    settings = ctx.settings
+    if not settings.cache_dir or settings.state is None or settings.force or not settings.full_rescan_days:
+        return None
+    last = settings.state.last(ctx.repo.slug, 'semgrep')
+    if not last.get('sha') or last.get('version') != settings.tool_versions.get('semgrep'):
+        return None
+    if not os.path.exists(ctx.baseline_path('semgrep')) or not last.get('full_scan_at'):
+        return None
+    since_full_scan = datetime.datetime.now(datetime.timezone.utc) - datetime.datetime.fromisoformat(last['full_scan_at'])
+    if since_full_scan > datetime.timedelta(days=settings.full_rescan_days):
+        return None
+    return last['sha']
+
+async def clone(ctx: ScanContext) -> None:
+    """
+    Check out the repository's HEAD.
+
+    Without a cache this is a fresh shallow clone, as scan.sh does. With one, the
+    remote HEAD is looked up first: scanners whose results for that commit are
+    current are skipped, and if none are left the repo isn't fetched at all.
+    Otherwise the new commit is fetched shallowly into the cached checkout.
+    """
+    url = ctx.repo.clone_url(ctx.settings.github_token)
+    if not ctx.settings.cache_dir:
+        await asyncio.to_thread(shutil.rmtree, ctx.checkout, True)
+        await ctx.run('clone', ['git', 'clone', '--quiet', '--depth=1', url, ctx.checkout])
+        ctx.sha = (await git(ctx, 'rev-parse', 'HEAD', capture=True)).strip()
+        return
+
+    ctx.sha = (await ctx.run('clone', ['git', 'ls-remote', url, 'HEAD'], capture=True)).split()[0]
+    if ctx.settings.state is not None and not ctx.settings.force:
+        ctx.skip |= ctx.settings.state.unchanged(ctx.repo.slug, ctx.sha, ctx.settings.tool_versions)
+    if 'syft' in ctx.skip:
+        # Dependency Track already has this SBOM
+        ctx.skip.add('upload')
+        if 'grype' not in ctx.skip and not os.path.exists(ctx.baseline_path('syft', 'cdx.xml')):
+            # grype needs an SBOM to match against its new database
+            ctx.skip.discard('syft')
+    if not set(CHECKOUT_SCANNERS) & (set(ctx.settings.tool_versions) - ctx.skip):
+        # Nothing left that needs the source, e.g. only grype with a new database
+        return
+
+    if not os.path.isdir(os.path.join(ctx.checkout, '.git')):
+        os.makedirs(ctx.checkout, exist_ok=True)
+        await git(ctx, 'init', '--quiet')
+    # Fetch from the URL rather than a configured remote, so the token isn't stored in the cache
+    await git(ctx, 'fetch', '--quiet', '--depth=1', '--no-tags', url, ctx.sha)
+    await git(ctx, 'checkout', '--quiet', '--force', '--detach', ctx.sha)
+    await git(ctx, 'clean', '--quiet', '-ffdx')
+    # Lets git drop the objects of commits no longer checked out, once enough pile up
+    await git(ctx, 'gc', '--auto', '--quiet')
+
+    if 'semgrep' not in ctx.skip:
+        base = incremental_base(ctx)
+        if base is not None and base != ctx.sha:
+            try:
+                # The last scanned commit is normally still in the checkout, but may have been pruned
+                await git(ctx, 'cat-file', '-e', f'{base}^{{commit}}')
+            except CommandError:
+                try:
+                    await git(ctx, 'fetch', '--quiet', '--depth=1', '--no-tags', url, base)
+                except CommandError:
+                    base = None
+        ctx.diff_base = base
+
+async def syft(ctx: ScanContext) -> None:
+    """Write a CycloneDX SBOM of the checkout."""
+    path = ctx.report_path('cdx.xml')
+    await ctx.run('syft', ['syft', 'scan', '-v', '-o', f'cyclonedx-xml={path}', f'dir:{ctx.checkout}'])
+    await ctx.keep_baseline('syft', path, 'cdx.xml')
+    ctx.reports['syft'] = path
+
+async def grype(ctx: ScanContext) -> None:
+    """
+    Match the SBOM against grype's vulnerability database.
+
+    Uses this run's SBOM, or the cached one when syft had nothing new to scan.
+    """
+    sbom = ctx.reports.get('syft') or ctx.baseline_path('syft', 'cdx.xml')
+    path = ctx.report_path('grype.json')
+    await ctx.run('grype', ['grype', f'sbom:{sbom}', '-o', f'json={path}'])
+    ctx.reports['grype'] = path
+
+async def changed_files(ctx: ScanContext, base: str):
+    """
+    Returns:
+        The files added or modified and the files deleted between base and the checked out commit
+    """
+    output = await git(ctx, 'diff', '--name-status', '--no-renames', '-z', base, ctx.sha, capture=True)
+    fields = output.split('\0')
+    changed, deleted = [], []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        (deleted if status == 'D' else changed).append(path)
+    return changed, deleted
+
+async def semgrep(ctx: ScanContext) -> None:
+    """
+    Write semgrep findings for the checkout as SARIF.
+
+    When ctx.diff_base is set, only the files changed since that commit are
+    scanned, and their findings replace theirs in the stored baseline. Semgrep's
+    rules look at one file at a time, so this gives the same results as a full
+    scan as long as the rules are the same. New rules change the recorded
+    semgrep version, which makes the next scan a full one.
+    """
+    path = ctx.report_path('sca.sarif')
+    configs = ctx.settings.semgrep_rules or ['auto']
+    args = ['semgrep', 'scan', *(arg for config in configs for arg in ('--config', config)), '--sarif',
+            '--jobs', str(ctx.settings.semgrep_jobs), '--quiet']
+    if ctx.settings.semgrep_rules:
+        # Registry rules need metrics, local rule files don't
+        args += ['--metrics', 'off']
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+    changed = deleted = None
+    if ctx.diff_base is not None:
+        changed, deleted = await changed_files(ctx, ctx.diff_base)
+        if len(changed) > MAX_INCREMENTAL_FILES:
+            changed = None
+
+    if changed is None:
+        await ctx.run('semgrep', args + [f'--sarif-output={path}', '.'], cwd=ctx.checkout)
+        ctx.details['semgrep'] = {'full_scan_at': now, 'changed_files': None}
+    else:
+        delta = None
+        if changed:
+            delta_path = ctx.report_path('sca.delta.sarif')
+            await ctx.run('semgrep', args + [f'--sarif-output={delta_path}', '--', *changed], cwd=ctx.checkout)
+            delta = await asyncio.to_thread(load_sarif, delta_path)
+            os.remove(delta_path)
+        baseline = await asyncio.to_thread(load_sarif, ctx.baseline_path('semgrep'))
+        await asyncio.to_thread(write_sarif, merge_sarif(baseline, delta, changed + deleted), path)
+        last = ctx.settings.state.last(ctx.repo.slug, 'semgrep')
+        ctx.details['semgrep'] = {'full_scan_at': last['full_scan_at'], 'changed_files': len(changed) + len(deleted)}
+
+    await ctx.keep_baseline('semgrep', path)
+    ctx.reports['semgrep'] = path
+
+async def upload(ctx: ScanContext) -> None:
+    """Upload the SBOM to Dependency Track; does nothing if no SBOM was written."""
+    if 'syft' not in ctx.reports:
+        return
+    settings = ctx.settings
+    await ctx.run('upload', [
+        'curl', '--silent', '--show-error', '--fail', '--request', 'POST',
+        '--url', f'{settings.deptrack_url}/api/v1/bom',
+        '--header', f'X-Api-Key: {settings.deptrack_api_key}',
+        '--form', 'autoCreate=true',
+        '--form', f'projectName={ctx.repo.name}',
+        '--form', f'projectVersion={settings.project_version}',
+        '--form', 'isLatest=true',
+        '--form', f"bom=@{ctx.reports['syft']}",
+    ])
+
+async def index(ctx: ScanContext) -> None:
+    """
+    Add the repo's reports to the results index.
+
+    Scanners skipped for the repo have their previous results carried into this run.
+    """
+    settings = ctx.settings
+    if settings.index is None:
+        return
+    for tool in settings.tool_versions:
+        if tool in ctx.reports:
+            await asyncio.to_thread(settings.index.ingest, settings.run_id, ctx.repo.slug, tool, ctx.sha,
+                                    ctx.reports[tool])
+        elif tool in ctx.skip:
+            await asyncio.to_thread(settings.index.carry_forward, settings.run_id, ctx.repo.slug, tool)
+
+async def cleanup(ctx: ScanContext) -> None:
+    """Remove the checkout, unless it is kept in the cache for the next run."""
+    if not ctx.settings.cache_dir:
+        await asyncio.to_thread(shutil.rmtree, ctx.checkout, True)
+
+# Stages in pipeline order. Scanners run between clone and upload, and results are indexed last.
+STAGES = {
+    'clone': clone,
+    'syft': syft,
+    'grype': grype,
+    'semgrep': semgrep,
+    'upload': upload,
+    'index': index,
+}
+SCANNERS = ['syft', 'grype', 'semgrep']
+# Scanners that read the checkout rather than another scanner's report
+CHECKOUT_SCANNERS = ['syft', 'semgrep']
@@ -0,0 +1,77 @@
+import datetime
+import json
+import logging
+import os
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+class ScanState:
+    """
+    Remembers which commit of each repo every scanner last scanned, and with which version.
+
+    A scanner's results for a repo are still good while both the repo's HEAD and
+    the scanner's version are the same as when it last ran. The state is a JSON
+    file in the cache directory, rewritten after every successful repo, so an
+    interrupted run keeps what it finished.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.repos = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.repos = json.load(f).get('repos', {})
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable scan state %s: %s", path, e)
+
+    def last(self, slug: str, tool: str) -> dict:
+        """What a scanner last recorded for a repo: sha, version, scanned_at, report and any details, or an empty dict."""
+        return self.repos.get(slug, {}).get(tool, {})
+
+    def unchanged(self, slug: str, sha: str, versions: Dict[str, str]) -> Set[str]:
+        """
+        Args:
+            slug: The repo, owner/name
+            sha: The repo's current HEAD
+            versions: Version of each scanner in this run
+
+        Returns:
+            The scanners whose last results for the repo are still current
+        """
+        return {
+            tool for tool, version in versions.items()
+            if self.last(slug, tool).get('sha') == sha and self.last(slug, tool).get('version') == version
+        }
+
+    def record(self, slug: str, sha: str, versions: Dict[str, str], reports: Dict[str, str],
+               details: Dict[str, dict] = None) -> None:
+        """
+        Store that the given scanners scanned a repo at sha, and save the state.
+
+        Args:
+            slug: The repo, owner/name
+            sha: The commit that was scanned
+            versions: Version of each scanner that ran
+            reports: Report file each scanner wrote
+            details: Anything else to remember about a scanner's run, by scanner
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        entry = self.repos.setdefault(slug, {})
+        for tool, version in versions.items():
+            entry[tool] = {
+                'sha': sha,
+                'version': version,
+                'scanned_at': now,
+                'report': reports.get(tool),
+                **(details or {}).get(tool, {}),
+            }
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'repos': self.repos}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Dict, List
+from .process import run_command
+
+logger = logging.getLogger(__name__)
+
+VERSION = re.compile(r'\d+\.\d+(?:\.\d+)?\S*')
+GRYPE_DB_BUILT = re.compile(r'"?[Bb]uilt"?\s*[:=]\s*"?([^"\n,]+)')
+# Small files grype keeps next to its database that describe the build
+GRYPE_DB_METADATA = ('metadata.json', 'import.json')
+
+# Command printing each scanner's version
+VERSION_COMMANDS = {
+    'syft': ['syft', 'version'],
+    'semgrep': ['semgrep', '--version'],
+    'grype': ['grype', 'version'],
+}
+
+# Keeps the scanners from reaching out to the network on their own; rules and the
+# vulnerability database come from the cache prepared once per run instead
+OFFLINE_ENV = {
+    'SYFT_CHECK_FOR_APP_UPDATE': 'false',
+    'GRYPE_CHECK_FOR_APP_UPDATE': 'false',
+    'GRYPE_DB_AUTO_UPDATE': 'false',
+    'GRYPE_DB_VALIDATE_AGE': 'false',
+    'SEMGREP_ENABLE_VERSION_CHECK': '0',
+    'SEMGREP_SEND_METRICS': 'off',
+}
+
+SEMGREP_REGISTRY = 'https://semgrep.dev/c/'
+
+class ToolchainError(Exception):
+    """Raised when the scanners' rules or databases can't be made available."""
+
+@dataclass
+class Toolchain:
+    """The scanners, rules and databases every repo in a run is scanned with."""
+    # Version of each scanner, including its rules or database, so results are redone when either changes
+    versions: Dict[str, str] = field(default_factory=dict)
+    # Environment for every scanner command
+    env: Dict[str, str] = field(default_factory=dict)
+    # Rule files passed to semgrep with --config
+    semgrep_rules: List[str] = field(default_factory=list)
+
+def _pack_path(cache_dir: str, pack: str) -> str:
+    return os.path.join(cache_dir, 'semgrep-rules', pack.replace('/', '_') + '.yml')
+
+def _download(url: str, path: str) -> None:
+    request = urllib.request.Request(url, headers={'User-Agent': 'sca-scan', 'Accept': 'application/x-yaml'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        body = response.read()
+    if b'rules:' not in body[:4096]:
+        raise ToolchainError(f'{url} did not return a rule pack')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(body)
+    os.replace(f'{path}.tmp', path)
+
+async def semgrep_rules(cache_dir: str, packs: List[str], offline: bool) -> List[str]:
+    """
+    Make the semgrep registry rule packs available as local files.
+
+    Each pack is downloaded once per run, unless offline, and kept in the cache.
+    If a download fails the cached copy from an earlier run is used.
+
+    Raises:
+        ToolchainError: If a pack is neither downloadable nor cached
+    """
+    paths = []
+    for pack in packs:
+        path = _pack_path(cache_dir, pack)
+        if not offline:
+            try:
+                await asyncio.to_thread(_download, SEMGREP_REGISTRY + pack, path)
+            except Exception as e:
+                if not os.path.exists(path):
+                    raise ToolchainError(f'Could not download semgrep rules {pack}: {e}')
+                logger.warning("Could not download semgrep rules %s, using the cached copy: %s", pack, e)
+        elif not os.path.exists(path):
+            raise ToolchainError(f'semgrep rules {pack} are not in the cache at {path}; run once without --offline')
+        paths.append(path)
+    return paths
+
+def _digest(paths: List[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+async def grype_db(cache_dir: str, env: Dict[str, str], log_path: str, offline: bool) -> str:
+    """
+    Update grype's vulnerability database in the cache once, unless offline.
+
+    Returns:
+        When the database in the cache was built, or a digest of its metadata files if
+        grype doesn't report that
+
+    Raises:
+        ToolchainError: If there is no usable database, or nothing identifies it
+    """
+    try:
+        if not offline:
+            await run_command(['grype', 'db', 'update'], log_path, env=env)
+        status = await run_command(['grype', 'db', 'status'], log_path, env=env, capture=True)
+    except Exception as e:
+        raise ToolchainError(f'No usable grype database in {cache_dir}: {e}')
+    match = GRYPE_DB_BUILT.search(status)
+    if match:
+        return match.group(1).strip()
+
+    db_dir = env.get('GRYPE_DB_CACHE_DIR', cache_dir)
+    metadata = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(db_dir)
+        for name in names if name in GRYPE_DB_METADATA
+    )
+    if not metadata:
+        raise ToolchainError(f"Can't tell which grype database is in {db_dir}: "
+                             "grype db status shows no build date and there is no metadata file")
+    return _digest(metadata)
+
+async def prepare_toolchain(tools: List[str], cache_dir: str, log_path: str, semgrep_packs: List[str] = None,
+                            offline: bool = False) -> Toolchain:
+    """
+    Resolve the scanners' versions, rules and databases once for the whole run.
+
+    Args:
+        tools: The scanners that will run
+        cache_dir: Where rule packs and the vulnerability database are kept; may be a
+            mounted, versioned directory shared between runs and hosts
+        log_path: Log file for the commands run
+        semgrep_packs: Semgrep registry rule packs, e.g. p/default
+        offline: Only use what is already in the cache
+
+    Raises:
+        CommandError: If a scanner isn't installed or can't report its version
+        ToolchainError: If rules or databases are unavailable
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    toolchain = Toolchain(env=dict(OFFLINE_ENV))
+    if 'grype' in tools:
+        toolchain.env['GRYPE_DB_CACHE_DIR'] = os.path.join(cache_dir, 'grype-db')
+
+    for tool in tools:
+        output = await run_command(VERSION_COMMANDS[tool], log_path, env=toolchain.env, capture=True)
+        match = VERSION.search(output)
+        toolchain.versions[tool] = match.group(0) if match else output.strip()
+
+    if 'semgrep' in tools:
+        toolchain.semgrep_rules = await semgrep_rules(cache_dir, semgrep_packs or ['p/default'], offline)
+        toolchain.versions['semgrep'] += f'+rules.{_digest(toolchain.semgrep_rules)}'
+    if 'grype' in tools:
+        built = await grype_db(cache_dir, toolchain.env, log_path, offline)
+        toolchain.versions['grype'] += f'+db.{built}'
+
+    with open(os.path.join(cache_dir, 'toolchain.json'), 'w') as f:
+        json.dump({'versions': toolchain.versions, 'semgrep_rules': toolchain.semgrep_rules}, f, indent=2)
+    return toolchain
@@ -48,7 +48,8 @@ scan_repo() {
 
   # perform semgrep scan on the repo
   echo -e "---- Running semgrep on $repo_name\n"
-  semgrep scan --config auto --sarif --sarif-output=/output/reports/"$repo_name"-sca.sarif
+  # Run from the checkout, so semgrep scans the repo and reports paths relative to it
+  (cd "$local_dir" && semgrep scan --config auto --sarif --sarif-output=/output/reports/"$repo_name"-sca.sarif)
 
   
   # echo -e "---- Uploading to Dependency Track\n"
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# orchestrate.py and results.py run from src/, importing the scanner package from there
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
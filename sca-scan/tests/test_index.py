@@ -0,0 +1,87 @@
+import pytest
+from scanner.index import ResultsIndex, iter_cyclonedx_components
+
+SBOM = """<?xml version="1.0" encoding="UTF-8"?>
+<bom xmlns="http://cyclonedx.org/schema/bom/{version}" version="1">
+  <metadata>
+    <component type="application"><name>the-repo</name><version>1.0</version></component>
+  </metadata>
+  <components>
+    {components}
+  </components>
+  <dependencies><dependency ref="a"/></dependencies>
+</bom>
+"""
+
+def component(name, version, purl, group=None, nested=''):
+    group = f'<group>{group}</group>' if group else ''
+    nested = f'<components>{nested}</components>' if nested else ''
+    return (f'<component type="library">{group}<name>{name}</name><version>{version}</version>'
+            f'<purl>{purl}</purl>{nested}</component>')
+
+def write_sbom(path, *components, version='1.4'):
+    path.write_text(SBOM.format(version=version, components='\n'.join(components)))
+    return str(path)
+
+@pytest.mark.parametrize('version', ['1.4', '1.5'])
+def test_components_include_nested_ones_but_not_the_described_one(tmp_path, version):
+    path = write_sbom(
+        tmp_path / 'repo-cdx.xml',
+        component('log4j-core', '2.14.1', 'pkg:maven/org.apache.logging.log4j/log4j-core@2.14.1',
+                  group='org.apache.logging.log4j',
+                  nested=component('log4j-api', '2.14.1', 'pkg:maven/org.apache.logging.log4j/log4j-api@2.14.1')),
+        component('lodash', '4.17.21', 'pkg:npm/lodash@4.17.21'),
+        version=version,
+    )
+    assert list(iter_cyclonedx_components(path)) == [
+        {'name': 'log4j-api', 'group': None, 'version': '2.14.1',
+         'purl': 'pkg:maven/org.apache.logging.log4j/log4j-api@2.14.1', 'type': 'library'},
+        {'name': 'log4j-core', 'group': 'org.apache.logging.log4j', 'version': '2.14.1',
+         'purl': 'pkg:maven/org.apache.logging.log4j/log4j-core@2.14.1', 'type': 'library'},
+        {'name': 'lodash', 'group': None, 'version': '4.17.21', 'purl': 'pkg:npm/lodash@4.17.21',
+         'type': 'library'},
+    ]
+
+def test_components_without_a_namespace(tmp_path):
+    path = tmp_path / 'plain-cdx.xml'
+    path.write_text('<bom><components>' + component('six', '1.16.0', 'pkg:pypi/six@1.16.0') + '</components></bom>')
+    assert [found['name'] for found in iter_cyclonedx_components(str(path))] == ['six']
+
+@pytest.fixture
+def index(tmp_path):
+    index = ResultsIndex(':memory:')
+    run_id = index.start_run()
+    index.ingest(run_id, 'org/web', 'syft', 'abc', write_sbom(
+        tmp_path / 'web-cdx.xml',
+        component('foo_bar', '1.0.0', 'pkg:npm/foo_bar@1.0.0'),
+        component('lodash', '4.17.20', 'pkg:npm/lodash@4.17.20'),
+    ))
+    index.ingest(run_id, 'org/api', 'syft', 'def', write_sbom(
+        tmp_path / 'api-cdx.xml',
+        component('fooxbar', '2.0.0', 'pkg:npm/fooxbar@2.0.0'),
+        component('Foo_Bar', '3.0.0', 'pkg:npm/Foo_Bar@3.0.0'),
+        component('lodash', '4.17.21', 'pkg:npm/lodash@4.17.21'),
+        component('log4j-core', '2.14.1', 'pkg:maven/org.apache.logging.log4j/log4j-core@2.14.1',
+                  group='org.apache.logging.log4j'),
+    ))
+    yield index
+    index.close()
+
+def purls(rows):
+    return [row['purl'] for row in rows]
+
+def test_purl_match_treats_underscore_and_percent_literally(index):
+    assert purls(index.find_package('pkg:npm/foo_bar')) == ['pkg:npm/foo_bar@1.0.0']
+    assert purls(index.find_package('pkg:npm/foo%')) == []
+    assert purls(index.find_package('pkg:npm/foo')) == []
+
+def test_purl_match_is_case_sensitive(index):
+    assert purls(index.find_package('pkg:npm/Foo_Bar')) == ['pkg:npm/Foo_Bar@3.0.0']
+
+def test_find_by_name_group_and_version(index):
+    assert [row['repo'] for row in index.find_package('lodash')] == ['org/api', 'org/web']
+    assert purls(index.find_package('lodash', version='4.17.21')) == ['pkg:npm/lodash@4.17.21']
+    # Ordered by repo, then version
+    assert purls(index.find_package('lodash', version='4.17.2*')) == ['pkg:npm/lodash@4.17.21',
+                                                                       'pkg:npm/lodash@4.17.20']
+    assert [row['repo'] for row in index.find_package('org.apache.logging.log4j/log4j-core')] == ['org/api']
@@ -0,0 +1,53 @@
+from scanner.sarif import merge_sarif, result_uri
+
+def result(rule, path, line=1, rule_index=None):
+    found = {
+        'ruleId': rule,
+        'message': {'text': f'{rule} in {path}'},
+        'locations': [{'physicalLocation': {'artifactLocation': {'uri': path}, 'region': {'startLine': line}}}],
+    }
+    if rule_index is not None:
+        found['ruleIndex'] = rule_index
+    return found
+
+def sarif(results, rules=()):
+    return {'runs': [{'tool': {'driver': {'name': 'semgrep', 'rules': [{'id': rule} for rule in rules]}},
+                      'results': results}]}
+
+def findings(merged):
+    return sorted((found['ruleId'], result_uri(found)) for found in merged['runs'][0]['results'])
+
+def test_changed_files_take_their_results_from_the_delta():
+    baseline = sarif([result('r1', 'a.py'), result('r2', 'b.py'), result('r1', 'c.py')], rules=['r1', 'r2'])
+    delta = sarif([result('r3', 'b.py', rule_index=0)], rules=['r3'])
+
+    merged = merge_sarif(baseline, delta, ['b.py'])
+    assert findings(merged) == [('r1', 'a.py'), ('r1', 'c.py'), ('r3', 'b.py')]
+    assert [rule['id'] for rule in merged['runs'][0]['tool']['driver']['rules']] == ['r1', 'r2', 'r3']
+
+def test_fixed_files_lose_their_results():
+    baseline = sarif([result('r1', 'a.py'), result('r1', 'b.py')])
+    merged = merge_sarif(baseline, sarif([]), ['a.py'])
+    assert findings(merged) == [('r1', 'b.py')]
+
+def test_deleted_files_are_dropped_without_a_delta():
+    baseline = sarif([result('r1', './a.py'), result('r1', 'b.py')])
+    merged = merge_sarif(baseline, None, ['a.py'])
+    assert findings(merged) == [('r1', 'b.py')]
+
+def test_delta_rule_indexes_are_dropped_and_rules_not_duplicated():
+    baseline = sarif([result('r1', 'a.py', rule_index=0)], rules=['r1'])
+    delta = sarif([result('r1', 'b.py', rule_index=1), result('r2', 'b.py', rule_index=0)], rules=['r2', 'r1'])
+
+    merged = merge_sarif(baseline, delta, ['b.py'])
+    run = merged['runs'][0]
+    assert [rule['id'] for rule in run['tool']['driver']['rules']] == ['r1', 'r2']
+    # The baseline's own indexes still point into its rules; the delta's would not
+    assert run['results'][0]['ruleIndex'] == 0
+    assert all('ruleIndex' not in found for found in run['results'][1:])
+
+def test_baseline_without_rules_gets_the_delta_rules():
+    baseline = {'runs': [{'results': []}]}
+    merged = merge_sarif(baseline, sarif([result('r1', 'a.py')], rules=['r1']), ['a.py'])
+    assert merged['runs'][0]['tool']['driver']['rules'] == [{'id': 'r1'}]
+    assert findings(merged) == [('r1', 'a.py')]
@@ -0,0 +1,193 @@
+"""
+Runs commands end to end through SlackBot.handle_message against a local fake
+Slack API (see fake_slack.py) and reports latency percentiles, Slack API requests
+per command and the memory high-water mark.
+
+Each command runs --iterations times on distinct channels, so the first pass
+measures cold caches; later passes (--passes) repeat the same channels with
+warm caches. The summarizer is the placeholder backend with --summarizer-delay
+seconds per call, so results reflect the command pipeline rather than an LLM.
+The bot's client-side pacing to Slack's rate limit tiers is lifted unless
+--paced is given, since a cold summary of a busy channel otherwise spends most
+of its time waiting for conversations.replies (Tier 3, 50 per minute).
+Likewise admission control is lifted unless --admission is given, so runs with
+--concurrency aren't turned away.
+Save results with --output and fail on regressions against a saved run with
+--compare. Run from the steve-bot directory:
+
+    python benchmarks/bench_commands.py [--iterations 10] [--passes 2] [--concurrency 1]
+    python benchmarks/bench_commands.py --messages 5000 --threads 500 --latency 0.05 --rate-limit 0.02
+    python benchmarks/bench_commands.py --output baseline.json
+    python benchmarks/bench_commands.py --compare baseline.json [--tolerance 0.25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, '..', 'src')
+
+from fake_slack import add_workspace_arguments, build_server
+
+DEFAULT_COMMANDS = ['help', 'channel-info', 'summarize', 'summarize 7']
+PASS_NAMES = ['cold', 'warm']
+
+def percentile(values, pct):
+    """The pct-th percentile of values, interpolated."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+async def run(options):
+    os.environ.setdefault('HISTORY_CACHE_PATH', ':memory:')
+    os.environ.setdefault('SUMMARY_BACKEND', 'placeholder')
+    sys.path.insert(0, SRC)
+    from slack_sdk.web.async_client import AsyncWebClient
+    from bot import SlackBot
+    from utils import AdmissionController, RateLimiter
+    from utils.rate_limiter import TIER_LIMITS
+
+    commands = options.commands or DEFAULT_COMMANDS
+    options.channels = options.channels or options.iterations * len(commands)
+    server = build_server(options)
+    base_url = await server.start()
+
+    bot = SlackBot(AsyncWebClient(token='xoxp-benchmark', base_url=base_url))
+    if not options.paced:
+        bot.client.wrapped.limiter = RateLimiter({tier: (10 ** 9, 10 ** 9) for tier in TIER_LIMITS})
+    if not options.admission:
+        bot.admission = AdmissionController(max_per_user=10 ** 9, max_per_channel=10 ** 9,
+                                             budget=10 ** 9, max_pending=10 ** 9)
+    await bot.initialize()
+    bot.commands['summarize'].engine.backend.delay = options.summarizer_delay
+    channels = list(server.workspace.channels)
+    semaphore = asyncio.Semaphore(options.concurrency)
+    baseline_rss = peak_rss_mb()
+
+    async def invoke(command, i):
+        # Spread runs over channels and users, as --admission limits them per channel and user
+        event = {
+            'type': 'app_mention',
+            'channel': channels[(k * options.iterations + i) % len(channels)],
+            'user': server.workspace.users[i % len(server.workspace.users)]['id'],
+            'text': f'<@{bot.bot_user_id}> {command}',
+            'ts': f'{time.time():.6f}',
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            await bot.handle_message(event)
+            return time.perf_counter() - start
+
+    results = {}
+    for pass_number in range(options.passes):
+        pass_name = PASS_NAMES[min(pass_number, 1)] + (f'{pass_number}' if pass_number > 1 else '')
+        for k, command in enumerate(commands):
+            server.calls.clear()
+            server.rate_limited.clear()
+            if options.trace_memory:
+                tracemalloc.reset_peak()
+            timings = await asyncio.gather(*(invoke(command, i) for i in range(options.iterations)))
+            results[f'{pass_name}:{command}'] = {
+                'p50_ms': percentile(timings, 50) * 1000,
+                'p99_ms': percentile(timings, 99) * 1000,
+                'api_calls': sum(server.calls.values()) / options.iterations,
+                'rate_limited': sum(server.rate_limited.values()),
+                'calls_by_method': {method: count / options.iterations for method, count in sorted(server.calls.items())},
+                'traced_peak_mb': tracemalloc.get_traced_memory()[1] / (1024 * 1024) if options.trace_memory else None,
+            }
+
+    await server.stop()
+    return {
+        'workspace': {
+            'channels': options.channels,
+            'messages': options.messages,
+            'threads': options.threads,
+            'replies': options.replies,
+            'users': options.users,
+            'latency': options.latency,
+            'rate_limit': options.rate_limit,
+        },
+        'results': results,
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def report(summary, verbose):
+    workspace = summary['workspace']
+    print(f"Fake Slack: {workspace['channels']} channels x {workspace['messages']} messages, "
+          f"{workspace['threads']} threads x {workspace['replies']} replies, {workspace['users']} users, "
+          f"{workspace['latency'] * 1000:.0f} ms latency, {workspace['rate_limit']:.0%} rate limited")
+    print(f"  {'pass:command':<24} {'p50 ms':>9} {'p99 ms':>9} {'API calls':>10} {'429s':>5} {'traced MB':>10}")
+    for name, result in summary['results'].items():
+        traced = f"{result['traced_peak_mb']:10.1f}" if result['traced_peak_mb'] is not None else f"{'-':>10}"
+        print(f"  {name:<24} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f} "
+              f"{result['api_calls']:10.1f} {result['rate_limited']:5d} {traced}")
+        if verbose:
+            for method, count in result['calls_by_method'].items():
+                print(f"      {method:<28} {count:6.1f}")
+    print(f"  peak RSS {summary['peak_rss_mb']:.1f} MB "
+          f"({summary['peak_rss_mb'] - summary['baseline_rss_mb']:+.1f} MB after setup)")
+
+def compare(summary, baseline, tolerance):
+    """List the measurements that got worse than the baseline by more than the tolerance."""
+    regressions = []
+    for name, base in baseline['results'].items():
+        current = summary['results'].get(name)
+        if current is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms', 'api_calls'):
+            if current[metric] > base[metric] * (1 + tolerance) and current[metric] - base[metric] > 0.5:
+                regressions.append(f"{name} {metric}: {base[metric]:.1f} -> {current[metric]:.1f}")
+    if summary['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak_rss_mb: {baseline['peak_rss_mb']:.1f} -> {summary['peak_rss_mb']:.1f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('commands', nargs='*', help=f'command texts to run (default: {", ".join(DEFAULT_COMMANDS)})')
+    parser.add_argument('--iterations', type=int, default=10, help='runs of each command per pass')
+    parser.add_argument('--passes', type=int, default=2, help='passes over the same channels; the first is cold')
+    parser.add_argument('--concurrency', type=int, default=1, help='runs of a command in flight at once')
+    parser.add_argument('--summarizer-delay', type=float, default=0.0, help='seconds per placeholder summarizer call')
+    parser.add_argument('--paced', action='store_true', help="keep the bot's pacing to Slack's rate limit tiers")
+    parser.add_argument('--admission', action='store_true', help="keep the bot's admission control limits")
+    parser.add_argument('--trace-memory', action='store_true', help='report Python allocation peaks (slows runs down)')
+    parser.add_argument('--verbose', action='store_true', help='show API calls per method')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='exit with status 1 if results regress against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed regression before --compare fails')
+    add_workspace_arguments(parser)
+    parser.set_defaults(channels=0)
+    options = parser.parse_args()
+
+    if options.trace_memory:
+        tracemalloc.start()
+    summary = asyncio.run(run(options))
+    report(summary, options.verbose)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if options.compare:
+        with open(options.compare) as f:
+            regressions = compare(summary, json.load(f), options.tolerance)
+        if regressions:
+            print(f"Regressions beyond {options.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {options.tolerance:.0%} against {options.compare}")
+
+if __name__ == '__main__':
+    main()
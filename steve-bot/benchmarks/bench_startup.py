@@ -0,0 +1,82 @@
+"""
+Measures bot startup cost: importing the bot module, constructing SlackBot and
+loading each command on first use.
+
+Every run happens in a fresh Python process so module imports are cold. Run
+from the steve-bot directory:
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, '..', 'src')
+
+def run_child():
+    """Time one cold startup and print the results as JSON."""
+    os.environ.setdefault('HISTORY_CACHE_PATH', ':memory:')
+    sys.path.insert(0, SRC)
+    # Start outside src to prove startup doesn't depend on the working directory
+    os.chdir(HERE)
+
+    start = time.perf_counter()
+    from slack_sdk.web.async_client import AsyncWebClient
+    sdk_import = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from bot import SlackBot
+    bot_import = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bot = SlackBot(AsyncWebClient(token='xoxp-benchmark'))
+    construction = time.perf_counter() - start
+
+    commands = {}
+    for keyword in bot.commands:
+        bot.commands[keyword]
+        commands[keyword] = bot.commands.load_times[keyword]
+
+    print(json.dumps({
+        'slack_sdk import': sdk_import,
+        'bot import': bot_import,
+        'SlackBot()': construction,
+        'commands': commands,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    if options.child:
+        run_child()
+        return
+
+    results = []
+    for _ in range(options.runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child'],
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    def report(name, values):
+        print(f"  {name:<36} median {statistics.median(values) * 1000:8.2f} ms")
+
+    print(f"Startup cost, median of {options.runs} cold processes")
+    for stage in ('slack_sdk import', 'bot import', 'SlackBot()'):
+        report(stage, [result[stage] for result in results])
+    print("First use of each command (import + construction)")
+    for keyword in results[0]['commands']:
+        report(keyword, [result['commands'][keyword] for result in results])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Micro-benchmarks for building summary transcripts.
+
+Compares the original string-concatenation approach against TranscriptBuilder
+on a synthetic channel. Run from the steve-bot directory:
+
+    python benchmarks/bench_transcript.py [--messages 10000] [--days 7] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils import TranscriptBuilder
+
+def synthetic_channel(message_count: int, days: int = 7, reply_ratio: float = 0.3, seed: int = 42):
+    """Generate (ts, user_name, text, in_thread) tuples spread evenly over the last `days` days."""
+    rng = random.Random(seed)
+    start = time.time() - days * 86400
+    step = days * 86400 / message_count
+    words = "deploy review incident ticket release build test merge rollback alert".split()
+    return [
+        (
+            f"{start + i * step:.6f}",
+            f"User {rng.randrange(300)}",
+            " ".join(rng.choice(words) for _ in range(rng.randrange(5, 40))),
+            rng.random() < reply_ratio,
+        )
+        for i in range(message_count)
+    ]
+
+def build_concatenated(messages):
+    conversation_text = ""
+    for ts, user_name, text, in_thread in messages:
+        time_str = datetime.fromtimestamp(float(ts)).strftime('%H:%M')
+        marker = " (in thread)" if in_thread else ""
+        conversation_text += f"[{time_str}] {user_name}{marker}: {text}\n"
+    return conversation_text
+
+def build_with_builder(messages, max_chars=None):
+    transcript = TranscriptBuilder(max_chars=max_chars)
+    for ts, user_name, text, in_thread in messages:
+        transcript.add_message(ts, user_name, text, in_thread=in_thread)
+    return transcript.build()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    messages = synthetic_channel(options.messages, days=options.days)
+    assert build_concatenated(messages) == build_with_builder(messages)
+
+    cases = [
+        ('string concatenation', lambda: build_concatenated(messages)),
+        ('TranscriptBuilder', lambda: build_with_builder(messages)),
+        ('TranscriptBuilder, 200k char budget', lambda: build_with_builder(messages, max_chars=200000)),
+    ]
+    print(f"{options.messages} messages over {options.days} day(s), best of {options.repeat} runs")
+    for name, case in cases:
+        best = min(timeit.repeat(case, number=1, repeat=options.repeat))
+        print(f"  {name:<40} {best * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+A local fake of the Slack Web API for benchmarks, serving a synthetic workspace.
+
+Every channel holds the same number of messages spread over the lookback window,
+some of them thread parents with replies, written by a fixed pool of users. The
+server answers the methods the bot calls (paginated like Slack), can add latency
+to every request and can answer a share of requests with HTTP 429 and a
+Retry-After header. Point the bot at it with base_url, or run it standalone and
+set SLACK_API_URL, e.g. for lambda_replay.py:
+
+    python benchmarks/fake_slack.py --port 8765 --messages 2000 --threads 100
+    SLACK_API_URL=http://127.0.0.1:8765/api/ python benchmarks/lambda_replay.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from aiohttp import web
+
+WORDS = (
+    'deploy release build review merge branch ticket incident alert latency queue '
+    'cache schema migration rollback config secret token scan report dashboard '
+    'customer sprint meeting agenda budget estimate design api endpoint timeout'
+).split()
+
+class FakeSlackWorkspace:
+    """Deterministic synthetic channels, threads and users."""
+
+    def __init__(self, channels: int = 10, messages: int = 500, threads: int = 50, replies: int = 5,
+                 users: int = 50, days: float = 7, members: int = 250, seed: int = 0):
+        """
+        Args:
+            channels: Number of channels, with IDs C0000, C0001, ...
+            messages: Top-level messages per channel
+            threads: Messages per channel that are thread parents
+            replies: Replies per thread
+            users: Number of users writing the messages
+            days: Messages are spread evenly over this many days up to now
+            members: Members per channel
+            seed: Seed for the generated text
+        """
+        rng = random.Random(seed)
+        now = time.time()
+        self.users = [
+            {'id': f'U{i:05d}', 'name': f'user{i}', 'real_name': f'User Number {i}', 'profile': {}}
+            for i in range(users)
+        ]
+        self.channels = {}
+        self.history = {}
+        self.threads = {}
+        self.member_count = members
+        thread_every = max(messages // threads, 1) if threads else 0
+
+        for c in range(channels):
+            channel = f'C{c:04d}'
+            self.channels[channel] = {
+                'id': channel,
+                'name': f'bench-{c}',
+                'created': int(now - 365 * 86400),
+                'creator': self.users[0]['id'],
+                'is_private': False,
+                'is_archived': False,
+                'topic': {'value': f'Benchmark channel {c}'},
+                'purpose': {'value': 'Synthetic workspace for benchmarks'},
+            }
+            step = days * 86400 / max(messages, 1)
+            messages_list = []
+            for m in range(messages):
+                ts = now - days * 86400 + m * step
+                text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+                if m % 40 == 0:
+                    text = f'Topic: {rng.choice(WORDS)} {rng.choice(WORDS)}\n{text}'
+                message = {'type': 'message', 'user': rng.choice(self.users)['id'], 'text': text, 'ts': f'{ts:.6f}'}
+                if thread_every and m % thread_every == 0 and len(self.threads) < (c + 1) * threads:
+                    thread = [message]
+                    for r in range(replies):
+                        thread.append({
+                            'type': 'message',
+                            'user': rng.choice(self.users)['id'],
+                            'text': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 15))),
+                            'ts': f'{ts + (r + 1) * min(step / (replies + 1), 60):.6f}',
+                            'thread_ts': message['ts'],
+                        })
+                    message.update(thread_ts=message['ts'], reply_count=replies, latest_reply=thread[-1]['ts'])
+                    self.threads[(channel, message['ts'])] = thread
+                messages_list.append(message)
+            # Newest first, as Slack returns them
+            self.history[channel] = messages_list[::-1]
+        self.users_by_id = {user['id']: user for user in self.users}
+
+def _page(items, params, default_limit=100):
+    """Slice one page of items using Slack's cursor pagination."""
+    limit = int(params.get('limit') or default_limit)
+    offset = int(params.get('cursor') or 0)
+    page = items[offset:offset + limit]
+    next_offset = offset + limit
+    next_cursor = str(next_offset) if next_offset < len(items) else ''
+    return page, {'next_cursor': next_cursor}
+
+class FakeSlackServer:
+    """Serves a FakeSlackWorkspace over HTTP at /api/<method>."""
+
+    def __init__(self, workspace: FakeSlackWorkspace, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit: float = 0.0, retry_after: float = 1.0, seed: int = 0):
+        """
+        Args:
+            workspace: The data to serve
+            latency: Seconds added to every request
+            jitter: Up to this many extra seconds added at random
+            rate_limit: Share of requests (0-1) answered with HTTP 429
+            retry_after: Retry-After value sent with 429 responses
+            seed: Seed for jitter and rate limiting
+        """
+        self.workspace = workspace
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self._rng = random.Random(seed)
+        self._runner = None
+        self.port = None
+
+    def handlers(self):
+        return {
+            'auth.test': self.auth_test,
+            'chat.postMessage': self.chat_post_message,
+            'chat.update': self.chat_update,
+            'conversations.history': self.conversations_history,
+            'conversations.info': self.conversations_info,
+            'conversations.members': self.conversations_members,
+            'conversations.replies': self.conversations_replies,
+            'users.info': self.users_info,
+            'users.list': self.users_list,
+        }
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start serving; returns the base URL to hand to AsyncWebClient."""
+        app = web.Application()
+        app.router.add_route('*', '/api/{method}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f'http://{host}:{self.port}/api/'
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        params = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == 'application/json':
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        self.calls[method] += 1
+
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.rate_limit and self._rng.random() < self.rate_limit:
+            self.rate_limited[method] += 1
+            return web.json_response(
+                {'ok': False, 'error': 'ratelimited'},
+                status=429,
+                headers={'Retry-After': str(self.retry_after)}
+            )
+
+        handler = self.handlers().get(method)
+        if handler is None:
+            return web.json_response({'ok': False, 'error': 'unknown_method'})
+        body = handler(params)
+        return web.Response(text=json.dumps(body), content_type='application/json')
+
+    def _channel(self, params):
+        return self.workspace.channels.get(params.get('channel'))
+
+    def auth_test(self, params):
+        return {'ok': True, 'user_id': 'UBENCHBOT', 'user': 'benchbot', 'team': 'Bench', 'team_id': 'T0'}
+
+    def chat_post_message(self, params):
+        return {'ok': True, 'channel': params.get('channel'), 'ts': f'{time.time():.6f}'}
+
+    def chat_update(self, params):
+        return {'ok': True, 'channel': params.get('channel'), 'ts': params.get('ts')}
+
+    def conversations_info(self, params):
+        channel = self._channel(params)
+        if channel is None:
+            return {'ok': False, 'error': 'channel_not_found'}
+        channel = dict(channel)
+        if str(params.get('include_num_members')).lower() in ('1', 'true'):
+            channel['num_members'] = self.workspace.member_count
+        return {'ok': True, 'channel': channel}
+
+    def conversations_members(self, params):
+        if self._channel(params) is None:
+            return {'ok': False, 'error': 'channel_not_found'}
+        members = [f'U{i:05d}' for i in range(self.workspace.member_count)]
+        page, metadata = _page(members, params)
+        return {'ok': True, 'members': page, 'response_metadata': metadata}
+
+    def conversations_history(self, params):
+        if self._channel(params) is None:
+            return {'ok': False, 'error': 'channel_not_found'}
+        oldest = float(params.get('oldest') or 0)
+        latest = float(params.get('latest') or 'inf')
+        messages = [msg for msg in self.workspace.history[params['channel']] if oldest < float(msg['ts']) < latest]
+        page, metadata = _page(messages, params)
+        return {'ok': True, 'messages': page, 'has_more': bool(metadata['next_cursor']), 'response_metadata': metadata}
+
+    def conversations_replies(self, params):
+        thread = self.workspace.threads.get((params.get('channel'), params.get('ts')))
+        if thread is None:
+            return {'ok': False, 'error': 'thread_not_found'}
+        page, metadata = _page(thread, params)
+        return {'ok': True, 'messages': page, 'has_more': bool(metadata['next_cursor']), 'response_metadata': metadata}
+
+    def users_info(self, params):
+        user = self.workspace.users_by_id.get(params.get('user'))
+        if user is None:
+            return {'ok': False, 'error': 'user_not_found'}
+        return {'ok': True, 'user': user}
+
+    def users_list(self, params):
+        page, metadata = _page(self.workspace.users, params, default_limit=200)
+        return {'ok': True, 'members': page, 'response_metadata': metadata}
+
+def add_workspace_arguments(parser):
+    """Options shared by every script that builds a fake workspace and server."""
+    parser.add_argument('--channels', type=int, default=10, help='number of channels')
+    parser.add_argument('--messages', type=int, default=500, help='top-level messages per channel')
+    parser.add_argument('--threads', type=int, default=50, help='thread parents per channel')
+    parser.add_argument('--replies', type=int, default=5, help='replies per thread')
+    parser.add_argument('--users', type=int, default=50, help='users in the workspace')
+    parser.add_argument('--days', type=float, default=7, help='days the messages are spread over')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every API request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds per request')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='share of requests answered with HTTP 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generated data, jitter and 429s')
+
+def build_server(options) -> FakeSlackServer:
+    workspace = FakeSlackWorkspace(
+        channels=options.channels,
+        messages=options.messages,
+        threads=options.threads,
+        replies=options.replies,
+        users=options.users,
+        days=options.days,
+        seed=options.seed
+    )
+    return FakeSlackServer(
+        workspace,
+        latency=options.latency,
+        jitter=options.jitter,
+        rate_limit=options.rate_limit,
+        retry_after=options.retry_after,
+        seed=options.seed
+    )
+
+async def serve(options):
+    server = build_server(options)
+    url = await server.start(options.host, options.port)
+    print(f"Fake Slack API listening on {url} (channels C0000-C{options.channels - 1:04d})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_workspace_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Replays recorded API Gateway events against the Lambda handler and reports
+cold-start versus warm-invocation latency.
+
+Each cold start runs in a fresh Python process: the handler module is imported
+(building the bot and client) and the events are invoked in order, the first
+one cold and every repeat warm. Event IDs are made unique per replay so the
+deduplicator doesn't short-circuit repeats. Commands run inline against the
+local fake Slack API from fake_slack.py, started for the run, unless SLACK_API_URL
+points somewhere else. Run from the steve-bot directory:
+
+    python benchmarks/lambda_replay.py [--cold-starts 5] [--warm 20] [events ...]
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, '..', 'src')
+
+from fake_slack import add_workspace_arguments, build_server
+
+class ReplayContext:
+    """Minimal stand-in for the Lambda context object; no ARN means commands run inline."""
+    invoked_function_arn = None
+    function_name = 'steve-bot-replay'
+
+def unique_event(event, suffix):
+    """Copy an API Gateway event, making its Slack event_id unique."""
+    event = dict(event)
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError:
+        return event
+    if 'event_id' in body:
+        body['event_id'] = f"{body['event_id']}-{suffix}"
+        event['body'] = json.dumps(body)
+    return event
+
+@contextlib.contextmanager
+def fake_slack_api(options):
+    """Serve a fake Slack API on a background thread for the duration of the block, yielding its URL."""
+    server = build_server(options)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def run_child(event_files, warm):
+    """Import the handler and replay the events, printing timings as JSON."""
+    # The token below is fake, so never let it reach the real Slack API
+    if not os.getenv('SLACK_API_URL'):
+        sys.exit("SLACK_API_URL is not set; run without --child to start a fake Slack API")
+    os.environ.setdefault('SLACK_USER_TOKEN', 'xoxp-replay')
+    os.environ['DEFER_COMMANDS'] = 'false'
+    sys.path.insert(0, SRC)
+    os.chdir(SRC)
+
+    start = time.perf_counter()
+    import lambda_handler
+    import_seconds = time.perf_counter() - start
+
+    events = {}
+    for path in event_files:
+        with open(path) as f:
+            events[os.path.basename(path)] = json.load(f)
+
+    results = {'import': import_seconds, 'events': {}}
+    context = ReplayContext()
+    for name, event in events.items():
+        timings = []
+        for i in range(warm + 1):
+            start = time.perf_counter()
+            response = lambda_handler.lambda_handler(unique_event(event, f"{os.getpid()}-{i}"), context)
+            timings.append(time.perf_counter() - start)
+            if response.get('statusCode') != 200:
+                print(f"{name}: {response}", file=sys.stderr)
+        results['events'][name] = timings
+    print(json.dumps(results))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('events', nargs='*', help='API Gateway event JSON files (default: benchmarks/events/*.json)')
+    parser.add_argument('--cold-starts', type=int, default=5, help='number of fresh processes')
+    parser.add_argument('--warm', type=int, default=20, help='warm invocations per event per process')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    add_workspace_arguments(parser)
+    options = parser.parse_args()
+
+    event_files = [os.path.abspath(path) for path in options.events] or sorted(glob.glob(os.path.join(HERE, 'events', '*.json')))
+    if options.child:
+        run_child(event_files, options.warm)
+        return
+
+    imports = []
+    cold = {}
+    warm = {}
+    api_url = os.getenv('SLACK_API_URL')
+    with contextlib.nullcontext(api_url) if api_url else fake_slack_api(options) as api_url:
+        for _ in range(options.cold_starts):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', '--warm', str(options.warm)] + event_files,
+                check=True,
+                capture_output=True,
+                text=True,
+                env=dict(os.environ, SLACK_API_URL=api_url)
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            imports.append(result['import'])
+            for name, timings in result['events'].items():
+                cold.setdefault(name, []).append(timings[0])
+                warm.setdefault(name, []).extend(timings[1:])
+
+    print(f"{options.cold_starts} cold starts, {options.warm} warm invocations per event each against {api_url}")
+    print(f"  module import (bot construction)  median {statistics.median(imports) * 1000:8.2f} ms")
+    for name in cold:
+        print(f"  {name}")
+        print(f"    cold  median {statistics.median(cold[name]) * 1000:8.2f} ms")
+        if warm[name]:
+            print(f"    warm  median {statistics.median(warm[name]) * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
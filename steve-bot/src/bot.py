@@ -1,11 +1,36 @@
+import logging
 import os
-import importlib
-import pkgutil
+import time
 from datetime import datetime, timedelta
+from typing import Optional
 from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
-from commands import base_command
-from utils import SlackErrorHandler
+from commands import create_registry
+from commands.arguments import ArgumentError
+from router import CommandRouter
+from utils import (
+    AdmissionController,
+    AdmissionError,
+    SlackErrorHandler,
+    CachingWebClient,
+    ChannelDirectory,
+    HistoryCache,
+    InstrumentedWebClient,
+    ProgressMessage,
+    RateLimitedWebClient,
+    REGISTRY,
+    SummaryCache,
+    UserDirectory,
+    command_context,
+)
+
+logger = logging.getLogger(__name__)
+
+COMMAND_DURATION = REGISTRY.histogram(
+    'steve_command_duration_seconds',
+    'Time from routing a command to sending its response, by command and outcome',
+    ['command', 'outcome']
+)
 
 class SlackBot:
     _instance = None
@@ -16,48 +41,159 @@ class SlackBot:
         return cls._instance
 
     def __init__(self, client: AsyncWebClient):
-        self.client = client
-        self.commands = {}
+        # The raw client, for consumers that need the real AsyncWebClient (e.g. Socket Mode)
+        self.web_client = client
+        # Commands get a client that coalesces and caches repeated read calls, and
+        # paces the remaining calls to Slack's rate limits, retrying transient errors.
+        # Requests that reach Slack are counted and timed per command.
+        self.client = CachingWebClient(RateLimitedWebClient(InstrumentedWebClient(client)))
         self.bot_user_id = None
+        # The bot's display name, from the same auth_test call
+        self.bot_name = None
+        # Whether auth_test has answered; the name may still be None if it had none
+        self.identified = False
+        # Shared across commands and invocations so user names are looked up once
+        self.user_directory = UserDirectory()
+        # Local message store so repeat summaries only fetch new messages
+        self.history_cache = HistoryCache()
+        # Summaries of unchanged conversations are served without calling the summarizer
+        self.summary_cache = SummaryCache()
+        # Channel metadata and member counts, kept current by channel events
+        self.channel_directory = ChannelDirectory()
+        # Keeps expensive commands from exhausting the workspace's Slack API quota
+        self.admission = AdmissionController()
         self._load_commands()
+        self._register_metrics()
         # Set this instance as the singleton
         SlackBot._instance = self
 
-    async def initialize(self):
-        """Initialize bot by getting its user ID."""
+    async def identify(self):
+        """Get the bot's user ID and name from auth_test."""
         try:
             auth_response = await self.client.auth_test()
             # The auth_test is returning the user ID, not the bot ID
             # We'll override this in the handle_message method with the correct ID
             # from the event authorizations
             self.bot_user_id = auth_response['user_id']
-            print(f"Bot temporary ID from auth_test: {self.bot_user_id}")
+            self.bot_name = auth_response.get('user')
+            self.identified = True
+            logger.info("Bot temporary ID from auth_test: %s", self.bot_user_id)
         except SlackApiError as e:
-            print(f"Error getting bot user ID: {e.response['error']}")
+            logger.error("Error getting bot user ID: %s", e.response['error'])
             raise
 
+    async def initialize(self):
+        """Initialize bot by getting its user ID and name, and warming the user directory if enabled."""
+        await self.identify()
+        if os.getenv('WARM_USER_DIRECTORY', 'false').lower() == 'true':
+            try:
+                count = await self.user_directory.warm(self.client)
+                logger.info("Warmed user directory with %d users", count)
+            except SlackApiError as e:
+                # Names will be resolved on demand instead
+                logger.warning("Error warming user directory: %s", e.response['error'])
+
     def _load_commands(self):
-        """Dynamically load all command modules from the commands package."""
-        commands_package = 'commands'
-        print(f"Loading commands from {commands_package} package")
-        for _, name, _ in pkgutil.iter_modules([commands_package]):
-            print(f"Found module: {name}")
-            module = importlib.import_module(f'{commands_package}.{name}')
-            for item_name in dir(module):
-                item = getattr(module, item_name)
-                if (isinstance(item, type) and 
-                    issubclass(item, base_command.BaseCommand) and 
-                    item != base_command.BaseCommand):
-                    command_instance = item()
-                    self.commands[command_instance.keyword] = command_instance
-                    print(f"Loaded command: {command_instance.keyword} - {command_instance.help_text}")        
-        print(f"Total commands loaded: {len(self.commands)}")
-        print(f"Available commands: {', '.join(self.commands.keys())}")
+        """Register the built-in commands; each command's module is imported on first use."""
+        self.commands = create_registry()
+        self.router = CommandRouter(self.commands)
+        logger.info("Registered %d commands: %s", len(self.commands), ', '.join(self.commands.keys()))
+
+    def _register_metrics(self):
+        """Export the shared caches' hit counters and admission state on /metrics."""
+        REGISTRY.counter(
+            'steve_cache_requests_total',
+            'Cache lookups, by cache and outcome',
+            ['cache', 'outcome'],
+            function=self._cache_counts
+        )
+        REGISTRY.gauge(
+            'steve_cache_hit_ratio',
+            'Share of cache lookups answered from the cache, by cache',
+            ['cache'],
+            function=self._cache_hit_ratios
+        )
+        REGISTRY.counter(
+            'steve_slack_api_cache_total',
+            'Read calls answered from the client cache, coalesced with an identical call or sent, by method',
+            ['method', 'outcome'],
+            function=lambda: {
+                (method, {'hits': 'hit', 'misses': 'miss'}.get(outcome, outcome)): count
+                for method, counters in self.client.stats().items()
+                for outcome, count in counters.items()
+            }
+        )
+
+        REGISTRY.gauge(
+            'steve_admission_budget_in_use',
+            'Cost of the expensive commands currently running',
+            function=lambda: self.admission.in_use
+        )
+        REGISTRY.gauge(
+            'steve_admission_queued',
+            'Expensive commands waiting for cost budget',
+            function=lambda: self.admission.queued
+        )
+
+    def _cache_counts(self) -> dict:
+        api_stats = self.client.stats().values()
+        return {
+            ('summary', 'hit'): self.summary_cache.hits,
+            ('summary', 'miss'): self.summary_cache.misses,
+            ('users', 'hit'): self.user_directory.hits,
+            ('users', 'miss'): self.user_directory.misses,
+            ('channels', 'hit'): self.channel_directory.hits,
+            ('channels', 'miss'): self.channel_directory.misses,
+            # Coalesced calls share another call's response, so they count as hits
+            ('slack_api', 'hit'): sum(stats['hits'] + stats['coalesced'] for stats in api_stats),
+            ('slack_api', 'miss'): sum(stats['misses'] for stats in api_stats),
+        }
+
+    def _cache_hit_ratios(self) -> dict:
+        counts = self._cache_counts()
+        ratios = {}
+        for cache in {cache for cache, outcome in counts}:
+            total = counts[(cache, 'hit')] + counts[(cache, 'miss')]
+            ratios[(cache,)] = counts[(cache, 'hit')] / total if total else 0
+        return ratios
+
+    def handle_channel_event(self, event) -> bool:
+        """
+        Apply a channel change event (joins, renames, topic changes...) to the cached channel data.
+
+        Returns:
+            bool: Whether the event concerned a channel
+        """
+        channel = self.channel_directory.apply_event(event)
+        if channel is None:
+            return False
+        self.client.invalidate('conversations_info', channel=channel)
+        self.client.invalidate('conversations_info', channel=channel, include_num_members=True)
+        logger.debug("Refreshed cached data of channel %s after %s", channel, event.get('subtype') or event.get('type'))
+        return True
+
+    def ordering_key(self, event) -> Optional[str]:
+        """
+        Key an EventPipeline keeps this event's order within: its channel, or None for a
+        cheap command (cost 0), which needn't wait behind an expensive one in its channel.
+        """
+        channel = event.get('channel')
+        if not self.bot_user_id:
+            return channel
+        route = self.router.route(event.get('text', '').strip(), self.bot_user_id)
+        if route.error:
+            return None
+        command = self.commands[route.keyword]
+        try:
+            cost = command.estimate_cost(command.parse_args(route.args))
+        except ArgumentError:
+            return None
+        return None if cost == 0 else channel
 
     async def handle_message(self, event):
         """Handle incoming message events."""
         channel = event.get('channel')
-        print(f"Processing message in channel: {channel}")
+        logger.debug("Processing message in channel: %s", channel)
         
         try:
             # Get the actual bot ID from the authorizations in the event
@@ -67,90 +203,64 @@ class SlackBot:
                 if auth_info and 'user_id' in auth_info[0]:
                     actual_bot_id = auth_info[0]['user_id']
                     if self.bot_user_id != actual_bot_id:
-                        print(f"Updating bot ID from {self.bot_user_id} to {actual_bot_id}")
+                        logger.info("Updating bot ID from %s to %s", self.bot_user_id, actual_bot_id)
                         self.bot_user_id = actual_bot_id
 
             if not self.bot_user_id:
                 await self.initialize()
-                print(f"Bot initialized with user ID: {self.bot_user_id}")
+                logger.info("Bot initialized with user ID: %s", self.bot_user_id)
 
             text = event.get('text', '').strip()
             user = event.get('user')
-            print(f"Message from user: {user}, text: '{text}'")
+            logger.debug("Message from user: %s, text: '%s'", user, text)
 
-            # Look for bot mention in the text - check both possible formats
-            # Either '<@BOT_ID>' format or directly extract from message text
-            mention_pattern = f"<@{self.bot_user_id}>"
-            
-            # For app_mention events, we know the bot was mentioned 
-            # So if we can't find the mention pattern, we'll extract the command directly
-            if mention_pattern in text:
-                # Extract command after the mention
-                command_text = text.split(mention_pattern, 1)[1].strip()
-            else:
-                # Just take everything after the first mention (which should be the bot)
-                matches = text.split('<@', 1)
-                if len(matches) > 1:
-                    # Format: <@U0783GA3C3H> command
-                    rest = matches[1]
-                    # Extract everything after the first '>' which closes the mention
-                    if '>' in rest:
-                        command_text = rest.split('>', 1)[1].strip()
-                    else:
-                        command_text = ""
-                else:
-                    command_text = text.strip()
-            
-            print(f"Extracted command text: '{command_text}'")
-            command_parts = command_text.split()
-            print(f"Command parts: {command_parts}")
-            
-            if not command_parts:
-                # If mentioned without a command, show help
-                command_parts = ['help']
-                print("No command specified, defaulting to 'help'")
+            # Resolve the command from the text after the bot mention
+            route = self.router.route(text, self.bot_user_id)
+            logger.debug("Routed to command: '%s' with args: %s", route.keyword, route.args)
 
-            keyword = command_parts[0]
-            args = command_parts[1:]
-            print(f"Using command keyword: '{keyword}' with args: {args}")
+            if route.error:
+                # Direct users to the help command for unknown or ambiguous commands
+                await self.client.chat_postMessage(
+                    channel=channel,
+                    text=route.error
+                )
+                return
+
+            keyword = route.keyword
+            command = self.commands[keyword]
+
+            # Reject malformed arguments before spending any API calls on the command
+            try:
+                args = command.parse_args(route.args)
+            except ArgumentError as e:
+                await self.client.chat_postMessage(
+                    channel=channel,
+                    text=f"{e}\nUsage: {command.usage}"
+                )
+                return
 
-            if keyword in self.commands:
-                print(f"Found registered command: {keyword}")
+            with command_context(keyword) as api_calls:
+                started = time.perf_counter()
                 try:
-                    print(f"Executing command: {keyword}")
-                    response = await self.commands[keyword].execute(
-                        client=self.client,
+                    # Expensive commands may wait here for their share of the cost budget
+                    async with self.admission.admit(user, channel, command.estimate_cost(args)):
+                        if command.streaming:
+                            outcome = await self._run_streaming(command, channel, user, args)
+                        else:
+                            outcome = await self._run(command, channel, user, args)
+                except AdmissionError as e:
+                    logger.info("Command %s from %s in %s not admitted: %s", keyword, user, channel, e.reason)
+                    await self.client.chat_postMessage(
                         channel=channel,
-                        user=user,
-                        args=args
-                    )
-                    print(f"Command executed, response: {response}")
-                    
-                    if response:
-                        print(f"Sending response to channel {channel}")
-                        await self.client.chat_postMessage(
-                            channel=channel,
-                            text=response
-                        )
-                        print("Response sent")
-                    else:
-                        print("Command returned no response to send")
-                except SlackApiError as e:
-                    print(f"SlackApiError: {e}")
-                    await SlackErrorHandler.handle_error_with_retry(
-                        self.client,
-                        channel,
-                        e
+                        text=str(e)
                     )
-                except Exception as e:
-                    print(f"Unexpected error executing command {keyword}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-            else:
-                # Direct users to the help command for unknown commands
-                await self.client.chat_postMessage(
-                    channel=channel,
-                    text=f"Unknown command '{keyword}'. Type @<bot> help to see available commands."
+                    outcome = 'rejected'
+                duration = time.perf_counter() - started
+                COMMAND_DURATION.observe(duration, command=keyword, outcome=outcome)
+                logger.info(
+                    "Command %s finished in %.0f ms (%s) with %d Slack API request(s)",
+                    keyword, duration * 1000, outcome, sum(api_calls.values()),
+                    extra={'duration_ms': round(duration * 1000, 1), 'outcome': outcome, 'api_calls': dict(api_calls)}
                 )
                 
         except SlackApiError as e:
@@ -160,7 +270,7 @@ class SlackBot:
                 e
             )
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            logger.exception("Unexpected error: %s", e)
             try:
                 await self.client.chat_postMessage(
                     channel=channel,
@@ -168,3 +278,71 @@ class SlackBot:
                 )
             except:
                 pass  # If we can't send the error message, just log it
+
+    async def _run(self, command, channel, user, args) -> str:
+        """Run a command and post its response. Returns the outcome for metrics."""
+        try:
+            logger.debug("Executing command: %s", command.keyword)
+            response = await command.execute(
+                client=self.client,
+                channel=channel,
+                user=user,
+                args=args
+            )
+            logger.debug("Command executed, response: %s", response)
+            
+            if response:
+                await self.client.chat_postMessage(
+                    channel=channel,
+                    text=response
+                )
+                logger.debug("Response sent to channel %s", channel)
+            else:
+                logger.debug("Command returned no response to send")
+            return 'ok'
+        except SlackApiError as e:
+            logger.warning("SlackApiError executing command %s: %s", command.keyword, e)
+            await SlackErrorHandler.handle_error_with_retry(
+                self.client,
+                channel,
+                e
+            )
+            return 'slack_error'
+        except Exception as e:
+            logger.exception("Unexpected error executing command %s: %s", command.keyword, e)
+            return 'error'
+
+    async def _run_streaming(self, command, channel, user, args) -> str:
+        """
+        Run a command whose execute yields progress, editing one message in place.
+
+        A placeholder is posted straight away so the user knows the command was
+        received; each yielded text replaces it, and the last one is the response.
+        Returns the outcome for metrics.
+        """
+        progress = ProgressMessage(self.client, channel)
+        await progress.start(f"Working on `{command.keyword}`…")
+
+        response = None
+        outcome = 'ok'
+        try:
+            logger.debug("Executing command: %s", command.keyword)
+            async for response in command.execute(
+                client=self.client,
+                channel=channel,
+                user=user,
+                args=args
+            ):
+                await progress.update(response)
+            logger.debug("Command executed, response: %s", response)
+        except SlackApiError as e:
+            logger.warning("SlackApiError executing command %s: %s", command.keyword, e)
+            response, recoverable = SlackErrorHandler.handle_error(e)
+            outcome = 'slack_error'
+        except Exception as e:
+            logger.exception("Unexpected error executing command %s: %s", command.keyword, e)
+            response = "Sorry, I encountered an unexpected error while processing your command."
+            outcome = 'error'
+
+        await progress.finish(response or "Done.")
+        return outcome
@@ -0,0 +1,31 @@
+from .registry import CommandRegistry
+
+# Built-in commands: keyword -> ('module:ClassName', aliases, help text, usage). Modules
+# are imported on first use; the help listing is rendered from the text and usage kept
+# here, so it doesn't import them. Add new commands here.
+BUILTIN_COMMANDS = {
+    'channel-info': (
+        'commands.channel_info_command:ChannelInfoCommand', ['info'],
+        "Shows detailed information about the current channel. Usage: @<bot> channel-info",
+        "@<bot> channel-info",
+    ),
+    'help': (
+        'commands.help_command:HelpCommand', ['?'],
+        "Shows this help message with a list of all available commands. Usage: @<bot> help [command]",
+        "@<bot> help [command]",
+    ),
+    'summarize': (
+        'commands.summarize_command:SummarizeCommand', ['summary'],
+        "Summarizes recent conversations in the channel. Usage: @<bot> summarize [days]",
+        "@<bot> summarize [days]",
+    ),
+}
+
+def create_registry() -> CommandRegistry:
+    """Create a registry holding the built-in commands."""
+    registry = CommandRegistry()
+    for keyword, (target, aliases, help_text, usage) in BUILTIN_COMMANDS.items():
+        registry.register(keyword, target, aliases, help_text=help_text, usage=usage)
+    return registry
+
+__all__ = ['BUILTIN_COMMANDS', 'CommandRegistry', 'create_registry']
@@ -0,0 +1,85 @@
+from typing import Any, Callable, Optional
+
+class ArgumentError(ValueError):
+    """Raised when command arguments don't match the command's argument specs."""
+    pass
+
+class Argument:
+    """
+    Declarative spec of one positional command argument.
+
+    Usage:
+        Argument('days', int, default=1, minimum=1, maximum=7, clamp=True,
+                 help='number of days to look back')
+    """
+
+    def __init__(self, name: str, type: Callable[[str], Any] = str, default: Any = None, required: bool = False,
+                 minimum: Any = None, maximum: Any = None, clamp: bool = False, help: str = ''):
+        """
+        Args:
+            name: Name the parsed value is stored under
+            type: Converts the raw token, e.g. int; ValueError means the token is invalid
+            default: Value used when the argument is omitted
+            required: Whether the argument must be given
+            minimum: Smallest accepted value
+            maximum: Largest accepted value
+            clamp: Lower values above `maximum` to `maximum` instead of rejecting them
+            help: Short description for usage messages
+        """
+        self.name = name
+        self.type = type
+        self.default = default
+        self.required = required
+        self.minimum = minimum
+        self.maximum = maximum
+        self.clamp = clamp
+        self.help = help
+
+    @property
+    def usage(self) -> str:
+        return f"<{self.name}>" if self.required else f"[{self.name}]"
+
+    def convert(self, token: str) -> Any:
+        """Convert and validate a raw token, raising ArgumentError if it is invalid."""
+        try:
+            value = self.type(token)
+        except (TypeError, ValueError):
+            type_name = getattr(self.type, '__name__', 'value')
+            raise ArgumentError(f"'{token}' is not a valid {type_name} for {self.name}.")
+
+        if self.minimum is not None and value < self.minimum:
+            raise ArgumentError(f"{self.name} must be at least {self.minimum}.")
+        if self.maximum is not None and value > self.maximum:
+            if not self.clamp:
+                raise ArgumentError(f"{self.name} must be at most {self.maximum}.")
+            value = self.maximum
+        return value
+
+def parse_arguments(specs: list, tokens: list, keyword: Optional[str] = None) -> dict:
+    """
+    Parse raw command tokens against a list of Argument specs.
+
+    Args:
+        specs: The command's Argument specs, in positional order
+        tokens: Raw tokens following the command keyword
+        keyword: Command keyword, used in error messages
+
+    Returns:
+        dict: Parsed values keyed by argument name
+
+    Raises:
+        ArgumentError: If there are too many or missing tokens, or a token is invalid
+    """
+    if len(tokens) > len(specs):
+        extra = " ".join(tokens[len(specs):])
+        raise ArgumentError(f"Unexpected argument(s) for {keyword or 'this command'}: {extra}")
+
+    parsed = {}
+    for index, spec in enumerate(specs):
+        if index < len(tokens):
+            parsed[spec.name] = spec.convert(tokens[index])
+        elif spec.required:
+            raise ArgumentError(f"Missing required argument: {spec.name}")
+        else:
+            parsed[spec.name] = spec.default
+    return parsed
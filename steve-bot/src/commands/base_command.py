@@ -1,5 +1,7 @@
+import inspect
 from abc import ABC, abstractmethod
 from slack_sdk.web.async_client import AsyncWebClient
+from .arguments import parse_arguments
 
 class BaseCommand(ABC):
     """Base class for all bot commands."""
@@ -16,16 +18,74 @@ class BaseCommand(ABC):
         """Help text explaining how to use this command."""
         pass
 
+    @property
+    def arguments(self) -> list:
+        """Argument specs (see commands.arguments.Argument) the command accepts, in positional order."""
+        return []
+
+    @property
+    def usage(self) -> str:
+        """Usage line built from the argument specs."""
+        return " ".join([f"@<bot> {self.keyword}"] + [spec.usage for spec in self.arguments])
+
+    @property
+    def streaming(self) -> bool:
+        """Whether execute is an async generator that reports progress (see execute)."""
+        return inspect.isasyncgenfunction(self.execute)
+
+    def shared(self, name: str, default_factory):
+        """Get a resource the running bot shares between commands, or a throwaway one if the bot isn't running."""
+        from bot import SlackBot
+        bot = SlackBot.get_instance()
+        if bot is None:
+            return default_factory()
+        return getattr(bot, name)
+
+    def estimate_cost(self, args: dict) -> int:
+        """
+        Estimate how expensive a run with these arguments is, for admission control.
+
+        Commands that make a handful of API calls cost 0 and are always admitted at
+        once. Expensive commands return a cost that scales with the work they do and
+        share a budget with other expensive commands (see utils.AdmissionController).
+
+        Args:
+            args: Parsed arguments keyed by name, as returned by parse_args
+
+        Returns:
+            int: The estimated cost
+        """
+        return 0
+
+    def parse_args(self, tokens: list) -> dict:
+        """
+        Validate raw argument tokens before the command is executed.
+
+        Args:
+            tokens: Raw tokens following the command keyword
+
+        Returns:
+            dict: Parsed argument values keyed by name
+
+        Raises:
+            ArgumentError: If the tokens don't match the argument specs
+        """
+        return parse_arguments(self.arguments, tokens, self.keyword)
+
     @abstractmethod
-    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: list) -> str:
+    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: dict) -> str:
         """
         Execute the command.
+
+        Long-running commands can instead implement this as an async generator that
+        yields progress texts as stages complete. The bot posts a placeholder right
+        away, edits it with each yielded text, and the last one is the final response.
         
         Args:
             client: Slack AsyncWebClient instance
             channel: The channel ID where the command was invoked
             user: The user ID who invoked the command
-            args: List of command arguments
+            args: Parsed arguments keyed by name, as returned by parse_args
             
         Returns:
             str: The response message to send back to the channel
@@ -2,7 +2,7 @@ from datetime import datetime
 from .base_command import BaseCommand
 from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
-from utils import SlackErrorHandler
+from utils import ChannelDirectory, SlackErrorHandler
 
 class ChannelInfoCommand(BaseCommand):
     @property
@@ -13,23 +13,21 @@ class ChannelInfoCommand(BaseCommand):
     def help_text(self) -> str:
         return "Shows detailed information about the current channel. Usage: @<bot> channel-info"
 
-    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: list) -> str:
+    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: dict) -> str:
         try:
-            # Get channel information
+            # Get channel information, cached until Slack reports a change to the channel
+            directory = self.shared('channel_directory', ChannelDirectory)
             try:
-                channel_info = (await client.conversations_info(channel=channel))['channel']
+                channel_info = await directory.info(client, channel)
             except SlackApiError as e:
                 if e.response['error'] == 'channel_not_found':
                     return "I can't access this channel. Please make sure I'm invited to it."
                 raise
             
-            # Get member count
-            try:
-                member_count = len((await client.conversations_members(channel=channel))['members'])
-            except SlackApiError as e:
-                if e.response['error'] in ['channel_not_found', 'not_in_channel']:
-                    return "I need to be invited to this channel to get member information."
-                member_count = "Unknown (insufficient permissions)"
+            # Get member count; large channels are counted in the background
+            member_count = await directory.member_count(client, channel)
+            if member_count is None:
+                member_count = "Still counting, ask again in a moment"
             
             # Format creation time
             created_time = datetime.fromtimestamp(channel_info['created']).strftime('%Y-%m-%d %H:%M:%S')
@@ -39,7 +37,7 @@ class ChannelInfoCommand(BaseCommand):
                 f"*Channel Information for #{channel_info['name']}*",
                 f"• *Created:* {created_time}",
                 f"• *Members:* {member_count}",
-                f"• *Created by:* <@{channel_info['creator']}>",
+                f"• *Created by:* <@{channel_info.get('creator')}>",
                 f"• *Private:* {'Yes' if channel_info['is_private'] else 'No'}"
             ]
             
@@ -1,55 +1,99 @@
+import logging
+from .arguments import Argument
 from .base_command import BaseCommand
 from slack_sdk.web.async_client import AsyncWebClient
 
+logger = logging.getLogger(__name__)
+
 class HelpCommand(BaseCommand):
+    def __init__(self):
+        # Rendered help texts, valid for the registry version and bot name they were built with
+        self._rendered = {}
+        self._rendered_for = None
+
     @property
     def keyword(self) -> str:
         return "help"
 
     @property
     def help_text(self) -> str:
-        return "Shows this help message with a list of all available commands. Usage: @<bot> help"
+        return "Shows this help message with a list of all available commands. Usage: @<bot> help [command]"
+
+    @property
+    def arguments(self) -> list:
+        return [Argument('command', help='show help for a single command')]
+
+    def cached(self, bot, key: str, render) -> str:
+        """
+        Return a rendered help text, rendering it only when the bot's commands or name changed.
+
+        Args:
+            bot: The SlackBot whose commands are described
+            key: Identifies the text, e.g. a command keyword
+            render: Called without arguments to build the text on a cache miss
+        """
+        stamp = (bot.commands.version, bot.bot_name)
+        if self._rendered_for != stamp:
+            self._rendered = {}
+            self._rendered_for = stamp
+        text = self._rendered.get(key)
+        if text is None:
+            text = self._rendered[key] = render()
+        return text
+
+    def render_command(self, bot, keyword: str) -> str:
+        help_text, usage = bot.commands.describe(keyword)
+        return f"*{keyword}*: {help_text}\nUsage: {usage}"
 
-    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: list) -> str:
+    def render_listing(self, bot) -> str:
+        response = [
+            f"*{bot.bot_name or 'SlackBot'} Commands*",
+            "_Mention me with any of these commands:_\n"
+        ]
+        # Sort commands by keyword for consistent display; describe() reads the registered
+        # help text, so listing the commands doesn't import them
+        for keyword in sorted(bot.commands):
+            aliases = bot.commands.aliases(keyword)
+            also = f" (also: {', '.join(aliases)})" if aliases else ""
+            help_text, _ = bot.commands.describe(keyword)
+            response.append(f"• *{keyword}*{also}: {help_text}")
+        return "\n".join(response)
+
+    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: dict) -> str:
         try:
-            # Get the bot's commands from the bot instance
-            # We can access this through the client's token owner
-            auth = await client.auth_test()
-            bot_name = auth.get('user', 'SlackBot')
-
-            # Start with a header
-            response = [
-                f"*{bot_name} Commands*",
-                "_Mention me with any of these commands:_\n"
-            ]
-
-            # Get all commands from the bot instance (accessible through the module)
             from bot import SlackBot
             bot = SlackBot.get_instance()
-            
+
             # Make sure we have the bot instance
             if bot is None:
-                print("Warning: Could not get bot instance, using direct command list")
+                logger.warning("Could not get bot instance, using direct command list")
+                auth = await client.auth_test()
+                bot_name = auth.get('user', 'SlackBot')
                 # Fallback - just list this command's help
-                response.append(f"• *help*: {self.help_text}")
-                response.append(f"• *channel-info*: Shows detailed information about the current channel.")
-                response.append(f"• *summarize*: Summarizes the last 24 hours of conversation in the current channel.")
-            else:
-                print(f"Found bot instance with {len(bot.commands)} commands")
-                # Sort commands by keyword for consistent display
-                commands = sorted(bot.commands.items(), key=lambda x: x[0])
-                
-                # Add each command and its help text
-                for keyword, command in commands:
-                    response.append(f"• *{keyword}*: {command.help_text}")
-
-            return "\n".join(response)
+                return "\n".join([
+                    f"*{bot_name} Commands*",
+                    "_Mention me with any of these commands:_\n",
+                    f"• *help*: {self.help_text}",
+                    f"• *channel-info*: Shows detailed information about the current channel.",
+                    f"• *summarize*: Summarizes the last 24 hours of conversation in the current channel.",
+                ])
+
+            # The bot learns its name from auth_test once; on Lambda its user ID comes from
+            # the event instead, so the first help may have to ask
+            if not bot.identified:
+                await bot.identify()
+
+            if args.get('command'):
+                route = bot.router.resolve(args['command'])
+                if route.error:
+                    return route.error
+                return self.cached(bot, route.keyword, lambda: self.render_command(bot, route.keyword))
+
+            return self.cached(bot, '', lambda: self.render_listing(bot))
 
         except Exception as e:
-            print(f"Error in help command: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            
+            logger.exception("Error in help command: %s", e)
+
             # Fallback help message
             return "Available commands: help, channel-info, summarize\n" + \
                    "For more details, type: @<bot> help"
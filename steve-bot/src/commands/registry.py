@@ -0,0 +1,111 @@
+import importlib
+import logging
+import time
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from .base_command import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+class CommandRegistry(Mapping):
+    """
+    Maps command keywords to commands, importing each command's module on first use.
+
+    Commands are registered by keyword with a 'module:ClassName' target, so building
+    the registry costs nothing and a cold start only pays for the commands it runs.
+    The registry behaves like a read-only dict of keyword -> command instance.
+    """
+
+    def __init__(self):
+        # keyword -> 'module:ClassName'
+        self._targets = {}
+        # keyword -> alternative names that trigger it
+        self._aliases = {}
+        # keyword -> (help text, usage) given at registration, so help needn't load the command
+        self._descriptions = {}
+        # keyword -> command instance, filled in on first use
+        self._instances = {}
+        # keyword -> seconds spent importing and constructing the command
+        self.load_times = {}
+        # Incremented on every change, so derived data (e.g. help text) can be cached
+        self.version = 0
+
+    def register(self, keyword: str, target: str, aliases: Iterable[str] = (),
+                 help_text: Optional[str] = None, usage: Optional[str] = None) -> None:
+        """
+        Register a command to be loaded lazily.
+
+        Args:
+            keyword: The command keyword that triggers the command
+            target: Where the command class lives, as 'package.module:ClassName'
+            aliases: Alternative names that also trigger the command
+            help_text: The command's help text, or None to load the command when it is needed
+            usage: The command's usage line, or None to load the command when it is needed
+        """
+        self._targets[keyword] = target
+        self._aliases[keyword] = list(aliases)
+        self._instances.pop(keyword, None)
+        if help_text is not None and usage is not None:
+            self._descriptions[keyword] = (help_text, usage)
+        else:
+            self._descriptions.pop(keyword, None)
+        self.version += 1
+
+    def add(self, command: BaseCommand, aliases: Iterable[str] = ()) -> None:
+        """Register an already constructed command instance."""
+        self._targets[command.keyword] = f"{type(command).__module__}:{type(command).__name__}"
+        self._aliases[command.keyword] = list(aliases)
+        self._instances[command.keyword] = command
+        self._descriptions[command.keyword] = (command.help_text, command.usage)
+        self.version += 1
+
+    def _load(self, keyword: str) -> BaseCommand:
+        module_name, class_name = self._targets[keyword].split(':')
+        start = time.perf_counter()
+        command_class = getattr(importlib.import_module(module_name), class_name)
+        if not issubclass(command_class, BaseCommand):
+            raise TypeError(f"{self._targets[keyword]} is not a BaseCommand")
+        command = command_class()
+        self.load_times[keyword] = time.perf_counter() - start
+        if command.keyword != keyword:
+            logger.warning("Command registered as '%s' reports keyword '%s'", keyword, command.keyword)
+        logger.info("Loaded command: %s in %.1f ms", keyword, self.load_times[keyword] * 1000)
+        return command
+
+    def __getitem__(self, keyword: str) -> BaseCommand:
+        command = self._instances.get(keyword)
+        if command is None:
+            if keyword not in self._targets:
+                raise KeyError(keyword)
+            command = self._instances[keyword] = self._load(keyword)
+        return command
+
+    def __contains__(self, keyword: object) -> bool:
+        # Checking for a command must not import it
+        return keyword in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._targets)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def aliases(self, keyword: str) -> List[str]:
+        """Alternative names of a command."""
+        return list(self._aliases.get(keyword, []))
+
+    def describe(self, keyword: str) -> Tuple[str, str]:
+        """
+        The help text and usage line of a command, loading it only if they weren't registered.
+
+        Raises:
+            KeyError: If no command is registered under the keyword
+        """
+        description = self._descriptions.get(keyword)
+        if description is None:
+            command = self[keyword]
+            description = self._descriptions[keyword] = (command.help_text, command.usage)
+        return description
+
+    def targets(self) -> Dict[str, str]:
+        """The registered keyword -> 'module:ClassName' targets."""
+        return dict(self._targets)
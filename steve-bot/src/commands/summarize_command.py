@@ -1,13 +1,46 @@
 from datetime import datetime, timedelta
 import json
 import asyncio
+import logging
+import os
 import re
+from typing import Callable, Optional
+from .arguments import Argument
 from .base_command import BaseCommand
 from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
-from utils import SlackErrorHandler
+from summarization import SummarizationEngine
+from utils import REGISTRY, ChannelDirectory, SlackErrorHandler, HistoryCache, SingleFlight, SummaryCache, TranscriptBuilder, UserDirectory
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CHARS = REGISTRY.histogram(
+    'steve_summarize_transcript_chars',
+    'Size of the transcripts built for summarization, in characters',
+    buckets=(1000, 5000, 10000, 25000, 50000, 100000, 200000, 400000)
+)
+HISTORY_MESSAGES_FETCHED = REGISTRY.counter(
+    'steve_summarize_history_messages_fetched_total',
+    'Messages fetched from conversations_history while summarizing'
+)
 
 class SummarizeCommand(BaseCommand):
+    # Maximum number of conversations_replies calls in flight at once
+    THREAD_FETCH_CONCURRENCY = int(os.getenv('SUMMARIZE_THREAD_CONCURRENCY', '8'))
+    # conversations_history page size and the per-summary budget that keeps memory flat
+    HISTORY_PAGE_SIZE = int(os.getenv('SUMMARIZE_PAGE_SIZE', '200'))
+    HISTORY_MAX_MESSAGES = int(os.getenv('SUMMARIZE_MAX_MESSAGES', '5000'))
+    HISTORY_MAX_BYTES = int(os.getenv('SUMMARIZE_MAX_BYTES', '2000000'))
+    # Upper bound on the transcript handed to the summarizer; the oldest lines are dropped first
+    TRANSCRIPT_MAX_CHARS = int(os.getenv('SUMMARIZE_MAX_TRANSCRIPT_CHARS', '200000'))
+    # Bot and system messages that are left out of the summary
+    SKIPPED_SUBTYPES = {'bot_message', 'channel_join', 'channel_leave'}
+
+    def __init__(self):
+        self.engine = SummarizationEngine()
+        # Concurrent summaries of the same channel and window share one computation
+        self._inflight = SingleFlight()
+
     @property
     def keyword(self) -> str:
         return "summarize"
@@ -16,54 +49,119 @@ class SummarizeCommand(BaseCommand):
     def help_text(self) -> str:
         return "Summarizes recent conversations in the channel. Usage: @<bot> summarize [days]" 
 
-    async def placeholder_ai_summarize(self, conversation_text):
-        """Placeholder for an external AI summarization API call.
-        In a real implementation, this would call an LLM API to summarize the conversation.
+    async def fetch_thread_replies(self, client: AsyncWebClient, channel: str, parent: dict,
+                                   semaphore: asyncio.Semaphore, history_cache: HistoryCache = None):
+        """
+        Fetch the replies of a single thread, waiting for a slot on the shared semaphore.
+
+        Args:
+            client: Slack AsyncWebClient instance
+            channel: The channel ID the thread belongs to
+            parent: The thread's parent message
+            semaphore: Bounds how many threads are fetched at once
+            history_cache: Optional cache consulted before, and updated after, fetching
+
+        Returns:
+            list: The thread's replies (parent excluded), or None if they could not be fetched
+        """
+        thread_ts = parent['thread_ts']
+        latest_reply = parent.get('latest_reply')
+        if history_cache is not None:
+            cached = await asyncio.to_thread(history_cache.get_thread, channel, thread_ts, latest_reply)
+            if cached is not None:
+                return cached
+
+        async with semaphore:
+            try:
+                replies = await client.conversations_replies(
+                    channel=channel,
+                    ts=thread_ts,
+                    limit=20  # Limit thread replies
+                )
+            except SlackApiError:
+                return None
+
+        # Skip the parent message since it is already part of the history
+        replies = replies['messages'][1:]
+        if history_cache is not None:
+            await asyncio.to_thread(history_cache.put_thread, channel, thread_ts, latest_reply, replies)
+        return replies
+
+    @property
+    def arguments(self) -> list:
+        # Cap at 7 days to avoid excessive API calls
+        return [Argument('days', int, default=1, minimum=1, maximum=7, clamp=True,
+                         help='number of days to look back')]
+
+    def estimate_cost(self, args: dict) -> int:
+        # History, thread and summarizer work all grow with the lookback window
+        return args['days']
+
+    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: dict):
+        lookback_days = args['days']
+        progress = asyncio.Queue()
+
+        # Concurrent requests for the same summary share one run; only the request
+        # that started it sees the intermediate stages
+        work = asyncio.ensure_future(self._inflight.run(
+            (channel, lookback_days),
+            lambda: self.summarize_channel(client, channel, lookback_days, progress.put_nowait)
+        ))
+        try:
+            while not work.done():
+                next_update = asyncio.ensure_future(progress.get())
+                done, _ = await asyncio.wait({work, next_update}, return_when=asyncio.FIRST_COMPLETED)
+                if next_update in done:
+                    yield next_update.result()
+                else:
+                    next_update.cancel()
+        finally:
+            if not work.done():
+                work.cancel()
+        yield work.result()
+
+    async def summarize_channel(self, client: AsyncWebClient, channel: str, lookback_days: int,
+                                on_progress: Optional[Callable[[str], None]] = None) -> str:
         """
-        # Simulate a slight delay as if making an API call
-        await asyncio.sleep(0.5)
-        
-        # Length-based placeholder logic to make it slightly more realistic
-        text_length = len(conversation_text)
-        topic_count = conversation_text.count("Topic:") or 1
-        
-        # Create a placeholder summary based on conversation length/complexity
-        if text_length < 500:
-            return "Brief discussions occurred in the channel with minimal interaction."
-        elif text_length < 2000:
-            return f"Several conversations took place covering approximately {topic_count} topics. The discussions were moderately detailed and included some questions and responses between participants."
-        else:
-            return f"Extensive conversations occurred covering {topic_count} main topics. There were in-depth discussions with multiple participants sharing information, asking questions, and providing detailed responses."
-
-    async def execute(self, client: AsyncWebClient, channel: str, user: str, args: list) -> str:
+        Fetch and summarize a channel's recent history.
+
+        Args:
+            client: Slack AsyncWebClient instance
+            channel: The channel ID to summarize
+            lookback_days: Number of days of history to cover
+            on_progress: Called with a short status text as each stage starts
+
+        Returns:
+            str: The response message to send back to the channel
+        """
+        report = on_progress or (lambda text: None)
+
         try:
             # First check if we have access to the channel
             try:
-                await client.conversations_info(channel=channel)
+                await self.shared('channel_directory', ChannelDirectory).info(client, channel)
             except SlackApiError as e:
                 if e.response['error'] in ['channel_not_found', 'not_in_channel']:
                     return "I need to be invited to this channel to provide a summary."
                 raise
 
-            # Determine time range - default to 24 hours
             now = datetime.now()
-            lookback_days = 1
-            
-            # Check for optional time range argument
-            if args and args[0].isdigit():
-                lookback_days = min(int(args[0]), 7)  # Cap at 7 days to avoid excessive API calls
-            
             start_time = now - timedelta(days=lookback_days)
             oldest_timestamp = start_time.timestamp()
             
-            print(f"Fetching messages since {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.info("Fetching messages in %s since %s", channel, start_time.strftime('%Y-%m-%d %H:%M:%S'))
+            report("Fetching channel history…")
 
-            # Fetch up to 100 most recent messages from the channel history
+            # Bring the local copy of the channel up to date. Only messages newer than
+            # the last cached one are fetched from Slack.
+            history_cache = self.shared('history_cache', lambda: HistoryCache(':memory:'))
             try:
-                result = await client.conversations_history(
-                    channel=channel,
-                    oldest=oldest_timestamp,
-                    limit=100  # Fetch up to 100 messages
+                history = await history_cache.sync(
+                    client,
+                    channel,
+                    oldest_timestamp,
+                    page_size=self.HISTORY_PAGE_SIZE,
+                    max_messages=self.HISTORY_MAX_MESSAGES
                 )
             except SlackApiError as e:
                 if e.response['error'] == 'not_in_channel':
@@ -72,38 +170,45 @@ class SummarizeCommand(BaseCommand):
                     return "I can't find this channel. It might have been deleted or I might not have access to it."
                 raise
 
-            if not result['messages']:
+            HISTORY_MESSAGES_FETCHED.inc(history.message_count)
+            logger.info("Fetched %d new messages in %d page(s)", history.message_count, history.pages)
+
+            messages, truncated = await asyncio.to_thread(
+                history_cache.recent_messages,
+                channel,
+                oldest_timestamp,
+                max_messages=self.HISTORY_MAX_MESSAGES,
+                max_bytes=self.HISTORY_MAX_BYTES
+            )
+            # Skip bot messages and system messages
+            messages = [msg for msg in messages if msg.get('subtype') not in self.SKIPPED_SUBTYPES]
+
+            if not messages:
                 return f"No messages found in the last {lookback_days} day(s)."
 
-            # Process messages to get user info and format the conversation
-            messages = result['messages']
-            messages.reverse()  # Start with oldest message first
-            user_cache = {}
-            conversation_text = ""
-            
-            # First pass: Collect user information
-            user_ids = set()
-            for msg in messages:
-                if 'user' in msg:
-                    user_ids.add(msg['user'])
-            
-            # Bulk fetch user info to minimize API calls
-            for user_id in user_ids:
-                try:
-                    user_info = await client.users_info(user=user_id)
-                    user_cache[user_id] = user_info['user']['real_name']
-                except SlackApiError:
-                    # Fall back to using the user ID if we can't get the name
-                    user_cache[user_id] = f"User {user_id}"
+            # Expand threads in parallel, reusing replies fetched within the thread TTL
+            parents = [msg for msg in messages if 'thread_ts' in msg and msg.get('thread_ts') == msg.get('ts')]
+            report(f"Read {len(messages)} messages, expanding {len(parents)} thread(s)…")
+            semaphore = asyncio.Semaphore(self.THREAD_FETCH_CONCURRENCY)
+            replies = await asyncio.gather(*(
+                self.fetch_thread_replies(client, channel, parent, semaphore, history_cache)
+                for parent in parents
+            ))
+            thread_replies = dict(zip((parent['thread_ts'] for parent in parents), replies))
+
+            # First pass: Collect the authors of messages and thread replies
+            user_ids = {msg['user'] for msg in messages if 'user' in msg}
+            for replies in thread_replies.values():
+                user_ids.update(reply['user'] for reply in replies or [] if 'user' in reply)
+
+            # Resolve all names at once through the shared directory
+            user_cache = await self.shared('user_directory', UserDirectory).resolve(client, user_ids)
             
             # Second pass: Format the conversation
+            transcript = TranscriptBuilder(max_chars=self.TRANSCRIPT_MAX_CHARS)
             current_topic = "General Discussion"
             
             for msg in messages:
-                # Skip bot messages and system messages
-                if 'subtype' in msg and msg['subtype'] in ['bot_message', 'channel_join', 'channel_leave']:
-                    continue
-                    
                 # Try to identify topic shifts
                 text = msg.get('text', '')
                 
@@ -112,49 +217,58 @@ class SummarizeCommand(BaseCommand):
                     topic_match = re.search(r'(?:Topic:|#)\s*([^\n]+)', text)
                     if topic_match:
                         current_topic = topic_match.group(1).strip()
-                        conversation_text += f"\n\nTopic: {current_topic}\n"
+                        transcript.add_topic(current_topic)
                 
                 # Format this message
-                timestamp = float(msg.get('ts', '0'))
-                time_str = datetime.fromtimestamp(timestamp).strftime('%H:%M')
                 user_name = user_cache.get(msg.get('user', 'unknown'), 'Unknown User')
+                transcript.add_message(msg.get('ts'), user_name, text)
                 
-                conversation_text += f"[{time_str}] {user_name}: {text}\n"
-                
-                # Handle thread replies if present
+                # Splice in thread replies if present
                 if 'thread_ts' in msg and msg.get('thread_ts') == msg.get('ts'):
-                    try:
-                        replies = await client.conversations_replies(
-                            channel=channel,
-                            ts=msg['thread_ts'],
-                            limit=20  # Limit thread replies
-                        )
-                        
-                        # Skip the parent message since we've already added it
-                        for reply in replies['messages'][1:]:
-                            reply_timestamp = float(reply.get('ts', '0'))
-                            reply_time = datetime.fromtimestamp(reply_timestamp).strftime('%H:%M')
-                            reply_user = user_cache.get(reply.get('user', 'unknown'), 'Unknown User')
-                            reply_text = reply.get('text', '')
-                            
-                            conversation_text += f"[{reply_time}] {reply_user} (in thread): {reply_text}\n"
-                    except SlackApiError:
-                        # If we can't fetch thread replies, just continue
-                        conversation_text += f"[Thread replies not accessible]\n"
+                    replies = thread_replies.get(msg['thread_ts'])
+                    if replies is None:
+                        # If we couldn't fetch thread replies, just continue
+                        transcript.add_note("Thread replies not accessible")
+                        continue
+
+                    for reply in replies:
+                        reply_user = user_cache.get(reply.get('user', 'unknown'), 'Unknown User')
+                        transcript.add_message(reply.get('ts'), reply_user, reply.get('text', ''), in_thread=True)
+
+            conversation_text = transcript.build()
+            TRANSCRIPT_CHARS.observe(len(transcript))
+            logger.info("Built transcript of %d characters, dropped %d oldest lines",
+                        len(transcript), transcript.dropped_lines)
             
             # Get AI summary of the conversation
-            summary = await self.placeholder_ai_summarize(conversation_text)
+            summary_cache = self.shared('summary_cache', SummaryCache)
+            cache_key = SummaryCache.make_key(
+                channel,
+                lookback_days,
+                conversation_text,
+                backend=type(self.engine.backend).__name__
+            )
+            def report_chunks(done, total):
+                if total > 1:
+                    report(f"Summarizing… {done}/{total} parts done")
+
+            report("Summarizing…")
+            summary = await summary_cache.get_or_compute(
+                cache_key,
+                lambda: self.engine.summarize(conversation_text, on_progress=report_chunks)
+            )
             
             # Format the final response
             time_range = "24 hours" if lookback_days == 1 else f"{lookback_days} days"
             
             full_summary = f"*Channel Summary (last {time_range})*\n\n{summary}"
+            if truncated or history.truncated or transcript.truncated:
+                full_summary += "\n\n_Only the most recent messages were included._"
             return full_summary
 
         except SlackApiError as e:
             message, recoverable = SlackErrorHandler.handle_error(e)
             return message
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error summarizing channel %s: %s", channel, e)
             return f"Error summarizing channel: {str(e)}"
@@ -1,40 +1,115 @@
+import asyncio
+import base64
 import json
+import logging
 import os
+from slack_sdk.web.async_client import AsyncWebClient
 from bot import SlackBot
+from utils import EventDeduplicator, configure_logging
+
+# Marks an invocation that carries a deferred Slack event rather than an HTTP request
+DEFERRED_EVENT_KEY = 'steve_bot_deferred_event'
+
+# Everything below is built once per Lambda container and reused by warm invocations
+configure_logging()
+logger = logging.getLogger(__name__)
+
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
+slack_token = os.environ.get('SLACK_USER_TOKEN')
+bot = None
+if slack_token:
+    bot = SlackBot(AsyncWebClient(
+        token=slack_token,
+        base_url=os.getenv('SLACK_API_URL', AsyncWebClient.BASE_URL)
+    ))
+
+# Slack retries events it doesn't see acknowledged in time; skip the repeats
+processed_events = EventDeduplicator()
+
+_lambda_client = None
+
+def _response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'body': json.dumps(body)
+    }
+
+def _defer(event_data, context):
+    """
+    Run a Slack event in a separate, asynchronous invocation of this function.
+
+    Slack expects an HTTP response within 3 seconds, which long commands can't meet.
+    Returns False if deferring is disabled or not possible, e.g. when running locally.
+    """
+    global _lambda_client
+    function_arn = getattr(context, 'invoked_function_arn', None)
+    if not function_arn or os.getenv('DEFER_COMMANDS', 'true').lower() != 'true':
+        return False
+
+    if _lambda_client is None:
+        import boto3
+        _lambda_client = boto3.client('lambda')
+    _lambda_client.invoke(
+        FunctionName=function_arn,
+        InvocationType='Event',
+        Payload=json.dumps({DEFERRED_EVENT_KEY: event_data}).encode('utf-8')
+    )
+    return True
 
 def lambda_handler(event, context):
     """AWS Lambda handler function."""
     try:
-        # Get the Slack token from environment variables
-        slack_token = os.environ['SLACK_USER_TOKEN']
-        
-        # Initialize the bot
-        bot = SlackBot(slack_token)
-        
+        if bot is None:
+            raise RuntimeError("SLACK_USER_TOKEN environment variable must be set")
+
+        # Asynchronous invocation created by _defer: run the command now
+        if DEFERRED_EVENT_KEY in event:
+            loop.run_until_complete(bot.handle_message(event[DEFERRED_EVENT_KEY]))
+            return _response(200, {'message': 'Event processed successfully'})
+
         # Parse the event body
-        body = json.loads(event.get('body', '{}'))
+        raw_body = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            raw_body = base64.b64decode(raw_body).decode('utf-8')
+        body = json.loads(raw_body)
         
         # Handle Slack event
         if 'challenge' in body:
             # Handle URL verification challenge
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'challenge': body['challenge']})
-            }
+            return _response(200, {'challenge': body['challenge']})
         
         # Handle other events
         if 'event' in body:
+            event_id = body.get('event_id')
+            if event_id and processed_events.seen(event_id):
+                logger.info("Skipping duplicate event: %s", event_id)
+                return _response(200, {'message': 'Duplicate event ignored'})
+
             event_data = body['event']
-            if event_data.get('type') == 'message':
-                bot.handle_message(event_data)
+            try:
+                # Only mentions of the bot are commands
+                if event_data.get('type') == 'app_mention':
+                    try:
+                        deferred = _defer(event_data, context)
+                    except Exception as e:
+                        logger.warning("Could not defer event %s, running it now: %s", event_id, e)
+                        deferred = False
+                    if deferred:
+                        return _response(200, {'message': 'Event accepted'})
+                    loop.run_until_complete(bot.handle_message(event_data))
+                else:
+                    # Keep this container's cached channel data current
+                    bot.handle_channel_event(event_data)
+            except Exception:
+                # Let Slack's retry of this event through
+                if event_id:
+                    processed_events.forget(event_id)
+                raise
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'Event processed successfully'})
-        }
+        return _response(200, {'message': 'Event processed successfully'})
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        logger.exception("Error handling Lambda event: %s", e)
+        return _response(500, {'error': str(e)})
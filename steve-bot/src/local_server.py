@@ -1,60 +1,73 @@
 import os
 import asyncio
+import logging
+import signal
 from slack_sdk.socket_mode.aiohttp import SocketModeClient
+from slack_sdk.socket_mode.response import SocketModeResponse
 from slack_sdk.web.async_client import AsyncWebClient
 from bot import SlackBot
+from utils import EventDeduplicator, EventPipeline, REGISTRY, configure_logging, start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+# Seconds to let queued events finish on shutdown before cancelling them
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '30'))
+
+# Port for the Prometheus /metrics endpoint; 0 disables it
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9090'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
 
 # Track processed event IDs to prevent duplicate processing
-processed_event_ids = set()
+processed_events = EventDeduplicator()
+
+EVENTS = REGISTRY.counter(
+    'steve_events_total',
+    'Socket Mode events received, by event type and whether they were queued, applied to cached channel data, ignored or duplicates',
+    ['type', 'outcome']
+)
 
 async def process_message(client, req):
     """Process incoming message events."""
     try:
-        print(f"Received event type: {req.type}")
+        logger.debug("Received request type: %s", req.type)
+
+        # Acknowledge right away so Slack doesn't redeliver while commands run
+        await client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
         
         # Important: The Socket Mode client in the Slack SDK uses 'events_api' type, not 'events'
         if req.type == "events_api":
             payload = req.payload
             
-            # Check for duplicate events using event_id
+            # Check for duplicate events using event_id, recording new ones
             event_id = payload.get("event_id")
-            if event_id in processed_event_ids:
-                print(f"Skipping duplicate event: {event_id}")
-                return
-            
-            # Add this event to processed set
-            if event_id:
-                processed_event_ids.add(event_id)
-                # Limit size of set to prevent memory leaks
-                if len(processed_event_ids) > 1000:
-                    # Remove oldest entries (approximation - removes random items)
-                    # This is fine for our deduplication purposes
-                    while len(processed_event_ids) > 800:
-                        processed_event_ids.pop()
-            
-            print(f"Processing new event: {event_id}")
-            
             # Get the event from the payload
             event = payload.get("event", {})
             event_type = event.get("type")
-            print(f"Event type: {event_type}")
+
+            if event_id and processed_events.seen(event_id):
+                logger.info("Skipping duplicate event: %s", event_id)
+                EVENTS.inc(type=event_type, outcome='duplicate')
+                return
+            
+            logger.debug("Processing new event %s of type %s", event_id, event_type)
             
             # Only process app_mention events
             if event_type == "app_mention":
-                user_id = event.get('user')
                 # This check is unnecessary - we want to process all app_mention events
                 # The bot won't send app_mention events to itself
-                print(f"Processing message from user {user_id}")
-                print(f"Message text: {event.get('text')}")
-                print(f"Bot's user ID: {bot.bot_user_id}")
+                logger.debug("Message from user %s: %s", event.get('user'), event.get('text'))
                 
-                # Process the message
-                await bot.handle_message(event)
-                print("Message processed by bot.handle_message")
+                # Hand the message to the worker pool; this only waits if the queue is full
+                await pipeline.submit(event)
+                EVENTS.inc(type=event_type, outcome='queued')
+                logger.debug("Message queued, %d event(s) pending", pipeline.depth)
+            elif bot.handle_channel_event(event):
+                # Channel changes only touch cached data, so they are applied right away
+                EVENTS.inc(type=event_type, outcome='applied')
+            else:
+                EVENTS.inc(type=event_type, outcome='ignored')
     except Exception as e:
-        print(f"Error processing message: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing message: %s", e)
 
 async def main():
     # Get the required tokens from environment
@@ -62,39 +75,67 @@ async def main():
     user_token = os.getenv('SLACK_USER_TOKEN')
     
     if not app_token or not user_token:
-        print("Error: Both SLACK_APP_TOKEN and SLACK_USER_TOKEN environment variables must be set")
-        print("SLACK_APP_TOKEN should start with 'xapp-'")
-        print("SLACK_USER_TOKEN should start with 'xoxp-'")
+        logger.error("Both SLACK_APP_TOKEN and SLACK_USER_TOKEN environment variables must be set. "
+                     "SLACK_APP_TOKEN should start with 'xapp-', SLACK_USER_TOKEN with 'xoxp-'")
         return
 
     try:
         # Create the bot instance with an async web client
-        global bot
+        global bot, pipeline
         bot = SlackBot(AsyncWebClient(token=user_token))
         
         # Initialize the bot (get its user ID)
         await bot.initialize()
+
+        # Start the workers that run commands off the Socket Mode listener; each channel's
+        # commands run in order, except cheap ones, which don't wait behind the others
+        pipeline = EventPipeline(bot.handle_message, ordering_key=bot.ordering_key)
+        pipeline.start()
+        REGISTRY.gauge(
+            'steve_event_queue_depth',
+            'Events submitted to the worker pool and not yet finished',
+            function=lambda: pipeline.depth
+        )
+
+        metrics_server = None
+        if METRICS_PORT:
+            metrics_server = await start_metrics_server(METRICS_PORT, METRICS_HOST)
+            logger.info("Serving metrics on http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
         
         # Initialize Socket Mode client
         client = SocketModeClient(
             app_token=app_token,
-            web_client=bot.client
+            web_client=bot.web_client
         )
         
         # Add message handler
         client.socket_mode_request_listeners.append(process_message)
         
         # Start Socket Mode
-        print("Connecting to Slack using Socket Mode...")
+        logger.info("Connecting to Slack using Socket Mode...")
         await client.connect()
-        print("Successfully connected! Bot is ready to receive messages.")
+        logger.info("Successfully connected! Bot is ready to receive messages.")
         
-        # Keep the program running
-        await asyncio.Future()  # run forever
+        # Keep the program running until we are asked to stop
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+
+        # Stop receiving events, then let the queued ones finish
+        logger.info("Shutting down, draining queued events...")
+        await client.close()
+        if not await pipeline.drain(timeout=SHUTDOWN_DRAIN_TIMEOUT):
+            logger.warning("Timed out waiting for queued events, cancelled the rest")
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        logger.info("Shutdown complete")
         
     except Exception as e:
-        print(f"Error starting bot: {str(e)}")
+        logger.exception("Error starting bot: %s", e)
         raise
 
 if __name__ == '__main__':
+    configure_logging()
     asyncio.run(main())
@@ -0,0 +1,130 @@
+import re
+from typing import List, Optional
+from commands import CommandRegistry
+
+# A user mention, e.g. '<@U0783GA3C3H>' or '<@U0783GA3C3H|steve>'
+MENTION_PATTERN = re.compile(r'<@([A-Z0-9]+)(?:\|[^>]*)?>')
+
+class _TrieNode:
+    __slots__ = ('children', 'keywords')
+
+    def __init__(self):
+        self.children = {}
+        # Canonical keywords of every name that passes through this node
+        self.keywords = set()
+
+class Route:
+    """Result of routing a message: the command keyword and raw argument tokens, or an error."""
+
+    def __init__(self, keyword: Optional[str] = None, args: Optional[List[str]] = None,
+                 token: str = '', candidates: Optional[List[str]] = None):
+        self.keyword = keyword
+        self.args = args or []
+        # The token the user typed as the command, kept for error messages
+        self.token = token
+        # Keywords an ambiguous prefix could mean
+        self.candidates = candidates or []
+
+    @property
+    def error(self) -> Optional[str]:
+        """User-facing message if the command couldn't be resolved, else None."""
+        if self.keyword is not None:
+            return None
+        if self.candidates:
+            options = ", ".join(f"'{keyword}'" for keyword in self.candidates)
+            return f"'{self.token}' could mean {options}. Please type more of the command."
+        return f"Unknown command '{self.token}'. Type @<bot> help to see available commands."
+
+class CommandRouter:
+    """
+    Turns mention text into a command keyword and argument tokens.
+
+    Command names and aliases are held in a trie, so besides exact names any unique
+    prefix works (e.g. 'sum' for 'summarize'). The trie is rebuilt only when the
+    command registry changes.
+    """
+
+    def __init__(self, registry: CommandRegistry, default_keyword: str = 'help'):
+        """
+        Args:
+            registry: The bot's command registry
+            default_keyword: Command used when the bot is mentioned without one
+        """
+        self.registry = registry
+        self.default_keyword = default_keyword
+        self._version = None
+        self._names = {}
+        self._root = _TrieNode()
+
+    def _build(self) -> None:
+        names = {}
+        for keyword in self.registry:
+            names[keyword] = keyword
+            for alias in self.registry.aliases(keyword):
+                names.setdefault(alias, keyword)
+
+        root = _TrieNode()
+        for name, keyword in names.items():
+            node = root
+            for char in name:
+                node = node.children.setdefault(char, _TrieNode())
+                node.keywords.add(keyword)
+
+        self._names = names
+        self._root = root
+        self._version = self.registry.version
+
+    def resolve(self, token: str) -> Route:
+        """Resolve a command name, alias or unique prefix to its keyword."""
+        if self._version != self.registry.version:
+            self._build()
+
+        name = token.lower()
+        if name in self._names:
+            return Route(self._names[name], token=token)
+
+        node = self._root
+        for char in name:
+            node = node.children.get(char)
+            if node is None:
+                return Route(token=token)
+        if len(node.keywords) == 1:
+            return Route(next(iter(node.keywords)), token=token)
+        return Route(token=token, candidates=sorted(node.keywords))
+
+    @staticmethod
+    def command_text(text: str, bot_user_id: Optional[str]) -> str:
+        """
+        Extract the text following the bot mention.
+
+        Falls back to the text after the first mention of anyone (app_mention events
+        always mention the bot), and to the whole text if there is no mention.
+        """
+        first_mention = None
+        for match in MENTION_PATTERN.finditer(text):
+            if match.group(1) == bot_user_id:
+                return text[match.end():].strip()
+            if first_mention is None:
+                first_mention = match
+        if first_mention is not None:
+            return text[first_mention.end():].strip()
+        return text.strip()
+
+    def route(self, text: str, bot_user_id: Optional[str]) -> Route:
+        """
+        Route a message mentioning the bot.
+
+        Args:
+            text: The raw message text
+            bot_user_id: The bot's user ID, used to find its mention
+
+        Returns:
+            Route: The resolved command and its raw argument tokens
+        """
+        tokens = self.command_text(text, bot_user_id).split()
+        if not tokens:
+            # If mentioned without a command, show help
+            return Route(self.default_keyword, token=self.default_keyword)
+        route = self.resolve(tokens[0])
+        route.args = tokens[1:]
+        return route
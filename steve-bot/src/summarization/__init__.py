@@ -0,0 +1,4 @@
+from .backends import SummaryBackend, PlaceholderBackend, OpenAIBackend, get_backend
+from .engine import SummarizationEngine
+
+__all__ = ['SummaryBackend', 'PlaceholderBackend', 'OpenAIBackend', 'get_backend', 'SummarizationEngine']
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import List
+
+class SummaryBackend(ABC):
+    """Base class for the services that turn text into summaries."""
+
+    @abstractmethod
+    async def summarize(self, text: str) -> str:
+        """
+        Summarize a piece of conversation transcript.
+
+        Args:
+            text: Transcript text, at most one chunk long
+
+        Returns:
+            str: The summary
+        """
+        pass
+
+    @abstractmethod
+    async def combine(self, summaries: List[str]) -> str:
+        """
+        Merge partial summaries of consecutive transcript chunks into one.
+
+        Args:
+            summaries: Partial summaries, oldest chunk first
+
+        Returns:
+            str: The combined summary
+        """
+        pass
+
+class PlaceholderBackend(SummaryBackend):
+    """
+    Stand-in for an external AI summarization API.
+
+    Produces canned summaries based on transcript length and topic count, so the bot
+    and tests can run without an API key.
+    """
+
+    def __init__(self, delay: float = 0.5):
+        """
+        Args:
+            delay: Seconds to sleep per call, to simulate API latency
+        """
+        self.delay = delay
+
+    async def summarize(self, text: str) -> str:
+        # Simulate a slight delay as if making an API call
+        await asyncio.sleep(self.delay)
+        
+        # Length-based placeholder logic to make it slightly more realistic
+        text_length = len(text)
+        topic_count = text.count("Topic:") or 1
+        
+        # Create a placeholder summary based on conversation length/complexity
+        if text_length < 500:
+            return "Brief discussions occurred in the channel with minimal interaction."
+        elif text_length < 2000:
+            return f"Several conversations took place covering approximately {topic_count} topics. The discussions were moderately detailed and included some questions and responses between participants."
+        else:
+            return f"Extensive conversations occurred covering {topic_count} main topics. There were in-depth discussions with multiple participants sharing information, asking questions, and providing detailed responses."
+
+    async def combine(self, summaries: List[str]) -> str:
+        await asyncio.sleep(self.delay)
+        # Repeated canned sentences add nothing, so keep each one once
+        return "\n".join(dict.fromkeys(summaries))
+
+class OpenAIBackend(SummaryBackend):
+    """Summarizes with the OpenAI chat completions API."""
+
+    SUMMARIZE_PROMPT = (
+        "You summarize Slack channel conversations. Each line is '[HH:MM] Name: message'; "
+        "'Topic:' lines start a new topic. Write a concise summary of the main topics, "
+        "decisions and open questions."
+    )
+    COMBINE_PROMPT = (
+        "You are given summaries of consecutive parts of one Slack channel conversation, "
+        "oldest first. Merge them into a single concise summary of the main topics, "
+        "decisions and open questions."
+    )
+
+    def __init__(self, api_key: str = None, model: str = None):
+        """
+        Args:
+            api_key: OpenAI API key, defaults to OPENAI_API_KEY
+            model: Chat model name, defaults to OPENAI_MODEL or gpt-3.5-turbo
+        """
+        # Imported here so the placeholder backend works without the package installed
+        import openai
+        self._openai = openai
+        self.api_key = api_key or os.environ['OPENAI_API_KEY']
+        self.model = model or os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+
+    async def _complete(self, system_prompt: str, content: str) -> str:
+        response = await self._openai.ChatCompletion.acreate(
+            api_key=self.api_key,
+            model=self.model,
+            messages=[
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': content},
+            ],
+            temperature=0.2
+        )
+        return response['choices'][0]['message']['content'].strip()
+
+    async def summarize(self, text: str) -> str:
+        return await self._complete(self.SUMMARIZE_PROMPT, text)
+
+    async def combine(self, summaries: List[str]) -> str:
+        parts = "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+        return await self._complete(self.COMBINE_PROMPT, parts)
+
+def get_backend() -> SummaryBackend:
+    """
+    Create the summary backend selected by the SUMMARY_BACKEND environment variable.
+
+    Defaults to OpenAI when OPENAI_API_KEY is set, and to the placeholder otherwise.
+    """
+    default = 'openai' if os.getenv('OPENAI_API_KEY') else 'placeholder'
+    name = os.getenv('SUMMARY_BACKEND', default).lower()
+    if name == 'openai':
+        return OpenAIBackend()
+    if name == 'placeholder':
+        return PlaceholderBackend()
+    raise ValueError(f"Unknown SUMMARY_BACKEND: {name}")
@@ -0,0 +1,127 @@
+import os
+import re
+from typing import Callable, List, Optional
+from utils import bounded_gather
+from .backends import SummaryBackend, get_backend
+
+# Transcript topic headers, as written by TranscriptBuilder.add_topic
+TOPIC_BOUNDARY = re.compile(r'(?=\n\nTopic: )')
+
+class SummarizationEngine:
+    """
+    Map-reduce summarizer for transcripts too large for a single backend call.
+
+    The transcript is split on topic boundaries into chunks of at most `chunk_chars`
+    characters, the chunks are summarized concurrently, and the partial summaries
+    are combined, recursively if they are themselves too large.
+    """
+
+    def __init__(self, backend: SummaryBackend = None, chunk_chars: int = None, concurrency: int = None):
+        """
+        Args:
+            backend: Summary backend, defaults to the one selected by get_backend()
+            chunk_chars: Maximum characters sent to the backend per call
+            concurrency: Maximum number of backend calls in flight at once
+        """
+        self.backend = backend or get_backend()
+        self.chunk_chars = chunk_chars or int(os.getenv('SUMMARY_CHUNK_CHARS', '12000'))
+        self.concurrency = concurrency or int(os.getenv('SUMMARY_CONCURRENCY', '4'))
+
+    def split(self, transcript: str) -> List[str]:
+        """
+        Split a transcript into chunks of at most `chunk_chars` characters.
+
+        Whole topics are packed together where they fit; a topic that is too large
+        on its own is split between lines, and a single over-long line is cut.
+        """
+        pieces = []
+        for section in TOPIC_BOUNDARY.split(transcript):
+            if len(section) <= self.chunk_chars:
+                pieces.append(section)
+                continue
+            for line in section.splitlines(keepends=True):
+                while len(line) > self.chunk_chars:
+                    pieces.append(line[:self.chunk_chars])
+                    line = line[self.chunk_chars:]
+                pieces.append(line)
+
+        chunks = []
+        current = []
+        current_size = 0
+        for piece in pieces:
+            if current and current_size + len(piece) > self.chunk_chars:
+                chunks.append("".join(current))
+                current = []
+                current_size = 0
+            current.append(piece)
+            current_size += len(piece)
+        if current:
+            chunks.append("".join(current))
+        return [chunk for chunk in chunks if chunk.strip()] or [transcript]
+
+    async def summarize(self, transcript: str, on_progress: Optional[Callable[[int, int], None]] = None) -> str:
+        """
+        Summarize a transcript of any length.
+
+        Args:
+            transcript: The conversation transcript
+            on_progress: Called with (chunks done, total chunks) as chunk summaries complete
+
+        Returns:
+            str: The summary
+        """
+        chunks = self.split(transcript)
+        if on_progress:
+            on_progress(0, len(chunks))
+        if len(chunks) == 1:
+            summary = await self.backend.summarize(chunks[0])
+            if on_progress:
+                on_progress(1, 1)
+            return summary
+
+        done = 0
+
+        async def summarize_chunk(chunk):
+            nonlocal done
+            summary = await self.backend.summarize(chunk)
+            done += 1
+            if on_progress:
+                on_progress(done, len(chunks))
+            return summary
+
+        partials = await bounded_gather(
+            (summarize_chunk(chunk) for chunk in chunks),
+            self.concurrency
+        )
+        return await self.reduce(partials)
+
+    async def reduce(self, summaries: List[str]) -> str:
+        """Combine partial summaries, in groups that fit a single backend call."""
+        if len(summaries) == 1:
+            return summaries[0]
+
+        groups = []
+        current = []
+        current_size = 0
+        for summary in summaries:
+            if current and current_size + len(summary) > self.chunk_chars:
+                groups.append(current)
+                current = []
+                current_size = 0
+            current.append(summary)
+            current_size += len(summary)
+        groups.append(current)
+
+        # Combine in one call when everything fits, or when no group can shrink further
+        if len(groups) == 1 or len(groups) == len(summaries):
+            return await self.backend.combine(summaries)
+
+        combined = await bounded_gather(
+            (self.backend.combine(group) if len(group) > 1 else self._identity(group[0]) for group in groups),
+            self.concurrency
+        )
+        return await self.reduce(combined)
+
+    @staticmethod
+    async def _identity(summary: str) -> str:
+        return summary
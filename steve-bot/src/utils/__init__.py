@@ -1,3 +1,53 @@
-from .slack_errors import SlackErrorHandler, is_retryable_error
+from .slack_errors import SlackErrorHandler, is_retryable_error, retry_after_seconds
+from .admission import AdmissionController, AdmissionError
+from .channel_directory import ChannelDirectory
+from .client_cache import CachingWebClient
+from .concurrency import SingleFlight, bounded_gather
+from .dedup import EventDeduplicator
+from .event_pipeline import EventPipeline
+from .history import ChannelHistoryStream
+from .history_cache import HistoryCache
+from .log_config import JsonFormatter, configure_logging
+from .metrics import (
+    REGISTRY,
+    InstrumentedWebClient,
+    MetricsRegistry,
+    command_context,
+    current_command,
+    start_metrics_server,
+)
+from .progress import ProgressMessage
+from .rate_limiter import RateLimiter, RateLimitedWebClient
+from .summary_cache import SummaryCache
+from .transcript import TranscriptBuilder
+from .user_directory import UserDirectory
 
-__all__ = ['SlackErrorHandler', 'is_retryable_error']
+__all__ = [
+    'SlackErrorHandler',
+    'is_retryable_error',
+    'retry_after_seconds',
+    'AdmissionController',
+    'AdmissionError',
+    'ChannelDirectory',
+    'CachingWebClient',
+    'SingleFlight',
+    'bounded_gather',
+    'EventDeduplicator',
+    'EventPipeline',
+    'ChannelHistoryStream',
+    'HistoryCache',
+    'JsonFormatter',
+    'configure_logging',
+    'REGISTRY',
+    'InstrumentedWebClient',
+    'MetricsRegistry',
+    'command_context',
+    'current_command',
+    'start_metrics_server',
+    'ProgressMessage',
+    'RateLimiter',
+    'RateLimitedWebClient',
+    'SummaryCache',
+    'TranscriptBuilder',
+    'UserDirectory',
+]
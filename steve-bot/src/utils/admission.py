@@ -0,0 +1,150 @@
+import asyncio
+import contextlib
+import os
+from collections import Counter, deque
+from .metrics import REGISTRY
+
+REJECTED = REGISTRY.counter(
+    'steve_admission_rejected_total',
+    'Expensive commands turned away by admission control, by reason',
+    ['reason']
+)
+
+class AdmissionError(Exception):
+    """Raised when a command is not admitted; the message is meant for the user."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+class AdmissionController:
+    """
+    Decides whether and when a command may run, based on its estimated cost.
+
+    Cheap commands (cost 0) are always admitted straight away, so they never wait
+    behind expensive ones; SlackBot.ordering_key also lets them skip their channel's
+    order in the EventPipeline. Expensive commands are limited per user and per channel,
+    and share a global cost budget: a command waits in arrival order until the
+    budget has room for it, and is turned away if too many are already waiting
+    or it waits longer than `queue_timeout`.
+
+    Usage:
+        async with admission.admit(user, channel, cost):
+            await command.execute(...)
+    """
+
+    def __init__(self, max_per_user: int = None, max_per_channel: int = None, budget: int = None,
+                 max_pending: int = None, queue_timeout: float = None):
+        """
+        Args:
+            max_per_user: Expensive commands one user may have running or waiting
+            max_per_channel: Expensive commands one channel may have running or waiting
+            budget: Total cost of the expensive commands allowed to run at once
+            max_pending: Expensive commands allowed to be running or waiting in total; keep
+                this below the number of event workers so one is always free for cheap commands
+            queue_timeout: Seconds a command may wait for budget before it is turned away
+        """
+        self.max_per_user = max_per_user or int(os.getenv('ADMISSION_MAX_PER_USER', '2'))
+        self.max_per_channel = max_per_channel or int(os.getenv('ADMISSION_MAX_PER_CHANNEL', '2'))
+        self.budget = budget or int(os.getenv('ADMISSION_COST_BUDGET', '10'))
+        self.max_pending = max_pending or int(os.getenv('ADMISSION_MAX_PENDING', '3'))
+        self.queue_timeout = queue_timeout or float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '120'))
+        self.in_use = 0
+        self._users = Counter()
+        self._channels = Counter()
+        # (cost, future) of the commands waiting for budget, in arrival order
+        self._waiters = deque()
+
+    @property
+    def pending(self) -> int:
+        """Expensive commands running or waiting."""
+        return sum(self._users.values())
+
+    @property
+    def queued(self) -> int:
+        """Expensive commands waiting for budget."""
+        return len(self._waiters)
+
+    def _reject(self, message: str, reason: str):
+        REJECTED.inc(reason=reason)
+        raise AdmissionError(message, reason)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, user: str, channel: str, cost: int):
+        """
+        Hold a command's share of the limits while the block runs.
+
+        Args:
+            user: The user ID who invoked the command
+            channel: The channel ID where the command was invoked
+            cost: The command's estimated cost, see BaseCommand.estimate_cost
+
+        Raises:
+            AdmissionError: If the command can't be admitted
+        """
+        if cost <= 0:
+            yield
+            return
+
+        if self._users[user] >= self.max_per_user:
+            self._reject(f"You already have {self._users[user]} commands running. "
+                         "Please wait for them to finish.", 'user')
+        if self._channels[channel] >= self.max_per_channel:
+            self._reject("Other commands are already running in this channel. "
+                         "Please try again once they have finished.", 'channel')
+        if self.pending >= self.max_pending:
+            self._reject("I'm busy with other requests right now. Please try again in a minute.", 'busy')
+
+        # A command costing more than the whole budget runs on its own
+        cost = min(cost, self.budget)
+        self._users[user] += 1
+        self._channels[channel] += 1
+        try:
+            await self._acquire(cost)
+            try:
+                yield
+            finally:
+                self._release(cost)
+        finally:
+            for counter, key in ((self._users, user), (self._channels, channel)):
+                counter[key] -= 1
+                if not counter[key]:
+                    del counter[key]
+
+    async def _acquire(self, cost: int) -> None:
+        if not self._waiters and self.in_use + cost <= self.budget:
+            self.in_use += cost
+            return
+
+        waiter = (cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            done, _ = await asyncio.wait({waiter[1]}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            self._reject("I'm busy with other requests right now. Please try again in a minute.", 'timeout')
+
+    def _abandon(self, waiter) -> None:
+        cost, future = waiter
+        if future.done():
+            # The budget was granted just as we gave up; hand it back
+            self._release(cost)
+        else:
+            future.cancel()
+            self._waiters.remove(waiter)
+            # The next waiter may fit now that this one left the head of the queue
+            self._grant()
+
+    def _release(self, cost: int) -> None:
+        self.in_use -= cost
+        self._grant()
+
+    def _grant(self) -> None:
+        # Strictly first come, first served, so a large command isn't overtaken forever
+        while self._waiters and self.in_use + self._waiters[0][0] <= self.budget:
+            cost, future = self._waiters.popleft()
+            self.in_use += cost
+            future.set_result(None)
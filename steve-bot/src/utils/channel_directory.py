@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class ChannelDirectory:
+    """
+    Process-wide cache of channel metadata and member counts.
+
+    Entries live until a Slack event reports a change to the channel (see
+    apply_event) or, as a backstop for missed events, until their TTL expires.
+    Member counts come from conversations.info's num_members when Slack includes
+    it, and are otherwise counted by paging through conversations.members in a
+    background task, so no request waits for a large channel to be paged through.
+    On Lambda no event loop runs between invocations, so a request waits up to
+    `count_wait` seconds for the count instead of leaving the task to stall.
+
+    Expired entries are swept out once per TTL.
+    """
+
+    # Events that change what the directory knows about a channel
+    MEMBER_EVENTS = {'member_joined_channel': 1, 'member_left_channel': -1}
+    CHANNEL_EVENTS = {
+        'channel_rename', 'channel_archive', 'channel_unarchive', 'channel_deleted',
+        'group_rename', 'group_archive', 'group_unarchive', 'group_deleted',
+    }
+    # Message subtypes Slack posts when a channel's details change
+    MESSAGE_SUBTYPES = {'channel_topic', 'channel_purpose', 'channel_name', 'group_topic', 'group_purpose', 'group_name'}
+
+    def __init__(self, ttl: float = None, page_size: int = 1000, count_wait: float = None):
+        """
+        Args:
+            ttl: Seconds metadata and member counts are trusted without any event
+            page_size: Members requested per conversations.members page when counting
+            count_wait: Seconds member_count waits for a recount; 0 leaves it to run in the
+                background (default: 2 on Lambda, otherwise 0)
+        """
+        self.ttl = ttl or float(os.getenv('CHANNEL_DIRECTORY_TTL', '3600'))
+        self.page_size = page_size
+        if count_wait is None:
+            on_lambda = bool(os.getenv('AWS_LAMBDA_FUNCTION_NAME'))
+            count_wait = float(os.getenv('CHANNEL_MEMBER_COUNT_WAIT', '2' if on_lambda else '0'))
+        self.count_wait = count_wait
+        # channel -> (info, expires_at)
+        self._info = {}
+        # channel -> (member count, expires_at)
+        self._members = {}
+        # channel -> (generation, expires_at), bumped on every invalidation so fetches that
+        # started earlier don't store stale data
+        self._generation = {}
+        self._refreshing = {}
+        self._next_eviction = time.monotonic() + self.ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _current_generation(self, channel: str) -> int:
+        entry = self._generation.get(channel)
+        return entry[0] if entry is not None else 0
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + self.ttl
+        for entries in (self._info, self._members, self._generation):
+            for channel in [channel for channel, entry in entries.items() if entry[1] <= now]:
+                del entries[channel]
+
+    def _fresh(self, entries: dict, channel: str):
+        entry = entries.get(channel)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def info(self, client, channel: str) -> dict:
+        """
+        Get a channel's conversations.info object, fetching it on a cache miss.
+
+        Raises:
+            SlackApiError: If the channel can't be looked up
+        """
+        info = self._fresh(self._info, channel)
+        if info is not None:
+            self.hits += 1
+            return info
+
+        self.misses += 1
+        self._evict()
+        generation = self._current_generation(channel)
+        info = (await client.conversations_info(channel=channel, include_num_members=True))['channel']
+        if self._current_generation(channel) == generation:
+            expires_at = time.monotonic() + self.ttl
+            self._info[channel] = (info, expires_at)
+            if 'num_members' in info:
+                self._members[channel] = (info['num_members'], expires_at)
+        return info
+
+    async def member_count(self, client, channel: str) -> Optional[int]:
+        """
+        Get a channel's member count without waiting long on the API.
+
+        Returns the cached count, possibly stale, and starts a recount when it is
+        missing or expired, waiting up to `count_wait` seconds for it to finish.
+        Returns None if no count is known yet.
+        """
+        entry = self._members.get(channel)
+        if entry is None or entry[1] <= time.monotonic():
+            task = self.refresh_members(client, channel)
+            if self.count_wait > 0:
+                try:
+                    # Shielded so a slow count carries on, and is reused, after the wait
+                    count = await asyncio.wait_for(asyncio.shield(task), self.count_wait)
+                except asyncio.TimeoutError:
+                    count = None
+                if count is not None:
+                    return count
+        return entry[0] if entry is not None else None
+
+    def refresh_members(self, client, channel: str) -> asyncio.Task:
+        """Start counting a channel's members in the background, unless already counting."""
+        task = self._refreshing.get(channel)
+        if task is None:
+            self._evict()
+            # A fresh context, so the count isn't attributed to the command that started it
+            task = asyncio.get_running_loop().create_task(
+                self._count_members(client, channel),
+                context=contextvars.Context()
+            )
+            self._refreshing[channel] = task
+            task.add_done_callback(lambda done: self._refreshing.pop(channel, None))
+        return task
+
+    async def _count_members(self, client, channel: str) -> Optional[int]:
+        generation = self._current_generation(channel)
+        count = 0
+        cursor = None
+        try:
+            while True:
+                response = await client.conversations_members(channel=channel, limit=self.page_size, cursor=cursor)
+                count += len(response.get('members', []))
+                cursor = (response.get('response_metadata') or {}).get('next_cursor')
+                if not cursor:
+                    break
+        except Exception as e:
+            logger.warning("Could not count members of %s: %s", channel, e)
+            return None
+        if self._current_generation(channel) == generation:
+            self._members[channel] = (count, time.monotonic() + self.ttl)
+        return count
+
+    def invalidate(self, channel: str, members: bool = True) -> None:
+        """Forget a channel's metadata, and its member count unless `members` is False."""
+        # Kept for a TTL, longer than any fetch that started before it can take
+        self._generation[channel] = (self._current_generation(channel) + 1, time.monotonic() + self.ttl)
+        self._info.pop(channel, None)
+        if members:
+            self._members.pop(channel, None)
+
+    def apply_event(self, event: dict) -> Optional[str]:
+        """
+        Update the directory for a Slack event.
+
+        Joins and leaves adjust a cached member count in place; renames, archiving
+        and topic or purpose changes drop the cached metadata.
+
+        Returns:
+            The ID of the channel that changed, or None if the event doesn't concern the directory
+        """
+        event_type = event.get('type')
+        if event_type in self.MEMBER_EVENTS:
+            channel = event.get('channel')
+            entry = self._members.get(channel)
+            # The cached num_members in the metadata, and any count in progress, are out of date now
+            self.invalidate(channel, members=False)
+            if entry is not None:
+                self._members[channel] = (max(entry[0] + self.MEMBER_EVENTS[event_type], 0), entry[1])
+            return channel
+
+        if event_type in self.CHANNEL_EVENTS:
+            channel = event.get('channel')
+            if isinstance(channel, dict):
+                channel = channel.get('id')
+        elif event_type == 'message' and event.get('subtype') in self.MESSAGE_SUBTYPES:
+            channel = event.get('channel')
+        else:
+            return None
+
+        if channel:
+            self.invalidate(channel, members=event_type.endswith('_deleted'))
+        return channel
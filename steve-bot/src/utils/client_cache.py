@@ -0,0 +1,117 @@
+import functools
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from .concurrency import SingleFlight
+
+class CachingWebClient:
+    """
+    Wraps an AsyncWebClient to avoid repeating identical read-only API calls.
+
+    Identical read calls that are in flight at the same time share one request, and
+    responses of the methods listed in `ttls` are cached for that many seconds.
+    Every other attribute is passed straight through to the wrapped client.
+    """
+
+    # Read-only methods whose concurrent identical calls are coalesced
+    READ_METHODS = {
+        'auth_test',
+        'bots_info',
+        'conversations_history',
+        'conversations_info',
+        'conversations_list',
+        'conversations_members',
+        'conversations_replies',
+        'team_info',
+        'users_info',
+        'users_list',
+    }
+    # Seconds a response stays cached, per method
+    DEFAULT_TTLS = {
+        'auth_test': 3600,
+        'conversations_info': 60,
+        'users_info': 3600,
+    }
+
+    def __init__(self, client, ttls: Optional[Dict[str, float]] = None, max_entries: int = 10000):
+        """
+        Args:
+            client: The AsyncWebClient to wrap
+            ttls: Cache lifetime in seconds per method name, defaults to DEFAULT_TTLS
+            max_entries: Maximum number of cached responses across all methods
+        """
+        self._client = client
+        self._ttls = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self._max_entries = max_entries
+        # (method, params) -> (expires_at, response), least recently used first
+        self._cache = OrderedDict()
+        self._inflight = SingleFlight()
+        self._stats = {}
+
+    @property
+    def wrapped(self):
+        """The underlying AsyncWebClient."""
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name in self.READ_METHODS and callable(attribute):
+            return functools.partial(self._call, name, attribute)
+        return attribute
+
+    @staticmethod
+    def _key(method: str, params: dict) -> tuple:
+        return (method, repr(sorted(params.items())))
+
+    def _count(self, method: str, outcome: str) -> None:
+        counters = self._stats.setdefault(method, {'hits': 0, 'misses': 0, 'coalesced': 0})
+        counters[outcome] += 1
+
+    async def _call(self, method: str, function, **params):
+        key = self._key(method, params)
+        ttl = self._ttls.get(method)
+
+        if ttl:
+            entry = self._cache.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > time.monotonic():
+                    self._cache.move_to_end(key)
+                    self._count(method, 'hits')
+                    return response
+                del self._cache[key]
+
+        if key in self._inflight:
+            self._count(method, 'coalesced')
+        else:
+            self._count(method, 'misses')
+
+        async def fetch():
+            response = await function(**params)
+            if ttl:
+                self._cache[key] = (time.monotonic() + ttl, response)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self._max_entries:
+                    self._cache.popitem(last=False)
+            return response
+
+        return await self._inflight.run(key, fetch)
+
+    def invalidate(self, method: Optional[str] = None, **params) -> None:
+        """
+        Drop cached responses.
+
+        Args:
+            method: Only drop responses of this method, or all methods if None
+            params: Only drop the response for exactly these call parameters
+        """
+        if method is not None and params:
+            self._cache.pop(self._key(method, params), None)
+            return
+        for key in list(self._cache):
+            if method is None or key[0] == method:
+                del self._cache[key]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit, miss and coalesced call counters per method."""
+        return {method: dict(counters) for method, counters in self._stats.items()}
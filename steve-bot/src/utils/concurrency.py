@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Iterable, List
+
+async def bounded_gather(aws: Iterable[Awaitable], limit: int, return_exceptions: bool = False) -> List[Any]:
+    """
+    Await a collection of awaitables concurrently, running at most `limit` at a time.
+
+    Args:
+        aws: The awaitables (usually coroutines) to run
+        limit: Maximum number of awaitables in flight at once
+        return_exceptions: Passed through to asyncio.gather
+
+    Returns:
+        List[Any]: Results in the same order as `aws`
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single in-flight execution.
+
+    The first caller for a key starts the work; callers arriving while it runs await
+    the same result (or exception). Nothing is remembered once the work finishes.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    def __len__(self) -> int:
+        """Number of keys currently in flight."""
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable]) -> Any:
+        """
+        Run `factory()` for `key`, or join the call already in flight for it.
+
+        Args:
+            key: Identifies equivalent calls
+            factory: Creates the awaitable to run when no call is in flight
+
+        Returns:
+            Any: The result of the shared call
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        # Shield so one caller being cancelled doesn't cancel the work for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class EventDeduplicator:
+    """
+    Remembers recently seen Slack event IDs so redelivered events are processed once.
+
+    IDs are kept in insertion order with a fixed TTL, so expired IDs are always at the
+    front and are purged in amortized O(1); the oldest IDs are also dropped once
+    `max_size` is reached. With a SQLite `path`, the IDs are additionally recorded in
+    a file shared by every process using it (e.g. several bot processes, or Lambda
+    invocations with a mounted file system).
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None, path: Optional[str] = None):
+        """
+        Args:
+            ttl: Seconds an event ID is remembered
+            max_size: Maximum number of event IDs kept in memory
+            path: Optional SQLite file shared between processes, defaults to DEDUP_DB_PATH
+        """
+        self.ttl = ttl or float(os.getenv('DEDUP_TTL', '600'))
+        self.max_size = max_size or int(os.getenv('DEDUP_MAX_SIZE', '10000'))
+        self.path = path or os.getenv('DEDUP_DB_PATH')
+        # event_id -> expires_at, oldest first
+        self._seen = OrderedDict()
+        self._db = None
+        self._writes = 0
+        if self.path:
+            self._db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS seen_events (
+                    event_id TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _purge(self, now: float) -> None:
+        while self._seen:
+            event_id, expires_at = next(iter(self._seen.items()))
+            if expires_at > now and len(self._seen) <= self.max_size:
+                break
+            self._seen.popitem(last=False)
+
+    def seen(self, event_id: str) -> bool:
+        """
+        Check whether an event was already seen, recording it if not.
+
+        Args:
+            event_id: The event_id from the Slack event envelope
+
+        Returns:
+            bool: True if the event is a duplicate and should be skipped
+        """
+        now = time.time()
+        self._purge(now)
+        expires_at = self._seen.get(event_id)
+        if expires_at is not None and expires_at > now:
+            return True
+
+        if self._db is not None and not self._claim(event_id, now):
+            duplicate = True
+        else:
+            duplicate = False
+
+        self._seen[event_id] = now + self.ttl
+        self._seen.move_to_end(event_id)
+        self._purge(now)
+        return duplicate
+
+    def _claim(self, event_id: str, now: float) -> bool:
+        """Record an event in the shared store; False if another process already holds it."""
+        # Inserts a new ID or takes over an expired one in a single atomic statement
+        cursor = self._db.execute(
+            "INSERT INTO seen_events (event_id, expires_at) VALUES (?, ?) "
+            "ON CONFLICT (event_id) DO UPDATE SET expires_at = excluded.expires_at "
+            "WHERE seen_events.expires_at <= ?",
+            (event_id, now + self.ttl, now)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._db.execute("DELETE FROM seen_events WHERE expires_at <= ?", (now,))
+        return cursor.rowcount == 1
+
+    def forget(self, event_id: str) -> None:
+        """Release an event recorded by seen(), so a redelivery of it is processed."""
+        self._seen.pop(event_id, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM seen_events WHERE event_id = ?", (event_id,))
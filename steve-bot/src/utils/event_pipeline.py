@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class EventPipeline:
+    """
+    Processes Slack events on a pool of worker tasks.
+
+    Events for the same channel run one at a time in arrival order, while events
+    for different channels run in parallel. An `ordering_key` can group events
+    differently; events it maps to None are not ordered at all and start as soon
+    as a worker is free. Once `high_water_mark` events are
+    pending, submit() waits for room, pushing back on the producer.
+
+    Usage:
+        pipeline = EventPipeline(bot.handle_message)
+        pipeline.start()
+        await pipeline.submit(event)
+        ...
+        await pipeline.drain(timeout=30)
+    """
+
+    def __init__(self, handler: Callable[[dict], Awaitable], workers: int = None, high_water_mark: int = None,
+                 ordering_key: Callable[[dict], Optional[Hashable]] = None):
+        """
+        Args:
+            handler: Coroutine function called with each event
+            workers: Number of worker tasks
+            high_water_mark: Maximum number of pending events before submit() waits
+            ordering_key: Maps an event to the key its order is kept within, or None to run
+                it unordered (default: the event's channel)
+        """
+        self.handler = handler
+        self.ordering_key = ordering_key or (lambda event: event.get('channel'))
+        self.worker_count = workers or int(os.getenv('EVENT_WORKERS', '4'))
+        self.high_water_mark = high_water_mark or int(os.getenv('EVENT_QUEUE_HIGH_WATER_MARK', '100'))
+        # ordering key -> events not yet started; a key is present while it is queued or being processed
+        self._pending = {}
+        # Keys with an event ready to run and no worker on them
+        self._ready = asyncio.Queue()
+        self._size = 0
+        self._changed = asyncio.Condition()
+        self._workers = []
+        self._accepting = True
+
+    @property
+    def depth(self) -> int:
+        """Number of events submitted but not yet finished."""
+        return self._size
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        for _ in range(self.worker_count):
+            self._workers.append(asyncio.ensure_future(self._work()))
+
+    async def submit(self, event: dict) -> None:
+        """
+        Queue an event, waiting while the pipeline is at its high-water mark.
+
+        Raises:
+            RuntimeError: If the pipeline is draining
+        """
+        # Worked out before a slot is taken, so a failing key function can't leak one
+        try:
+            key = self.ordering_key(event)
+        except Exception as e:
+            logger.warning("Could not work out the ordering key of an event, ordering it by channel: %s", e)
+            key = event.get('channel')
+        if key is None:
+            # A key of its own, so nothing waits for it and it waits for nothing
+            key = object()
+
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._size < self.high_water_mark or not self._accepting)
+            if not self._accepting:
+                raise RuntimeError("Event pipeline is shutting down")
+            self._size += 1
+
+        if key in self._pending:
+            # A worker is already on this key; it will pick the event up in order
+            self._pending[key].append(event)
+        else:
+            self._pending[key] = deque([event])
+            self._ready.put_nowait(key)
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._ready.get()
+            event = self._pending[key].popleft()
+            try:
+                await self.handler(event)
+            except Exception as e:
+                logger.exception("Error processing event in channel %s: %s", event.get('channel'), e)
+            finally:
+                if self._pending[key]:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                async with self._changed:
+                    self._size -= 1
+                    self._changed.notify_all()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting events, wait for the pending ones to finish and stop the workers.
+
+        Args:
+            timeout: Seconds to wait before cancelling unfinished events, or None to wait forever
+
+        Returns:
+            bool: True if every pending event finished
+        """
+        async with self._changed:
+            self._accepting = False
+            self._changed.notify_all()
+
+        async def wait_until_empty():
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._size == 0)
+
+        try:
+            await asyncio.wait_for(wait_until_empty(), timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        return drained
@@ -0,0 +1,78 @@
+from typing import AsyncIterator, Optional
+
+class ChannelHistoryStream:
+    """
+    Async iterator over a channel's history that follows next_cursor across every page.
+
+    Messages are yielded newest first, exactly as Slack returns them, one page in
+    memory at a time. Iteration stops early once the message or byte budget is
+    spent, so long lookbacks on busy channels keep memory use flat.
+
+    Usage:
+        stream = ChannelHistoryStream(client, channel, oldest=ts)
+        async for msg in stream:
+            ...
+        if stream.truncated:
+            ...
+    """
+
+    def __init__(self, client, channel: str, oldest: Optional[float] = None, latest: Optional[float] = None,
+                 page_size: int = 200, max_messages: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            client: Slack AsyncWebClient instance
+            channel: The channel ID to read
+            oldest: Only include messages after this Unix timestamp
+            latest: Only include messages before this Unix timestamp
+            page_size: Number of messages to request per conversations_history call
+            max_messages: Stop after yielding this many messages
+            max_bytes: Stop once the yielded message text exceeds this many bytes
+        """
+        self.client = client
+        self.channel = channel
+        self.oldest = oldest
+        self.latest = latest
+        self.page_size = page_size
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        # Progress counters, updated while iterating
+        self.pages = 0
+        self.message_count = 0
+        self.byte_count = 0
+        self.truncated = False
+
+    def __aiter__(self) -> AsyncIterator[dict]:
+        return self._iterate()
+
+    def _over_budget(self, msg: dict) -> bool:
+        if self.max_messages is not None and self.message_count >= self.max_messages:
+            return True
+        if self.max_bytes is not None:
+            size = len(msg.get('text', '').encode('utf-8'))
+            if self.byte_count + size > self.max_bytes:
+                return True
+        return False
+
+    async def _iterate(self) -> AsyncIterator[dict]:
+        params = {'channel': self.channel, 'limit': self.page_size}
+        if self.oldest is not None:
+            params['oldest'] = self.oldest
+        if self.latest is not None:
+            params['latest'] = self.latest
+
+        cursor = None
+        while True:
+            response = await self.client.conversations_history(cursor=cursor, **params)
+            self.pages += 1
+
+            for msg in response.get('messages', []):
+                if self._over_budget(msg):
+                    self.truncated = True
+                    return
+                self.message_count += 1
+                self.byte_count += len(msg.get('text', '').encode('utf-8'))
+                yield msg
+
+            cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not response.get('has_more') or not cursor:
+                return
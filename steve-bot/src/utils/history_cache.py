@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+from .history import ChannelHistoryStream
+
+class HistoryCache:
+    """
+    Local SQLite store of channel messages, keyed by channel and ts.
+
+    A summary first syncs the channel, which only asks Slack for messages newer than
+    the last cached one, then reads its window from the store. To pick up edits,
+    deletions and new thread activity, each sync re-reads a short overlap window
+    before the newest cached message, and the whole window is re-read once the
+    last full sync is older than `full_resync_interval`. Messages older than the
+    retention period are evicted.
+
+    Database work runs in a worker thread so large windows don't block the event
+    loop; async callers should do the same for the synchronous readers, e.g.
+    `await asyncio.to_thread(cache.recent_messages, ...)`.
+
+    Thread replies are cached per parent for `thread_ttl` seconds. Parents older
+    than the overlap window are not re-read, so their `latest_reply` marker can be
+    stale; it only invalidates a cached thread early, never keeps one alive.
+    """
+
+    def __init__(self, path: str = None, retention_days: int = 7, refresh_overlap: float = None,
+                 full_resync_interval: float = None, thread_ttl: float = None):
+        """
+        Args:
+            path: SQLite database file, created readable by the owner only; ':memory:' (the
+                default) keeps the store private to the process
+            retention_days: Messages older than this are evicted on every sync
+            refresh_overlap: Seconds before the newest cached message that every sync re-reads
+            full_resync_interval: Seconds after which the whole window is fetched again
+            thread_ttl: Seconds a thread's cached replies are reused before being fetched again
+        """
+        self.path = path or os.getenv('HISTORY_CACHE_PATH') or ':memory:'
+        self.retention_days = retention_days
+        self.refresh_overlap = refresh_overlap or float(os.getenv('HISTORY_CACHE_REFRESH_OVERLAP', '900'))
+        self.full_resync_interval = full_resync_interval or float(os.getenv('HISTORY_CACHE_FULL_RESYNC', '21600'))
+        self.thread_ttl = thread_ttl if thread_ttl is not None else float(os.getenv('HISTORY_CACHE_THREAD_TTL', '60'))
+        if self.path != ':memory:':
+            # Message history is private; don't let other users of the host read it
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(self.path, 0o600)
+        # Used from worker threads one at a time, serialized by the lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(threads)")}
+        if columns and 'fetched_at' not in columns:
+            # Cached threads from before fetched_at was tracked can't be aged, so drop them
+            self._db.execute("DROP TABLE threads")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                channel TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                ts_value REAL NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (channel, ts)
+            );
+            CREATE INDEX IF NOT EXISTS messages_by_time ON messages (channel, ts_value);
+            CREATE TABLE IF NOT EXISTS threads (
+                channel TEXT NOT NULL,
+                thread_ts TEXT NOT NULL,
+                latest_reply TEXT,
+                fetched_at REAL NOT NULL,
+                replies TEXT NOT NULL,
+                PRIMARY KEY (channel, thread_ts)
+            );
+            CREATE TABLE IF NOT EXISTS channels (
+                channel TEXT PRIMARY KEY,
+                covered_from REAL NOT NULL,
+                full_synced_at REAL NOT NULL
+            );
+        """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    async def sync(self, client, channel: str, oldest: float, page_size: int = 200,
+                   max_messages: Optional[int] = None) -> ChannelHistoryStream:
+        """
+        Bring the cached copy of a channel up to date from `oldest` onwards.
+
+        Args:
+            client: Slack AsyncWebClient instance
+            channel: The channel ID to sync
+            oldest: Unix timestamp the caller needs history from
+            page_size: Number of messages to request per conversations_history call
+            max_messages: Stop fetching after this many messages
+
+        Returns:
+            ChannelHistoryStream: The consumed stream, for its page and message counters
+        """
+        now = time.time()
+        full_sync, fetch_from = await asyncio.to_thread(self._plan_sync, channel, oldest, now)
+
+        stream = ChannelHistoryStream(
+            client,
+            channel,
+            oldest=fetch_from,
+            page_size=page_size,
+            max_messages=max_messages
+        )
+        # Each page is written as it arrives, so memory holds one page however long the window.
+        # `upper` is the oldest message written so far; everything newer has been replaced.
+        page = []
+        upper = None
+        async for msg in stream:
+            page.append((channel, msg['ts'], float(msg['ts']), json.dumps(msg)))
+            if len(page) >= page_size:
+                upper = await asyncio.to_thread(self._store_page, channel, page, upper)
+                page = []
+        if page:
+            upper = await asyncio.to_thread(self._store_page, channel, page, upper)
+
+        # When the budget cut the fetch short, only the fetched range is known to be complete
+        fetched_from = upper if stream.truncated and upper is not None else fetch_from
+
+        await asyncio.to_thread(self._finish_sync, channel, fetched_from, upper, full_sync, stream.truncated, now)
+        return stream
+
+    def _plan_sync(self, channel: str, oldest: float, now: float) -> Tuple[bool, float]:
+        """Decide whether a sync must re-read the whole window, and where fetching starts."""
+        with self._lock:
+            state = self._db.execute(
+                "SELECT covered_from, full_synced_at FROM channels WHERE channel = ?",
+                (channel,)
+            ).fetchone()
+            newest = self._db.execute(
+                "SELECT MAX(ts_value) FROM messages WHERE channel = ?",
+                (channel,)
+            ).fetchone()[0]
+
+        full_sync = (
+            state is None
+            or newest is None
+            or state[0] > oldest
+            or now - state[1] > self.full_resync_interval
+        )
+        return full_sync, oldest if full_sync else max(oldest, newest - self.refresh_overlap)
+
+    def _store_page(self, channel: str, rows: list, upper: Optional[float]) -> float:
+        """
+        Replace the cached messages between a page's oldest message and `upper` with the page.
+
+        Returns:
+            float: The page's oldest timestamp, the `upper` bound for the next page
+        """
+        lower = min(row[2] for row in rows)
+        with self._lock, self._db:
+            # Replace the re-read range wholesale so deleted messages disappear too
+            self._delete_range(channel, lower, upper, inclusive=True)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages (channel, ts, ts_value, payload) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return lower
+
+    def _finish_sync(self, channel: str, fetched_from: float, upper: Optional[float], full_sync: bool,
+                     truncated: bool, now: float) -> None:
+        """Drop messages Slack no longer returned below the last page, and record the coverage."""
+        with self._lock, self._db:
+            self._delete_range(channel, fetched_from, upper, inclusive=False)
+            if full_sync:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO channels (channel, covered_from, full_synced_at) VALUES (?, ?, ?)",
+                    (channel, fetched_from, now)
+                )
+            elif truncated:
+                self._db.execute(
+                    "UPDATE channels SET covered_from = ? WHERE channel = ?",
+                    (fetched_from, channel)
+                )
+            self._evict(now)
+
+    def _delete_range(self, channel: str, lower: float, upper: Optional[float], inclusive: bool) -> None:
+        sql = f"DELETE FROM messages WHERE channel = ? AND ts_value {'>=' if inclusive else '>'} ?"
+        params = [channel, lower]
+        if upper is not None:
+            sql += " AND ts_value < ?"
+            params.append(upper)
+        self._db.execute(sql, params)
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.retention_days * 86400
+        self._db.execute("DELETE FROM messages WHERE ts_value < ?", (cutoff,))
+        self._db.execute("DELETE FROM threads WHERE CAST(thread_ts AS REAL) < ?", (cutoff,))
+        self._db.execute("UPDATE channels SET covered_from = ? WHERE covered_from < ?", (cutoff, cutoff))
+
+    def recent_messages(self, channel: str, oldest: float, max_messages: Optional[int] = None,
+                        max_bytes: Optional[int] = None) -> Tuple[List[dict], bool]:
+        """
+        Read a channel's cached messages after `oldest`, oldest first.
+
+        When a budget is given, the most recent messages that fit are returned.
+
+        Returns:
+            Tuple[List[dict], bool]: (messages, whether the budget truncated them)
+        """
+        sql = "SELECT payload FROM messages WHERE channel = ? AND ts_value > ? ORDER BY ts_value DESC"
+        params = [channel, oldest]
+        if max_messages is not None:
+            # One more than the budget, to tell whether it truncated anything
+            sql += " LIMIT ?"
+            params.append(max_messages + 1)
+
+        messages = deque()
+        byte_count = 0
+        with self._lock:
+            # Rows are decoded as the cursor yields them and reading stops at the budget
+            for (payload,) in self._db.execute(sql, params):
+                msg = json.loads(payload)
+                size = len(msg.get('text', '').encode('utf-8'))
+                if ((max_messages is not None and len(messages) >= max_messages)
+                        or (max_bytes is not None and byte_count + size > max_bytes)):
+                    return list(messages), True
+                byte_count += size
+                messages.appendleft(msg)
+        return list(messages), False
+
+    def get_thread(self, channel: str, thread_ts: str, latest_reply: Optional[str]) -> Optional[List[dict]]:
+        """Return cached replies for a thread, or None if missing, expired or the thread has moved on."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT latest_reply, fetched_at, replies FROM threads WHERE channel = ? AND thread_ts = ?",
+                (channel, thread_ts)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.thread_ttl:
+            return None
+        if latest_reply is not None and row[0] != latest_reply:
+            return None
+        return json.loads(row[2])
+
+    def put_thread(self, channel: str, thread_ts: str, latest_reply: Optional[str], replies: List[dict]) -> None:
+        """Cache a thread's replies along with the parent's latest_reply marker and the fetch time."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO threads (channel, thread_ts, latest_reply, fetched_at, replies) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (channel, thread_ts, latest_reply, time.time(), json.dumps(replies))
+            )
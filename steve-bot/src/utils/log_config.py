@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+from .metrics import current_command
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'command': current_command.get(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: str = None, format: str = None) -> None:
+    """
+    Set up the root logger for the bot.
+
+    Args:
+        level: Minimum level to log, defaults to LOG_LEVEL or INFO
+        format: 'json' for one JSON object per line, 'text' for plain lines;
+            defaults to LOG_FORMAT or text
+    """
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    format = (format or os.getenv('LOG_FORMAT', 'text')).lower()
+
+    if format == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    # Lambda installs its own handler on the root logger; reuse it rather than adding a second one
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    for handler in root.handlers:
+        handler.setFormatter(formatter)
@@ -0,0 +1,252 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import inspect
+import math
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence
+from slack_sdk.errors import SlackApiError
+
+# The command the current task is executing, so API calls can be attributed to it
+current_command = contextvars.ContextVar('current_command', default='none')
+# Slack API requests sent so far by the current command invocation, by method
+command_api_calls = contextvars.ContextVar('command_api_calls', default=None)
+
+# Histogram buckets in seconds, from a cached API call up to a long summary
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric:
+    """
+    A named family of samples, one per combination of label values.
+
+    Values are either recorded as they happen, or read from `function` when the
+    metrics are rendered. The function returns a single value for metrics without
+    labels, or a dict mapping tuples of label values to values.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), function: Optional[Callable] = None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.function = function
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def _label_text(self, key: tuple, extra: str = '') -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def values(self) -> Dict[tuple, float]:
+        """Current value per tuple of label values."""
+        if self.function is None:
+            return dict(self._values)
+        result = self.function()
+        if isinstance(result, dict):
+            return {tuple(str(part) for part in key): value for key, value in result.items()}
+        return {(): result}
+
+    def render(self) -> Iterable[str]:
+        for key, value in sorted(self.values().items()):
+            yield f'{self.name}{self._label_text(key)} {_format_value(value)}'
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A value that can go up and down."""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    """Counts observations into cumulative buckets, with their count and sum."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            # One counter per bucket plus +Inf, then the sum
+            series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                labels = self._label_text(key, f'le="{_format_value(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{self._label_text(key)} {_format_value(series[-1])}'
+            yield f'{self.name}_count{self._label_text(key)} {cumulative}'
+
+class MetricsRegistry:
+    """The metrics exported by the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.type}")
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = (), function: Optional[Callable] = None) -> Counter:
+        """Get or create a counter. A given function replaces the previous one."""
+        metric = self._get_or_create(Counter, name, help, labels)
+        if function is not None:
+            metric.function = function
+        return metric
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = (), function: Optional[Callable] = None) -> Gauge:
+        """Get or create a gauge. A given function replaces the previous one."""
+        metric = self._get_or_create(Gauge, name, help, labels)
+        if function is not None:
+            metric.function = function
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {_escape(metric.help)}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry served on /metrics
+REGISTRY = MetricsRegistry()
+
+SLACK_API_CALLS = REGISTRY.counter(
+    'steve_slack_api_calls_total',
+    'Slack API requests sent, by method, calling command and outcome',
+    ['method', 'command', 'outcome']
+)
+SLACK_API_DURATION = REGISTRY.histogram(
+    'steve_slack_api_duration_seconds',
+    'Latency of Slack API requests, by method and calling command',
+    ['method', 'command']
+)
+
+@contextlib.contextmanager
+def command_context(command: str):
+    """
+    Attribute the Slack API requests made inside the block to a command.
+
+    Yields:
+        dict: Number of requests sent per method, filled in as the block runs
+    """
+    calls = {}
+    command_token = current_command.set(command)
+    calls_token = command_api_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        command_api_calls.reset(calls_token)
+        current_command.reset(command_token)
+
+class InstrumentedWebClient:
+    """
+    Wraps an AsyncWebClient to count and time every API request it sends.
+
+    Requests are labelled with the command running in the calling task (see
+    `current_command`). Wrap the raw client with this so that cached calls are
+    not counted and every retry is.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    @property
+    def wrapped(self):
+        """The underlying AsyncWebClient."""
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith('_') or name == 'api_call' or not inspect.iscoroutinefunction(attribute):
+            return attribute
+        return functools.partial(self._call, name, attribute)
+
+    async def _call(self, method: str, function, **params):
+        command = current_command.get()
+        calls = command_api_calls.get()
+        if calls is not None:
+            calls[method] = calls.get(method, 0) + 1
+        outcome = 'ok'
+        started = time.perf_counter()
+        try:
+            return await function(**params)
+        except SlackApiError as e:
+            outcome = e.response.get('error') or 'error'
+            raise
+        except Exception:
+            outcome = 'exception'
+            raise
+        finally:
+            SLACK_API_DURATION.observe(time.perf_counter() - started, method=method, command=command)
+            SLACK_API_CALLS.inc(method=method, command=command, outcome=outcome)
+
+async def start_metrics_server(port: int, host: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY):
+    """
+    Serve the registry on http://host:port/metrics.
+
+    Returns:
+        The aiohttp AppRunner; call its cleanup() to stop the server
+    """
+    from aiohttp import web
+
+    async def metrics(request):
+        return web.Response(
+            body=registry.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+class ProgressMessage:
+    """
+    A Slack message that is posted once and then edited in place as work progresses.
+
+    Updates are throttled to at most one chat_update per `min_interval` seconds; when
+    updates arrive faster, only the latest text is sent once the interval has passed.
+    The final text is always sent, after any edit already on its way, so it is the
+    text the message ends up with.
+    """
+
+    def __init__(self, client, channel: str, min_interval: float = None):
+        """
+        Args:
+            client: Slack AsyncWebClient instance
+            channel: The channel to post in
+            min_interval: Minimum seconds between two edits of the message
+        """
+        self.client = client
+        self.channel = channel
+        self.min_interval = min_interval or float(os.getenv('PROGRESS_UPDATE_INTERVAL', '1.5'))
+        self.ts = None
+        self._last_sent = 0.0
+        self._text = None
+        self._pending = None
+        self._flush_task = None
+        # Held while an edit is in flight, so edits reach Slack in the order they are made
+        self._send_lock = asyncio.Lock()
+
+    async def start(self, text: str) -> None:
+        """Post the placeholder message."""
+        response = await self.client.chat_postMessage(channel=self.channel, text=text)
+        self.ts = response['ts']
+        self._text = text
+        self._last_sent = time.monotonic()
+
+    async def _send(self, text: str) -> None:
+        if text == self._text:
+            return
+        await self.client.chat_update(channel=self.channel, ts=self.ts, text=text)
+        self._text = text
+        self._last_sent = time.monotonic()
+
+    async def _flush_later(self, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+            async with self._send_lock:
+                text, self._pending = self._pending, None
+                if text is not None:
+                    await self._send(text)
+        finally:
+            # Only now can update() send directly again without racing this edit
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+
+    async def update(self, text: str) -> None:
+        """Show new progress text, now or once the throttle interval has passed."""
+        wait = self._last_sent + self.min_interval - time.monotonic()
+        if wait <= 0 and self._flush_task is None:
+            async with self._send_lock:
+                await self._send(text)
+            return
+        self._pending = text
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_later(max(wait, 0)))
+
+    async def finish(self, text: Optional[str]) -> None:
+        """Replace the message with the final text, dropping any pending progress update."""
+        self._pending = None
+        # Waits for an edit already in flight; one still waiting for its turn is dropped
+        async with self._send_lock:
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            if text:
+                await self._send(text)
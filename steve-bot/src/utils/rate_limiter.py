@@ -0,0 +1,176 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import random
+import time
+from typing import Dict, Optional, Tuple
+from slack_sdk.errors import SlackApiError
+from .metrics import REGISTRY
+from .slack_errors import is_retryable_error, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+RETRIES = REGISTRY.counter(
+    'steve_slack_api_retries_total',
+    'Slack API requests retried after a transient error, by method and error',
+    ['method', 'error']
+)
+
+# Slack Web API rate limit tier of each method we call.
+# See https://api.slack.com/docs/rate-limits
+METHOD_TIERS = {
+    'apps_connections_open': 1,
+    'auth_test': 4,
+    'bots_info': 3,
+    'chat_postMessage': 'post',
+    'chat_update': 3,
+    'conversations_history': 3,
+    'conversations_info': 3,
+    'conversations_list': 2,
+    'conversations_members': 4,
+    'conversations_replies': 3,
+    'team_info': 3,
+    'users_info': 4,
+    'users_list': 2,
+}
+DEFAULT_TIER = 3
+
+# Tier -> (requests per minute, burst size). Slack tolerates short bursts above the
+# per-minute rate, which keeps fan-outs like thread expansion fast.
+TIER_LIMITS = {
+    1: (1, 1),
+    2: (20, 10),
+    3: (50, 25),
+    4: (100, 50),
+    # chat.postMessage allows about one message per second per channel
+    'post': (60, 3),
+}
+
+class TokenBucket:
+    """Token bucket that makes callers wait, in arrival order, until a request is allowed."""
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        # Holding the lock while waiting queues callers fairly behind each other
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request for `seconds`, e.g. after Slack returned Retry-After."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+class RateLimiter:
+    """Client-side rate limiter with one token bucket per Slack method (and per channel for posting)."""
+
+    def __init__(self, limits: Optional[Dict] = None):
+        """
+        Args:
+            limits: Overrides for TIER_LIMITS, keyed by tier
+        """
+        self.limits = {**TIER_LIMITS, **(limits or {})}
+        self._buckets = {}
+
+    def _bucket_key(self, method: str, params: dict) -> Tuple:
+        tier = METHOD_TIERS.get(method, DEFAULT_TIER)
+        if tier == 'post':
+            return (method, params.get('channel'))
+        return (method,)
+
+    def bucket(self, method: str, params: dict) -> TokenBucket:
+        key = self._bucket_key(method, params)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, capacity = self.limits[METHOD_TIERS.get(method, DEFAULT_TIER)]
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    async def acquire(self, method: str, params: dict) -> None:
+        await self.bucket(method, params).acquire()
+
+class RateLimitedWebClient:
+    """
+    Wraps an AsyncWebClient so every API call waits for the rate limiter first.
+
+    Calls that fail with a retryable error (see is_retryable_error: rate limits for
+    any method, transient server errors for read methods only) are retried with
+    exponential backoff, waiting for Slack's Retry-After header when one is given.
+    Every other attribute is passed straight through to the wrapped client.
+    """
+
+    def __init__(self, client, limiter: Optional[RateLimiter] = None, max_retries: int = None,
+                 base_delay: float = 1.0, max_delay: float = None):
+        """
+        Args:
+            client: The AsyncWebClient to wrap
+            limiter: Rate limiter to use, defaults to a new one with Slack's tier limits
+            max_retries: Retries per call after the first attempt
+            base_delay: Backoff delay in seconds before the first retry, doubled for each retry
+            max_delay: Give up instead of waiting longer than this many seconds
+        """
+        self._client = client
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('SLACK_MAX_RETRIES', '3'))
+        self.base_delay = base_delay
+        self.max_delay = max_delay or float(os.getenv('SLACK_MAX_RETRY_WAIT', '60'))
+
+    @property
+    def wrapped(self):
+        """The underlying AsyncWebClient."""
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith('_') or name == 'api_call' or not inspect.iscoroutinefunction(attribute):
+            return attribute
+        return functools.partial(self._call, name, attribute)
+
+    def retry_delay(self, error: SlackApiError, attempt: int) -> float:
+        """Seconds to wait before retrying: Retry-After if given, else exponential backoff with jitter."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after
+        return self.base_delay * (2 ** attempt) * random.uniform(0.8, 1.2)
+
+    async def _call(self, method: str, function, **params):
+        attempt = 0
+        while True:
+            await self.limiter.acquire(method, params)
+            try:
+                return await function(**params)
+            except SlackApiError as e:
+                if attempt >= self.max_retries or not is_retryable_error(e, method):
+                    raise
+                delay = self.retry_delay(e, attempt)
+                if delay > self.max_delay:
+                    raise
+                if retry_after_seconds(e) is not None:
+                    # Slack told us to back off; hold every caller of this method back too
+                    self.limiter.bucket(method, params).pause(delay)
+                RETRIES.inc(method=method, error=e.response.get('error'))
+                logger.warning("Retrying %s in %.1fs after %s (attempt %d of %d)",
+                               method, delay, e.response.get('error'), attempt + 1, self.max_retries)
+                await asyncio.sleep(delay)
+                attempt += 1
@@ -1,6 +1,9 @@
+import logging
 from slack_sdk.errors import SlackApiError
 from typing import Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
 class SlackErrorHandler:
     # Common Slack error codes and their user-friendly messages
     ERROR_MESSAGES = {
@@ -9,6 +12,7 @@ class SlackErrorHandler:
         'invalid_auth': 'There seems to be an issue with my authentication. Please contact the administrator.',
         'token_expired': 'My authentication has expired. Please contact the administrator.',
         'rate_limited': 'I\'m being rate limited by Slack. Please try again in a moment.',
+        'ratelimited': 'I\'m being rate limited by Slack. Please try again in a moment.',
         'permission_denied': 'I don\'t have permission to perform this action.',
         'no_permission': 'I don\'t have the necessary permissions. Please check my OAuth scopes.',
         'account_inactive': 'The Slack account is inactive. Please contact the administrator.',
@@ -39,6 +43,7 @@ class SlackErrorHandler:
         # Determine if the error is recoverable
         recoverable = error_code in {
             'rate_limited',
+            'ratelimited',
             'invalid_cursor',
             'channel_not_found'  # Might be recoverable if user invites bot
         }
@@ -62,7 +67,8 @@ class SlackErrorHandler:
         """
         Format a rate limit error message with the retry delay.
         """
-        retry_after = error.response.headers.get('Retry-After', '60')
+        retry_after = retry_after_seconds(error)
+        retry_after = '60' if retry_after is None else f"{retry_after:g}"
         return f"I'm being rate limited by Slack. Please try again in {retry_after} seconds."
 
     @classmethod
@@ -79,7 +85,7 @@ class SlackErrorHandler:
             message, recoverable = cls.handle_error(error)
             
             # Special handling for rate limits
-            if error.response['error'] == 'rate_limited':
+            if error.response['error'] in {'rate_limited', 'ratelimited'}:
                 message = cls.format_rate_limit_message(error)
             
             # Try to send the error message
@@ -89,19 +95,47 @@ class SlackErrorHandler:
             )
         except Exception as e:
             # If we can't send the message, just log it
-            print(f"Error sending error message: {str(e)}")
-            print(f"Original error: {str(error)}")
+            logger.error("Error sending error message: %s (original error: %s)", e, error)
 
-def is_retryable_error(error: SlackApiError) -> bool:
+def retry_after_seconds(error: SlackApiError) -> Optional[float]:
     """
-    Check if a Slack API error is retryable.
+    Get the delay Slack asked for in the Retry-After header of an error response, if any.
+    """
+    if not error.response:
+        return None
+    headers = error.response.headers or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+# Errors Slack returns before acting on a request, so any call can be retried
+RATE_LIMIT_ERRORS = {'rate_limited', 'ratelimited'}
+# Server errors where the request may or may not have taken effect
+TRANSIENT_ERRORS = {'internal_error', 'fatal_error', 'service_unavailable', 'request_timeout'}
+# Actions of the Web API methods that only read, e.g. conversations_history or auth_test
+READ_ACTIONS = ('list', 'info', 'history', 'replies', 'members', 'test', 'lookup', 'get')
+
+def is_read_method(method: str) -> bool:
+    """
+    Check if a Web API method, by its AsyncWebClient name, only reads data.
+    """
+    _, _, action = method.partition('_')
+    return action.startswith(READ_ACTIONS)
+
+def is_retryable_error(error: SlackApiError, method: Optional[str] = None) -> bool:
+    """
+    Check if a Slack API error is worth retrying automatically.
+
+    Rate limits are always retryable. Transient server errors are only retried for
+    read methods, since a write such as chat_postMessage may already have gone
+    through; pass `method` to allow them.
     """
     if not error.response:
         return False
-        
+
     error_code = error.response.get('error', '')
-    return error_code in {
-        'rate_limited',
-        'invalid_cursor',
-        'channel_not_found'
-    }
+    if error_code in RATE_LIMIT_ERRORS:
+        return True
+    return error_code in TRANSIENT_ERRORS and method is not None and is_read_method(method)
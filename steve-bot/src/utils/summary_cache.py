@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from .concurrency import SingleFlight
+
+class SummaryCache:
+    """
+    Content-addressed cache of generated summaries.
+
+    Summaries are keyed on a hash of the channel, lookback window, backend and the
+    normalized transcript, so an unchanged conversation is only summarized once.
+    Entries live in a bounded in-memory LRU and, when a path is configured, in a
+    SQLite file that survives restarts. Concurrent requests for the same key share
+    a single computation. get_or_compute reads and writes the file in a worker
+    thread, so the event loop doesn't wait on disk.
+    """
+
+    def __init__(self, max_size: int = None, path: Optional[str] = None):
+        """
+        Args:
+            max_size: Maximum number of summaries kept, in memory and on disk
+            path: Optional SQLite file for persistence, created readable by the owner only;
+                defaults to SUMMARY_CACHE_PATH
+        """
+        self.max_size = max_size or int(os.getenv('SUMMARY_CACHE_MAX_SIZE', '256'))
+        self.path = path or os.getenv('SUMMARY_CACHE_PATH')
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = SingleFlight()
+        self._db = None
+        self._lock = threading.Lock()
+        if self.path:
+            if self.path != ':memory:':
+                # Summaries quote channel content; don't let other users of the host read them
+                os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+                os.chmod(self.path, 0o600)
+            # Used from worker threads one at a time, serialized by the lock
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def make_key(channel: str, lookback_days: int, transcript: str, backend: str = '') -> str:
+        """Hash the inputs of a summary; whitespace differences in the transcript are ignored."""
+        normalized = re.sub(r'\s+', ' ', transcript).strip()
+        digest = hashlib.sha256()
+        for part in (channel, str(lookback_days), backend, normalized):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached summary for a key, or None."""
+        summary = self._recall(key)
+        if summary is None:
+            summary = self._load(key)
+            if summary is not None:
+                self._remember(key, summary)
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        """Cache a summary, evicting the least recently used entries if full."""
+        self._remember(key, summary)
+        self._store(key, summary)
+
+    def _recall(self, key: str) -> Optional[str]:
+        summary = self._entries.get(key)
+        if summary is not None:
+            self._entries.move_to_end(key)
+        return summary
+
+    def _load(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _store(self, key: str, summary: str) -> None:
+        if self._db is None:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                (key, summary, time.time())
+            )
+            self._db.execute(
+                "DELETE FROM summaries WHERE key NOT IN "
+                "(SELECT key FROM summaries ORDER BY created_at DESC LIMIT ?)",
+                (self.max_size,)
+            )
+
+    def _remember(self, key: str, summary: str) -> None:
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the cached summary for a key, computing and caching it on a miss.
+
+        Args:
+            key: Cache key from make_key
+            compute: Produces the summary when it isn't cached
+
+        Returns:
+            str: The summary
+        """
+        summary = self._recall(key)
+        if summary is None and self._db is not None:
+            summary = await asyncio.to_thread(self._load, key)
+            if summary is not None:
+                self._remember(key, summary)
+        if summary is not None:
+            self.hits += 1
+            return summary
+        self.misses += 1
+
+        async def compute_and_store():
+            summary = await compute()
+            self._remember(key, summary)
+            if self._db is not None:
+                await asyncio.to_thread(self._store, key, summary)
+            return summary
+
+        return await self._inflight.run(key, compute_and_store)
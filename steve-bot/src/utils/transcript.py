@@ -0,0 +1,97 @@
+import time
+from typing import Iterator, List, Optional
+
+# 'HH:MM' for every minute of the day
+_CLOCK = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)]
+
+# UTC offsets only change on a quarter-hour boundary, so one lookup covers every
+# message within the same quarter of an hour
+_OFFSET_PERIOD = 15 * 60
+
+class TranscriptBuilder:
+    """
+    Builds the plain-text conversation transcript handed to the summarizer.
+
+    Lines are appended to a list and joined once by build(), and timestamps are
+    formatted from a table instead of calling strftime for every message. When a
+    character budget is set, the oldest lines are dropped so the transcript never
+    exceeds it; the budget is applied when the transcript is read, not on every add.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None):
+        """
+        Args:
+            max_chars: Maximum transcript size in characters, or None for no limit
+        """
+        self.max_chars = max_chars
+        self._lines: List[str] = []
+        # Characters in the lines from _start on; lines before _start are dropped
+        self._size = 0
+        self._start = 0
+        # Quarter hour since the epoch -> local UTC offset in seconds
+        self._offsets = {}
+
+    def __len__(self) -> int:
+        """Size of the transcript in characters."""
+        self._fit()
+        return self._size
+
+    @property
+    def dropped_lines(self) -> int:
+        """Number of the oldest lines left out to stay within the budget."""
+        self._fit()
+        return self._start
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped_lines > 0
+
+    def format_time(self, ts: str) -> str:
+        """Format a Slack ts as local 'HH:MM'."""
+        seconds = int(float(ts or '0'))
+        period = seconds // _OFFSET_PERIOD
+        offset = self._offsets.get(period)
+        if offset is None:
+            offset = self._offsets[period] = time.localtime(period * _OFFSET_PERIOD).tm_gmtoff
+        return _CLOCK[(seconds + offset) // 60 % (24 * 60)]
+
+    def _fit(self) -> None:
+        if self.max_chars is None:
+            return
+        lines = self._lines
+        # Always keep the newest line, even if it alone is over budget
+        last = len(lines) - 1
+        while self._size > self.max_chars and self._start < last:
+            self._size -= len(lines[self._start])
+            self._start += 1
+
+    def add_topic(self, topic: str) -> None:
+        line = f"\n\nTopic: {topic}\n"
+        self._lines.append(line)
+        self._size += len(line)
+
+    def add_message(self, ts: str, user_name: str, text: str, in_thread: bool = False) -> None:
+        thread_marker = " (in thread)" if in_thread else ""
+        line = f"[{self.format_time(ts)}] {user_name}{thread_marker}: {text}\n"
+        self._lines.append(line)
+        self._size += len(line)
+
+    def add_note(self, note: str) -> None:
+        line = f"[{note}]\n"
+        self._lines.append(line)
+        self._size += len(line)
+
+    def lines(self) -> Iterator[str]:
+        """Yield the transcript line by line, starting with a marker if lines were dropped."""
+        self._fit()
+        if self._start:
+            yield f"[{self._start} earlier lines omitted]\n"
+        yield from self._lines[self._start:]
+
+    def build(self) -> str:
+        """Join the transcript into a single string."""
+        self._fit()
+        text = "".join(self._lines[self._start:])
+        if self._start:
+            return f"[{self._start} earlier lines omitted]\n" + text
+        return text
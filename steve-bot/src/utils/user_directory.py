@@ -0,0 +1,114 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from slack_sdk.errors import SlackApiError
+from .concurrency import bounded_gather
+
+class UserDirectory:
+    """
+    Process-wide cache of Slack user names.
+
+    Entries are kept in least-recently-used order and expire after a fixed TTL,
+    so renamed users are picked up eventually without refetching on every command.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None, concurrency: int = None):
+        self.max_size = max_size or int(os.getenv('USER_DIRECTORY_MAX_SIZE', '5000'))
+        self.ttl = ttl or float(os.getenv('USER_DIRECTORY_TTL', '3600'))
+        self.concurrency = concurrency or int(os.getenv('USER_DIRECTORY_CONCURRENCY', '10'))
+        # user_id -> (name, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def display_name(user: dict) -> str:
+        """Pick the best available name from a Slack user object."""
+        profile = user.get('profile') or {}
+        return (user.get('real_name')
+                or profile.get('real_name')
+                or user.get('name')
+                or f"User {user.get('id')}")
+
+    def get(self, user_id: str) -> Optional[str]:
+        """Return the cached name for a user, or None if missing or expired."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return name
+
+    def put(self, user_id: str, name: str) -> None:
+        """Cache a user's name, evicting the least recently used entries if full."""
+        self._entries[user_id] = (name, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def warm(self, client, page_size: int = 200) -> int:
+        """
+        Load the whole workspace directory from the paginated users.list API.
+
+        Args:
+            client: Slack AsyncWebClient instance
+            page_size: Number of users to request per page
+
+        Returns:
+            int: Number of users cached
+        """
+        count = 0
+        cursor = None
+        while True:
+            response = await client.users_list(limit=page_size, cursor=cursor)
+            for member in response.get('members', []):
+                if member.get('deleted'):
+                    continue
+                self.put(member['id'], self.display_name(member))
+                count += 1
+            cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not cursor:
+                return count
+
+    async def resolve(self, client, user_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Resolve user IDs to names, fetching cache misses concurrently.
+
+        Args:
+            client: Slack AsyncWebClient instance
+            user_ids: The user IDs to resolve
+
+        Returns:
+            Dict[str, str]: Maps every requested user ID to a name
+        """
+        names = {}
+        missing = []
+        for user_id in set(user_ids):
+            name = self.get(user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+
+        async def fetch(user_id):
+            try:
+                user_info = await client.users_info(user=user_id)
+                name = self.display_name(user_info['user'])
+                self.put(user_id, name)
+                return name
+            except SlackApiError:
+                # Fall back to using the user ID if we can't get the name
+                return f"User {user_id}"
+
+        self.hits += len(names)
+        self.misses += len(missing)
+        results = await bounded_gather((fetch(user_id) for user_id in missing), self.concurrency)
+        names.update(zip(missing, results))
+        return names
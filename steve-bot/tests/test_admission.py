@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from utils import AdmissionController, AdmissionError
+
+def controller(**limits):
+    settings = dict(max_per_user=2, max_per_channel=2, budget=10, max_pending=3, queue_timeout=1)
+    settings.update(limits)
+    return AdmissionController(**settings)
+
+async def hold(admission, user, channel, cost, release: asyncio.Event, started: list = None):
+    async with admission.admit(user, channel, cost):
+        if started is not None:
+            started.append(user)
+        await release.wait()
+
+def test_cheap_commands_are_admitted_past_every_limit():
+    async def main():
+        admission = controller(max_per_user=1, max_pending=1, budget=1)
+        release = asyncio.Event()
+        running = asyncio.ensure_future(hold(admission, 'U1', 'C1', 1, release))
+        await asyncio.sleep(0)
+        async with admission.admit('U1', 'C1', 0):
+            admitted = True
+        release.set()
+        await running
+        return admitted
+
+    assert asyncio.run(main())
+
+def test_per_user_and_per_channel_limits():
+    async def main():
+        admission = controller(max_per_user=1, max_per_channel=1)
+        release = asyncio.Event()
+        running = asyncio.ensure_future(hold(admission, 'U1', 'C1', 1, release))
+        await asyncio.sleep(0)
+        reasons = []
+        for user, channel in (('U1', 'C2'), ('U2', 'C1')):
+            with pytest.raises(AdmissionError) as error:
+                async with admission.admit(user, channel, 1):
+                    pass
+            reasons.append(error.value.reason)
+        release.set()
+        await running
+        return reasons, admission.pending
+
+    reasons, pending = asyncio.run(main())
+    assert reasons == ['user', 'channel']
+    assert pending == 0
+
+def test_rejects_when_too_many_are_pending():
+    async def main():
+        admission = controller(max_pending=2)
+        release = asyncio.Event()
+        running = [asyncio.ensure_future(hold(admission, f'U{i}', f'C{i}', 1, release)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionError) as error:
+            async with admission.admit('U9', 'C9', 1):
+                pass
+        release.set()
+        await asyncio.gather(*running)
+        return error.value.reason
+
+    assert asyncio.run(main()) == 'busy'
+
+def test_waits_for_budget_in_arrival_order():
+    async def main():
+        admission = controller(budget=5, max_pending=5)
+        first_release, second_release = asyncio.Event(), asyncio.Event()
+        started = []
+        first = asyncio.ensure_future(hold(admission, 'U1', 'C1', 4, first_release, started))
+        await asyncio.sleep(0)
+        # Neither fits next to the first; the large one arrived first, so the small one waits behind it
+        large = asyncio.ensure_future(hold(admission, 'U2', 'C2', 3, second_release, started))
+        await asyncio.sleep(0)
+        small = asyncio.ensure_future(hold(admission, 'U3', 'C3', 2, second_release, started))
+        await asyncio.sleep(0.01)
+        assert started == ['U1']
+        assert admission.queued == 2
+        first_release.set()
+        await asyncio.sleep(0.01)
+        assert started == ['U1', 'U2', 'U3']
+        assert admission.in_use == 5
+        second_release.set()
+        await asyncio.gather(first, large, small)
+        return admission.in_use
+
+    assert asyncio.run(main()) == 0
+
+def test_cost_above_the_budget_runs_alone():
+    async def main():
+        admission = controller(budget=3)
+        async with admission.admit('U1', 'C1', 7):
+            return admission.in_use
+
+    assert asyncio.run(main()) == 3
+
+def test_turned_away_after_the_queue_timeout():
+    async def main():
+        admission = controller(budget=1, queue_timeout=0.01)
+        release = asyncio.Event()
+        running = asyncio.ensure_future(hold(admission, 'U1', 'C1', 1, release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionError) as error:
+            async with admission.admit('U2', 'C2', 1):
+                pass
+        queued = admission.queued
+        release.set()
+        await running
+        return error.value.reason, queued, admission.in_use, admission.pending
+
+    assert asyncio.run(main()) == ('timeout', 0, 0, 0)
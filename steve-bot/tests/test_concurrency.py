@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from utils import SingleFlight, bounded_gather
+
+class Gauge:
+    """Tracks how many tasks are inside a block at once."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    async def work(self, value, delay=0.01):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        await asyncio.sleep(delay)
+        self.current -= 1
+        return value
+
+def test_bounded_gather_limits_concurrency_and_keeps_order():
+    gauge = Gauge()
+    results = asyncio.run(bounded_gather((gauge.work(i, delay=0.01 * (5 - i % 5)) for i in range(10)), limit=3))
+    assert results == list(range(10))
+    assert gauge.peak == 3
+
+def test_bounded_gather_treats_a_limit_below_one_as_one():
+    gauge = Gauge()
+    asyncio.run(bounded_gather([gauge.work(i) for i in range(3)], limit=0))
+    assert gauge.peak == 1
+
+def test_bounded_gather_can_return_exceptions():
+    async def fail():
+        raise ValueError('boom')
+
+    results = asyncio.run(bounded_gather([fail(), asyncio.sleep(0, result='ok')], limit=2, return_exceptions=True))
+    assert isinstance(results[0], ValueError)
+    assert results[1] == 'ok'
+
+def test_concurrent_calls_share_one_run():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run('key', work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ['result'] * 5
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+def test_different_keys_run_separately():
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            flight.run('a', lambda: asyncio.sleep(0.01, result='a')),
+            flight.run('b', lambda: asyncio.sleep(0.01, result='b')),
+        )
+
+    assert asyncio.run(main()) == ['a', 'b']
+
+def test_exception_reaches_every_caller_and_is_not_remembered():
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(flight.run('key', fail), flight.run('key', fail), return_exceptions=True)
+        # A later call starts afresh instead of getting the old failure
+        again = await flight.run('key', lambda: asyncio.sleep(0, result='ok'))
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert len(calls) == 1
+    assert again == 'ok'
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def main():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.run('key', lambda: asyncio.sleep(0.02, result='done')))
+        second = asyncio.ensure_future(flight.run('key', lambda: asyncio.sleep(0.02, result='other')))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 'done'
@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from utils import EventPipeline
+
+class Recorder:
+    """Event handler that records when each event starts and finishes."""
+
+    def __init__(self):
+        self.log = []
+
+    async def __call__(self, event):
+        self.log.append(('start', event['id']))
+        await asyncio.sleep(event.get('delay', 0))
+        self.log.append(('end', event['id']))
+
+def event(id, channel='C1', delay=0, text=''):
+    return {'id': id, 'channel': channel, 'delay': delay, 'text': text}
+
+def test_events_in_a_channel_run_in_order():
+    recorder = Recorder()
+
+    async def main():
+        pipeline = EventPipeline(recorder, workers=4)
+        pipeline.start()
+        for index, delay in enumerate([0.03, 0, 0.01]):
+            await pipeline.submit(event(index, delay=delay))
+        assert await pipeline.drain(timeout=1)
+
+    asyncio.run(main())
+    assert recorder.log == [('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)]
+
+def test_channels_run_in_parallel():
+    recorder = Recorder()
+
+    async def main():
+        pipeline = EventPipeline(recorder, workers=2)
+        pipeline.start()
+        await pipeline.submit(event('slow', channel='C1', delay=0.05))
+        await pipeline.submit(event('fast', channel='C2'))
+        assert await pipeline.drain(timeout=1)
+
+    asyncio.run(main())
+    assert recorder.log.index(('end', 'fast')) < recorder.log.index(('end', 'slow'))
+
+def test_unordered_events_skip_their_channel():
+    recorder = Recorder()
+
+    def ordering_key(event):
+        return None if event['text'] == 'help' else event['channel']
+
+    async def main():
+        pipeline = EventPipeline(recorder, workers=2, ordering_key=ordering_key)
+        pipeline.start()
+        await pipeline.submit(event('summarize', delay=0.05, text='summarize'))
+        await pipeline.submit(event('help', text='help'))
+        assert await pipeline.drain(timeout=1)
+
+    asyncio.run(main())
+    assert recorder.log.index(('end', 'help')) < recorder.log.index(('end', 'summarize'))
+
+def test_submit_waits_at_the_high_water_mark():
+    recorder = Recorder()
+
+    async def main():
+        pipeline = EventPipeline(recorder, workers=1, high_water_mark=1)
+        pipeline.start()
+        await pipeline.submit(event(0, delay=0.03))
+        blocked = asyncio.ensure_future(pipeline.submit(event(1)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert pipeline.depth == 1
+        await asyncio.wait_for(blocked, 1)
+        assert await pipeline.drain(timeout=1)
+
+    asyncio.run(main())
+    assert [entry for entry in recorder.log if entry[0] == 'end'] == [('end', 0), ('end', 1)]
+
+def test_drain_finishes_pending_events_then_refuses_new_ones():
+    recorder = Recorder()
+
+    async def main():
+        pipeline = EventPipeline(recorder, workers=1)
+        pipeline.start()
+        for index in range(3):
+            await pipeline.submit(event(index, channel=f'C{index}', delay=0.01))
+        assert await pipeline.drain(timeout=1)
+        assert pipeline.depth == 0
+        with pytest.raises(RuntimeError):
+            await pipeline.submit(event('late'))
+
+    asyncio.run(main())
+    assert len(recorder.log) == 6
+
+def test_drain_gives_up_after_the_timeout():
+    async def main():
+        pipeline = EventPipeline(Recorder(), workers=1)
+        pipeline.start()
+        await pipeline.submit(event('stuck', delay=10))
+        await asyncio.sleep(0)
+        return await pipeline.drain(timeout=0.01)
+
+    assert asyncio.run(main()) is False
+
+def test_handler_errors_dont_stop_the_channel():
+    handled = []
+
+    async def handler(event):
+        handled.append(event['id'])
+        if event['id'] == 0:
+            raise RuntimeError('boom')
+
+    async def main():
+        pipeline = EventPipeline(handler, workers=1)
+        pipeline.start()
+        await pipeline.submit(event(0))
+        await pipeline.submit(event(1))
+        assert await pipeline.drain(timeout=1)
+
+    asyncio.run(main())
+    assert handled == [0, 1]
+
+def test_failing_ordering_key_falls_back_to_the_channel_without_leaking_a_slot():
+    recorder = Recorder()
+
+    def ordering_key(event):
+        raise ValueError('unparsable')
+
+    async def main():
+        pipeline = EventPipeline(recorder, workers=1, high_water_mark=1, ordering_key=ordering_key)
+        pipeline.start()
+        await asyncio.wait_for(pipeline.submit(event(0)), 1)
+        await asyncio.wait_for(pipeline.submit(event(1)), 1)
+        assert await pipeline.drain(timeout=1)
+        return pipeline.depth
+
+    assert asyncio.run(main()) == 0
+    assert [entry for entry in recorder.log if entry[0] == 'end'] == [('end', 0), ('end', 1)]
@@ -0,0 +1,209 @@
+import asyncio
+import time
+import pytest
+from commands.summarize_command import SummarizeCommand
+from utils import HistoryCache
+from utils import history_cache as history_cache_module
+
+class FakeSlack:
+    """Serves a channel's history and thread replies, recording the calls made."""
+
+    def __init__(self, messages=(), replies=None):
+        self.messages = list(messages)
+        self.replies = replies or {}
+        self.history_calls = []
+        self.replies_calls = []
+
+    async def conversations_history(self, channel, oldest=None, limit=200, cursor=None, **params):
+        self.history_calls.append(oldest)
+        newer = [msg for msg in self.messages if oldest is None or float(msg['ts']) > oldest]
+        return {'messages': sorted(newer, key=lambda msg: -float(msg['ts'])), 'has_more': False}
+
+    async def conversations_replies(self, channel, ts, limit=20):
+        self.replies_calls.append(ts)
+        return {'messages': [{'ts': ts}] + self.replies.get(ts, [])}
+
+def message(ts, text='hi', **fields):
+    return dict(ts=f'{ts:.6f}', text=text, user='U1', **fields)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Makes time.time() in the history cache controllable."""
+    now = [time.time()]
+    monkeypatch.setattr(history_cache_module.time, 'time', lambda: now[0])
+    return now
+
+def sync(cache, client, oldest):
+    return asyncio.run(cache.sync(client, 'C1', oldest))
+
+def cached_texts(cache, oldest):
+    messages, _ = cache.recent_messages('C1', oldest)
+    return [msg['text'] for msg in messages]
+
+def test_first_sync_is_full_then_only_the_overlap_is_reread(clock):
+    now = clock[0]
+    oldest = now - 86400
+    client = FakeSlack([message(now - 3600, 'old'), message(now - 60, 'new')])
+    cache = HistoryCache(':memory:', refresh_overlap=900, full_resync_interval=21600)
+
+    sync(cache, client, oldest)
+    sync(cache, client, oldest)
+    assert client.history_calls == [oldest, pytest.approx(now - 60 - 900)]
+    assert cached_texts(cache, oldest) == ['old', 'new']
+
+def test_overlap_picks_up_edits_and_deletions(clock):
+    now = clock[0]
+    oldest = now - 86400
+    client = FakeSlack([message(now - 3600, 'old'), message(now - 120, 'edit me'), message(now - 60, 'delete me')])
+    cache = HistoryCache(':memory:', refresh_overlap=900)
+    sync(cache, client, oldest)
+
+    client.messages = [message(now - 3600, 'old'), message(now - 120, 'edited'), message(now - 10, 'newest')]
+    sync(cache, client, oldest)
+    assert cached_texts(cache, oldest) == ['old', 'edited', 'newest']
+
+def test_messages_before_the_overlap_are_kept_without_refetching(clock):
+    now = clock[0]
+    oldest = now - 86400
+    client = FakeSlack([message(now - 7200, 'before the overlap'), message(now - 60, 'recent')])
+    cache = HistoryCache(':memory:', refresh_overlap=900)
+    sync(cache, client, oldest)
+
+    # Slack no longer returns it, but it is outside the re-read window
+    client.messages = [message(now - 60, 'recent')]
+    sync(cache, client, oldest)
+    assert cached_texts(cache, oldest) == ['before the overlap', 'recent']
+
+def test_whole_window_is_refetched_after_the_resync_interval(clock):
+    now = clock[0]
+    oldest = now - 86400
+    client = FakeSlack([message(now - 7200, 'gone'), message(now - 60, 'recent')])
+    cache = HistoryCache(':memory:', refresh_overlap=900, full_resync_interval=3600)
+    sync(cache, client, oldest)
+
+    client.messages = [message(now - 60, 'recent')]
+    clock[0] = now + 3601
+    sync(cache, client, oldest)
+    assert client.history_calls[-1] == oldest
+    assert cached_texts(cache, oldest) == ['recent']
+
+def test_longer_lookback_than_cached_is_a_full_sync(clock):
+    now = clock[0]
+    client = FakeSlack([message(now - 2 * 86400, 'two days ago'), message(now - 60, 'recent')])
+    cache = HistoryCache(':memory:')
+    sync(cache, client, now - 86400)
+    sync(cache, client, now - 3 * 86400)
+    assert client.history_calls == [now - 86400, now - 3 * 86400]
+    assert cached_texts(cache, now - 3 * 86400) == ['two days ago', 'recent']
+
+def test_cached_thread_expires_even_if_the_parent_is_never_refreshed(clock):
+    now = clock[0]
+    oldest = now - 86400
+    # The parent is older than the overlap window, so its latest_reply is never re-read
+    parent = message(now - 7200, 'question', thread_ts=f'{now - 7200:.6f}', latest_reply=f'{now - 7100:.6f}')
+    client = FakeSlack([parent], replies={parent['ts']: [message(now - 7100, 'first answer')]})
+    cache = HistoryCache(':memory:', refresh_overlap=900, thread_ttl=60)
+    command = SummarizeCommand()
+
+    def expand():
+        sync(cache, client, oldest)
+        messages, _ = cache.recent_messages('C1', oldest)
+        semaphore = asyncio.Semaphore(1)
+        replies = asyncio.run(command.fetch_thread_replies(client, 'C1', messages[0], semaphore, cache))
+        return [reply['text'] for reply in replies]
+
+    assert expand() == ['first answer']
+    client.replies[parent['ts']].append(message(now - 30, 'second answer'))
+
+    # Within the TTL the cached replies are reused
+    assert expand() == ['first answer']
+    assert len(client.replies_calls) == 1
+
+    clock[0] = now + 61
+    assert expand() == ['first answer', 'second answer']
+    assert len(client.replies_calls) == 2
+
+def test_changed_latest_reply_invalidates_a_cached_thread(clock):
+    cache = HistoryCache(':memory:', thread_ttl=60)
+    cache.put_thread('C1', '1.0', '2.0', [{'ts': '2.0'}])
+    assert cache.get_thread('C1', '1.0', '2.0') == [{'ts': '2.0'}]
+    assert cache.get_thread('C1', '1.0', '3.0') is None
+
+def test_database_file_is_private(tmp_path):
+    path = tmp_path / 'history.sqlite3'
+    cache = HistoryCache(str(path))
+    cache.close()
+    assert path.stat().st_mode & 0o777 == 0o600
+
+def test_defaults_to_memory(monkeypatch):
+    monkeypatch.delenv('HISTORY_CACHE_PATH', raising=False)
+    assert HistoryCache().path == ':memory:'
+
+class PagedSlack(FakeSlack):
+    """Serves history `limit` messages at a time, like conversations_history's cursor pagination."""
+
+    def __init__(self, messages, on_page=None):
+        super().__init__(messages)
+        self.on_page = on_page
+
+    async def conversations_history(self, channel, oldest=None, limit=200, cursor=None, **params):
+        if self.on_page is not None:
+            self.on_page(cursor)
+        newer = sorted((msg for msg in self.messages if float(msg['ts']) > oldest), key=lambda msg: -float(msg['ts']))
+        start = int(cursor or 0)
+        more = start + limit < len(newer)
+        return {'messages': newer[start:start + limit], 'has_more': more,
+                'response_metadata': {'next_cursor': str(start + limit) if more else ''}}
+
+def test_pages_are_written_as_they_arrive(clock):
+    now = clock[0]
+    oldest = now - 86400
+    cache = HistoryCache(':memory:')
+    stored_before_page = []
+    client = PagedSlack([message(now - i, f'm{i}') for i in range(1, 8)],
+                        on_page=lambda cursor: stored_before_page.append(len(cache.recent_messages('C1', oldest)[0])))
+
+    stream = asyncio.run(cache.sync(client, 'C1', oldest, page_size=3))
+    assert stream.pages == 3
+    assert stored_before_page == [0, 3, 6]
+    assert cached_texts(cache, oldest) == [f'm{i}' for i in range(7, 0, -1)]
+
+def test_deletions_are_picked_up_across_pages(clock):
+    now = clock[0]
+    oldest = now - 86400
+    cache = HistoryCache(':memory:')
+    client = PagedSlack([message(now - i, f'm{i}') for i in range(1, 8)])
+    asyncio.run(cache.sync(client, 'C1', oldest, page_size=3))
+
+    # Gone from Slack: the newest message, one between pages and the oldest
+    client.messages = [msg for msg in client.messages if msg['text'] not in ('m1', 'm4', 'm7')]
+    # Past the resync interval, so the whole window is read again, two messages a page
+    clock[0] = now + 86400
+    asyncio.run(cache.sync(client, 'C1', oldest, page_size=2))
+    assert cached_texts(cache, oldest) == ['m6', 'm5', 'm3', 'm2']
+
+def test_truncated_sync_only_covers_what_it_fetched(clock):
+    now = clock[0]
+    oldest = now - 86400
+    cache = HistoryCache(':memory:')
+    client = PagedSlack([message(now - i, f'm{i}') for i in range(1, 8)])
+    stream = asyncio.run(cache.sync(client, 'C1', oldest, page_size=2, max_messages=3))
+    assert stream.truncated
+    assert cached_texts(cache, oldest) == ['m3', 'm2', 'm1']
+
+    # The uncovered part of the window makes the next sync a full one
+    asyncio.run(cache.sync(client, 'C1', oldest, page_size=2))
+    assert cached_texts(cache, oldest) == [f'm{i}' for i in range(7, 0, -1)]
+
+def test_recent_messages_keeps_the_newest_within_the_budget(clock):
+    now = clock[0]
+    oldest = now - 86400
+    cache = HistoryCache(':memory:')
+    asyncio.run(cache.sync(FakeSlack([message(now - i, 'x' * 10) for i in range(1, 6)]), 'C1', oldest))
+
+    messages, truncated = cache.recent_messages('C1', oldest, max_messages=2)
+    assert [msg['ts'] for msg in messages] == [f'{now - 2:.6f}', f'{now - 1:.6f}'] and truncated
+    messages, truncated = cache.recent_messages('C1', oldest, max_bytes=35)
+    assert len(messages) == 3 and truncated
+    messages, truncated = cache.recent_messages('C1', oldest, max_messages=5)
+    assert len(messages) == 5 and not truncated
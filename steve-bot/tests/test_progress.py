@@ -0,0 +1,53 @@
+import asyncio
+from utils import ProgressMessage
+
+class FakeSlack:
+    """Records the message text after each edit lands; some edits take longer than others."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.edits = []
+
+    async def chat_postMessage(self, channel, text):
+        return {'ts': '1.0'}
+
+    async def chat_update(self, channel, ts, text):
+        await asyncio.sleep(self.delays.get(text, 0))
+        self.edits.append(text)
+
+def test_updates_are_throttled_to_the_latest_text():
+    async def main():
+        client = FakeSlack()
+        progress = ProgressMessage(client, 'C1', min_interval=0.02)
+        await progress.start('Working...')
+        for text in ('step 1', 'step 2', 'step 3'):
+            await progress.update(text)
+        await asyncio.sleep(0.05)
+        return client.edits
+
+    assert asyncio.run(main()) == ['step 3']
+
+def test_final_text_lands_after_a_throttled_edit_in_flight():
+    async def main():
+        client = FakeSlack(delays={'step 1': 0.05})
+        progress = ProgressMessage(client, 'C1', min_interval=0.01)
+        await progress.start('Working...')
+        await progress.update('step 1')
+        # Let the throttled edit start, then finish while Slack is still handling it
+        await asyncio.sleep(0.02)
+        await progress.finish('Done')
+        return client.edits
+
+    assert asyncio.run(main()) == ['step 1', 'Done']
+
+def test_finish_drops_a_pending_edit():
+    async def main():
+        client = FakeSlack()
+        progress = ProgressMessage(client, 'C1', min_interval=0.05)
+        await progress.start('Working...')
+        await progress.update('step 1')
+        await progress.finish('Done')
+        await asyncio.sleep(0.1)
+        return client.edits
+
+    assert asyncio.run(main()) == ['Done']
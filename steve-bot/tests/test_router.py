@@ -0,0 +1,107 @@
+import pytest
+from types import SimpleNamespace
+from commands import BUILTIN_COMMANDS, CommandRegistry, create_registry
+from commands.help_command import HelpCommand
+from commands.arguments import Argument, ArgumentError, parse_arguments
+from router import CommandRouter
+
+@pytest.fixture
+def router():
+    return CommandRouter(create_registry())
+
+@pytest.mark.parametrize('token, keyword', [
+    ('summarize', 'summarize'),
+    ('SUMMARIZE', 'summarize'),
+    ('summary', 'summarize'),
+    ('sum', 'summarize'),
+    ('info', 'channel-info'),
+    ('c', 'channel-info'),
+    ('?', 'help'),
+    ('h', 'help'),
+])
+def test_resolves_names_aliases_and_unique_prefixes(router, token, keyword):
+    route = router.resolve(token)
+    assert route.keyword == keyword
+    assert route.error is None
+
+def test_unknown_command(router):
+    route = router.resolve('deploy')
+    assert route.keyword is None
+    assert "Unknown command 'deploy'" in route.error
+
+def test_ambiguous_prefix_lists_the_candidates():
+    registry = create_registry()
+    registry.register('status', 'commands.help_command:HelpCommand')
+    route = CommandRouter(registry).resolve('s')
+    assert route.keyword is None
+    assert route.candidates == ['status', 'summarize']
+    assert "'s' could mean 'status', 'summarize'" in route.error
+
+def test_trie_is_rebuilt_when_the_registry_changes():
+    registry = CommandRegistry()
+    registry.register('summarize', 'commands.summarize_command:SummarizeCommand')
+    router = CommandRouter(registry)
+    assert router.resolve('st').keyword is None
+    registry.register('status', 'commands.help_command:HelpCommand')
+    assert router.resolve('st').keyword == 'status'
+    assert router.resolve('s').candidates == ['status', 'summarize']
+
+def test_route_splits_the_text_after_the_bot_mention(router):
+    route = router.route('<@U111> hey <@UBOT|steve> sum 3', 'UBOT')
+    assert route.keyword == 'summarize'
+    assert route.args == ['3']
+
+def test_route_falls_back_to_the_first_mention(router):
+    route = router.route('<@UOTHER> info', 'UBOT')
+    assert route.keyword == 'channel-info'
+    assert route.args == []
+
+def test_bare_mention_routes_to_help(router):
+    assert router.route('<@UBOT>', 'UBOT').keyword == 'help'
+
+def test_route_does_not_import_commands(router):
+    router.route('<@UBOT> summarize 2', 'UBOT')
+    assert router.registry.load_times == {}
+
+def test_help_listing_does_not_import_commands():
+    bot = SimpleNamespace(commands=create_registry(), bot_name='steve')
+    listing = HelpCommand().render_listing(bot)
+    assert "• *summarize* (also: summary): Summarizes recent conversations" in listing
+    assert "Usage: @<bot> summarize [days]" in HelpCommand().render_command(bot, 'summarize')
+    assert bot.commands.load_times == {}
+
+def test_builtin_descriptions_match_the_commands():
+    registry = create_registry()
+    for keyword, (_, _, help_text, usage) in BUILTIN_COMMANDS.items():
+        assert (registry[keyword].help_text, registry[keyword].usage) == (help_text, usage)
+
+def test_commands_registered_without_a_description_are_loaded_to_describe_them():
+    registry = CommandRegistry()
+    registry.register('status', 'commands.help_command:HelpCommand')
+    assert registry.describe('status')[1] == '@<bot> help [command]'
+    assert list(registry.load_times) == ['status']
+
+DAYS = [Argument('days', int, default=1, minimum=1, maximum=7, clamp=True)]
+
+def test_parse_arguments_defaults_and_clamps():
+    assert parse_arguments(DAYS, []) == {'days': 1}
+    assert parse_arguments(DAYS, ['3']) == {'days': 3}
+    assert parse_arguments(DAYS, ['30']) == {'days': 7}
+
+@pytest.mark.parametrize('tokens, message', [
+    (['0'], 'days must be at least 1.'),
+    (['soon'], "'soon' is not a valid int for days."),
+    (['2', 'extra'], 'Unexpected argument(s) for summarize: extra'),
+])
+def test_parse_arguments_rejects_bad_tokens(tokens, message):
+    with pytest.raises(ArgumentError) as error:
+        parse_arguments(DAYS, tokens, keyword='summarize')
+    assert str(error.value) == message
+
+def test_parse_arguments_required_and_unclamped_maximum():
+    specs = [Argument('name', required=True), Argument('count', int, maximum=5)]
+    assert parse_arguments(specs, ['x']) == {'name': 'x', 'count': None}
+    with pytest.raises(ArgumentError, match='Missing required argument: name'):
+        parse_arguments(specs, [])
+    with pytest.raises(ArgumentError, match='count must be at most 5.'):
+        parse_arguments(specs, ['x', '6'])
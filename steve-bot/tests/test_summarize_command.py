@@ -0,0 +1,53 @@
+import asyncio
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+from commands.summarize_command import SummarizeCommand
+
+class FakeSlack:
+    """Serves thread replies after a short delay, tracking how many calls overlap."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def conversations_replies(self, channel, ts, limit=20):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if ts in self.failing:
+                raise SlackApiError('thread_not_found', AsyncSlackResponse(
+                    client=None, http_verb='POST', api_url='', req_args={},
+                    data={'ok': False, 'error': 'thread_not_found'}, headers={}, status_code=200
+                ))
+            return {'messages': [{'ts': ts, 'text': 'parent'}, {'ts': f'{ts}1', 'text': f'reply to {ts}'}]}
+        finally:
+            self.in_flight -= 1
+
+def fetch_all(client, parents, limit):
+    command = SummarizeCommand()
+
+    async def main():
+        semaphore = asyncio.Semaphore(limit)
+        return await asyncio.gather(*(
+            command.fetch_thread_replies(client, 'C1', parent, semaphore) for parent in parents
+        ))
+
+    return asyncio.run(main())
+
+def test_thread_fetches_share_a_bounded_pool():
+    client = FakeSlack()
+    parents = [{'ts': str(i), 'thread_ts': str(i)} for i in range(10)]
+    replies = fetch_all(client, parents, limit=3)
+    assert client.peak == 3
+    # Parents are left out and each thread's replies come back in the parents' order
+    assert [[reply['text'] for reply in thread] for thread in replies] == [[f'reply to {i}'] for i in range(10)]
+
+def test_a_failed_thread_does_not_fail_the_others():
+    client = FakeSlack(failing={'1'})
+    parents = [{'ts': str(i), 'thread_ts': str(i)} for i in range(3)]
+    replies = fetch_all(client, parents, limit=2)
+    assert replies[1] is None
+    assert [reply['text'] for reply in replies[0]] == ['reply to 0']
+    assert [reply['text'] for reply in replies[2]] == ['reply to 2']
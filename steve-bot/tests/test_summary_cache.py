@@ -0,0 +1,47 @@
+import asyncio
+from utils import SummaryCache
+
+def test_key_ignores_whitespace_but_not_the_window():
+    key = SummaryCache.make_key('C1', 1, 'hello   world\n')
+    assert key == SummaryCache.make_key('C1', 1, ' hello world')
+    assert key != SummaryCache.make_key('C1', 2, 'hello world')
+
+def test_concurrent_misses_compute_once():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'summary'
+
+    async def main():
+        cache = SummaryCache()
+        results = await asyncio.gather(*(cache.get_or_compute('key', compute) for _ in range(3)))
+        again = await cache.get_or_compute('key', compute)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(main())
+    assert results == ['summary'] * 3 and again == 'summary'
+    assert len(calls) == 1
+    # Every caller that found nothing counts as a miss, even the ones that joined the first
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_memory_is_bounded():
+    cache = SummaryCache(max_size=2)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') is None
+    assert cache.get('c') == 'C'
+
+def test_file_survives_restarts_and_is_private(tmp_path):
+    path = tmp_path / 'summaries.sqlite3'
+
+    async def compute():
+        return 'stored'
+
+    asyncio.run(SummaryCache(path=str(path)).get_or_compute('key', compute))
+    assert path.stat().st_mode & 0o777 == 0o600
+
+    restarted = SummaryCache(path=str(path))
+    assert asyncio.run(restarted.get_or_compute('key', compute)) == 'stored'
+    assert restarted.hits == 1
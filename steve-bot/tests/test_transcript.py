@@ -0,0 +1,25 @@
+from datetime import datetime
+from utils import TranscriptBuilder
+
+def test_times_match_strftime_across_a_year():
+    transcript = TranscriptBuilder()
+    # Every 7919 seconds for a year crosses every minute of the day and any DST change
+    for ts in range(1700000000, 1700000000 + 366 * 86400, 7919):
+        assert transcript.format_time(f'{ts}.000100') == datetime.fromtimestamp(ts).strftime('%H:%M')
+
+def test_budget_drops_the_oldest_lines():
+    transcript = TranscriptBuilder(max_chars=30)
+    for i in range(5):
+        transcript.add_note(f'line {i}')
+    # Each note is 9 characters, so the newest three fit
+    assert transcript.dropped_lines == 2 and transcript.truncated
+    assert len(transcript) == 27
+    assert transcript.build() == '[2 earlier lines omitted]\n[line 2]\n[line 3]\n[line 4]\n'
+    assert transcript.build() == ''.join(transcript.lines())
+
+def test_newest_line_is_kept_even_over_budget():
+    transcript = TranscriptBuilder(max_chars=5)
+    transcript.add_note('first')
+    transcript.add_message('0', 'someone', 'a long message')
+    assert transcript.dropped_lines == 1
+    assert transcript.build().endswith('someone: a long message\n')